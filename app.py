@@ -1,9 +1,24 @@
+import importlib
+import os
 import streamlit as st
+from dotenv import load_dotenv
 from streamlit_option_menu import option_menu
-from frontend.inicio import mostrar_pagina_inicial
-from frontend.planilhao import mostrar_planilhao
-from frontend.estrategia import mostrar_estrategia
-from frontend.graficos import mostrar_graficos
+
+# Páginas do app: cada módulo (e suas dependências pesadas) só é importado quando a página é aberta
+PAGINAS = {
+    "Página Inicial": ("frontend.inicio", "mostrar_pagina_inicial"),
+    "Planilhão": ("frontend.planilhao", "mostrar_planilhao"),
+    "Estratégia": ("frontend.estrategia", "mostrar_estrategia"),
+    "Gráficos": ("frontend.graficos", "mostrar_graficos"),
+}
+ICONES = ["house", "table", "briefcase", "bar-chart"]
+
+# Página de administração com as métricas de desempenho (METRICAS_ADMIN=1 no .env). A opção é
+# lida direto do ambiente: backend.config (logs e diretórios) só é carregado após a primeira renderização
+load_dotenv()
+if os.getenv("METRICAS_ADMIN", "0") == "1":
+    PAGINAS["Métricas"] = ("frontend.metricas", "mostrar_metricas")
+    ICONES.append("speedometer")
 
 # Configuração inicial do app
 st.set_page_config(page_title="Análise Financeira", layout="wide")
@@ -18,28 +33,29 @@ if "carteira" not in st.session_state:
 if "grafico" not in st.session_state:
     st.session_state["grafico"] = None
 
-if "menu" not in st.session_state:
+# Página ausente ou que deixou de existir (ex.: estado antigo da sessão) volta à inicial
+if st.session_state.get("menu") not in PAGINAS:
     st.session_state["menu"] = "Página Inicial"
 
 # Menu principal no topo
 menu = option_menu(
     menu_title="",  # Sem título no menu
-    options=["Página Inicial", "Planilhão", "Estratégia", "Gráficos"],
-    icons=["house", "table", "briefcase", "bar-chart"],
+    options=list(PAGINAS),
+    icons=ICONES,
     menu_icon="cast",
-    default_index=["Página Inicial", "Planilhão", "Estratégia", "Gráficos"].index(st.session_state["menu"]),
+    default_index=list(PAGINAS).index(st.session_state["menu"]),
     orientation="horizontal"  # Menu horizontal
 )
 
 # Atualiza o estado do menu no session_state
 st.session_state["menu"] = menu
 
-# Navegação para as páginas
-if menu == "Página Inicial":
-    mostrar_pagina_inicial()
-elif menu == "Planilhão":
-    mostrar_planilhao()
-elif menu == "Estratégia":
-    mostrar_estrategia()
-elif menu == "Gráficos":
-    mostrar_graficos()
+# Navegação para as páginas (o import é feito uma única vez por processo; depois vem do sys.modules)
+modulo, funcao = PAGINAS[menu]
+getattr(importlib.import_module(modulo), funcao)()
+
+# Aquecimento dos caches em segundo plano (iniciado uma única vez por processo, após a primeira renderização)
+from backend.config import AQUECIMENTO_ATIVO  # noqa: E402
+if AQUECIMENTO_ATIVO:
+    from backend.aquecimento import iniciar_aquecimento
+    iniciar_aquecimento()
@@ -0,0 +1,64 @@
+import numpy as np
+
+
+def lttb(x, y, pontos):
+    """
+    Reduz uma série a `pontos` pontos preservando o seu formato (Largest-Triangle-Three-Buckets).
+
+    O primeiro e o último ponto são mantidos; o restante é dividido em faixas de tamanho igual e,
+    em cada faixa, fica o ponto que forma o maior triângulo com o ponto escolhido na faixa anterior
+    e a média da faixa seguinte. Picos e vales são preservados, ao contrário de pegar um ponto a cada N.
+
+    Args:
+        x (np.ndarray): Abscissas crescentes (ex.: datas convertidas para números).
+        y (np.ndarray): Valores da série, sem NaN.
+        pontos (int): Quantidade de pontos desejada (mínimo de 3).
+
+    Returns:
+        np.ndarray: Índices dos pontos escolhidos, em ordem crescente (todos se a série já for menor).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+
+    # Limites das faixas internas (o primeiro e o último ponto ficam em faixas próprias)
+    limites = np.linspace(1, n - 1, pontos - 1).astype(int)
+    escolhidos = np.empty(pontos, dtype=int)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+
+    anterior = 0
+    for i in range(pontos - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        # Média da faixa seguinte (para a última faixa interna, o último ponto)
+        proximo_fim = limites[i + 2] if i + 2 < len(limites) else n
+        media_x = x[fim:proximo_fim].mean()
+        media_y = y[fim:proximo_fim].mean()
+
+        # Área (dobrada) do triângulo formado com o ponto anterior e a média da faixa seguinte
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        escolhidos[i + 1] = anterior
+    return escolhidos
+
+
+def reduzir_serie(x, y, pontos):
+    """
+    Aplica o LTTB a uma série com lacunas, descartando os NaN antes da redução.
+
+    Args:
+        x (np.ndarray): Abscissas crescentes.
+        y (np.ndarray): Valores da série, com NaN onde não há dado.
+        pontos (int): Quantidade máxima de pontos.
+
+    Returns:
+        tuple: (x, y) reduzidos (visões da entrada quando nenhuma redução é necessária).
+    """
+    validos = ~np.isnan(y)
+    if validos.all() and len(y) <= pontos:
+        return x, y
+    x, y = x[validos], y[validos]
+    indices = lttb(x.astype('int64') if np.issubdtype(x.dtype, np.datetime64) else x, y, pontos)
+    return x[indices], y[indices]
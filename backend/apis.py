@@ -1,7 +1,24 @@
-import requests
-from backend.config import TOKEN, logger  # Importa o token e o logger do config.py
-import pandas as pd
+from backend.config import obter_logger
+from backend.cache import cache_api
+from backend.cliente import obter_cliente
+from backend.esquema import otimizar_planilhao
+from backend.leitura import ler_dados
+from backend.metricas import metricas
 
+logger = obter_logger(__name__)
+
+
+def _ler_com_metricas(endpoint, response):
+    """
+    Lê o corpo da resposta registrando a duração da leitura e os bytes recebidos.
+    """
+    with metricas.cronometro(f"api.{endpoint}.leitura_ms"):
+        df = ler_dados(response)
+    metricas.observar(f"api.{endpoint}.bytes", response.raw.tell())
+    return df
+
+
+@metricas.medir('api.obter_dados_planilhao_ms')
 def obter_dados_planilhao(data_base):
     """
     Consulta o planilhão com base na data fornecida.
@@ -12,26 +29,33 @@ def obter_dados_planilhao(data_base):
     Returns:
         response (requests.Response): Resposta da API contendo os dados do planilhão.
     """
-    url = "https://laboratoriodefinancas.com/api/v1/planilhao"
-    headers = {'Authorization': f'JWT {TOKEN}'}
     params = {'data_base': data_base}
     
     try:
-        logger.info(f"Consultando o planilhão para a data base: {data_base}")
-        response = requests.get(url, params=params, headers=headers)
+        # Consulta o cache local antes de acessar a API
+        df_cache = cache_api.obter("planilhao", params)
+        if df_cache is not None:
+            logger.info("Planilhão para %s obtido do cache local.", data_base)
+            return df_cache
+
+        logger.info("Consultando o planilhão para a data base: %s", data_base)
+        response = obter_cliente().get("planilhao", params)
         
         # Validação básica da resposta
         if response.status_code != 200:
-            logger.error(f"Erro ao consultar o planilhão: {response.status_code} - {response.text}")
+            logger.error("Erro ao consultar o planilhão: %s - %s", response.status_code, response.text)
             response.raise_for_status()
         
         logger.info("Consulta ao planilhão realizada com sucesso.")
-        return pd.DataFrame(response.json()['dados'])
+        df = otimizar_planilhao(_ler_com_metricas("planilhao", response))
+        cache_api.salvar("planilhao", params, df)
+        return df
     except Exception as e:
-        logger.error(f"Erro ao obter dados do planilhão: {e}")
+        logger.error("Erro ao obter dados do planilhão: %s", e)
         raise
 
 
+@metricas.medir('api.obter_preco_corrigido_ms')
 def obter_preco_corrigido(ticker, data_ini, data_fim):
     """
     Consulta o preço corrigido de um ticker no período fornecido.
@@ -44,26 +68,33 @@ def obter_preco_corrigido(ticker, data_ini, data_fim):
     Returns:
         response.json()['dados']: Resposta da API contendo os dados dos preços corrigidos.
     """
-    url = "https://laboratoriodefinancas.com/api/v1/preco-corrigido"
-    headers = {'Authorization': f'JWT {TOKEN}'}
     params = {'ticker': ticker, 'data_ini': data_ini, 'data_fim': data_fim}
     
     try:
-        logger.info(f"Consultando preços corrigidos para {ticker} de {data_ini} a {data_fim}")
-        response = requests.get(url, params=params, headers=headers)
+        # Consulta o cache local antes de acessar a API
+        df_cache = cache_api.obter("preco-corrigido", params)
+        if df_cache is not None:
+            logger.debug("Preços corrigidos de %s obtidos do cache local.", ticker)
+            return df_cache
+
+        logger.debug("Consultando preços corrigidos para %s de %s a %s", ticker, data_ini, data_fim)
+        response = obter_cliente().get("preco-corrigido", params)
         
         # Validação básica da resposta
         if response.status_code != 200:
-            logger.error(f"Erro ao consultar preços corrigidos: {response.status_code} - {response.text}")
+            logger.error("Erro ao consultar preços corrigidos: %s - %s", response.status_code, response.text)
             response.raise_for_status()
         
-        logger.info("Consulta de preços corrigidos realizada com sucesso.")
-        return pd.DataFrame(response.json()['dados'])
+        logger.debug("Consulta de preços corrigidos de %s realizada com sucesso.", ticker)
+        df = _ler_com_metricas("preco-corrigido", response)
+        cache_api.salvar("preco-corrigido", params, df)
+        return df
     except Exception as e:
-        logger.error(f"Erro ao obter preços corrigidos: {e}")
+        logger.error("Erro ao obter preços corrigidos: %s", e)
         raise
 
 
+@metricas.medir('api.obter_preco_ibovespa_ms')
 def obter_preco_ibovespa(data_ini, data_fim):
     """
     Consulta os preços históricos do Ibovespa no período fornecido.
@@ -75,23 +106,29 @@ def obter_preco_ibovespa(data_ini, data_fim):
     Returns:
         response.json()['dados']: Resposta da API contendo os preços do Ibovespa.
     """
-    url = "https://laboratoriodefinancas.com/api/v1/preco-diversos"
-    headers = {'Authorization': f'JWT {TOKEN}'}
     params = {'ticker': 'ibov', 'data_ini': data_ini, 'data_fim': data_fim}
     
     try:
-        logger.info(f"Consultando preços do Ibovespa de {data_ini} a {data_fim}")
-        response = requests.get(url, params=params, headers=headers)
+        # Consulta o cache local antes de acessar a API
+        df_cache = cache_api.obter("preco-diversos", params)
+        if df_cache is not None:
+            logger.info("Preços do Ibovespa obtidos do cache local.")
+            return df_cache
+
+        logger.info("Consultando preços do Ibovespa de %s a %s", data_ini, data_fim)
+        response = obter_cliente().get("preco-diversos", params)
         
         # Validação básica da resposta
         if response.status_code != 200:
-            logger.error(f"Erro ao consultar preços do Ibovespa: {response.status_code} - {response.text}")
+            logger.error("Erro ao consultar preços do Ibovespa: %s - %s", response.status_code, response.text)
             response.raise_for_status()
         
         logger.info("Consulta de preços do Ibovespa realizada com sucesso.")
-        return pd.DataFrame(response.json()['dados'])
+        df = _ler_com_metricas("preco-diversos", response)
+        cache_api.salvar("preco-diversos", params, df)
+        return df
     except Exception as e:
-        logger.error(f"Erro ao obter preços do Ibovespa: {e}")
+        logger.error("Erro ao obter preços do Ibovespa: %s", e)
         raise
 
 
@@ -0,0 +1,320 @@
+import argparse
+import threading
+import time
+from datetime import date, datetime, timedelta
+from backend.calendario import dia_util_anterior, deslocar_dias_uteis, eh_dia_util
+from backend.config import (
+    AQUECIMENTO_CARTEIRAS, AQUECIMENTO_DATA_INI, AQUECIMENTO_DIAS, AQUECIMENTO_HORARIOS, AQUECIMENTO_MAX_WORKERS,
+    AQUECIMENTO_QUANTIDADE, obter_logger
+)
+from backend.views import carteira_compartilhada, pegar_dados_ibovespa, pegar_preco_corrigido
+
+logger = obter_logger(__name__)
+
+
+def interpretar_horarios(texto):
+    """
+    Converte a lista de horários do agendamento em tuplas (hora, minuto).
+
+    Args:
+        texto (str): Horários no formato 'HH:MM' separados por vírgula (ex.: '07:30,19:00').
+
+    Returns:
+        list: Tuplas (hora, minuto) em ordem crescente.
+    """
+    horarios = []
+    for item in texto.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            hora, minuto = (int(parte) for parte in item.split(':'))
+        except ValueError:
+            hora, minuto = -1, -1
+        if not (0 <= hora < 24 and 0 <= minuto < 60):
+            raise ValueError(f"Horário de aquecimento inválido: '{item}'. Use o formato HH:MM.")
+        horarios.append((hora, minuto))
+    return sorted(horarios)
+
+
+def interpretar_carteiras(texto):
+    """
+    Converte a lista de carteiras padrão em pares de indicadores.
+
+    Args:
+        texto (str): Pares 'rentabilidade:desconto' separados por vírgula (ex.: 'roe:earning_yield').
+
+    Returns:
+        list: Tuplas (indicador_rentabilidade, indicador_desconto).
+    """
+    carteiras = []
+    for item in texto.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        partes = item.split(':')
+        if len(partes) != 2:
+            raise ValueError(f"Carteira de aquecimento inválida: '{item}'. Use rentabilidade:desconto.")
+        carteiras.append((partes[0].strip(), partes[1].strip()))
+    return carteiras
+
+
+def interpretar_quantidades(texto):
+    """
+    Converte a lista de quantidades de ações das carteiras pré-calculadas.
+
+    Args:
+        texto (str): Quantidades separadas por vírgula (ex.: '10,20').
+
+    Returns:
+        list: Quantidades, sem repetições, na ordem informada.
+    """
+    quantidades = []
+    for item in texto.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if not item.isdigit() or int(item) < 1:
+            raise ValueError(f"Quantidade de aquecimento inválida: '{item}'. Use inteiros positivos.")
+        quantidades.append(int(item))
+    return list(dict.fromkeys(quantidades))
+
+
+def datas_recentes(quantidade, hoje=None):
+    """
+    Retorna os últimos pregões já encerrados, do mais recente para o mais antigo.
+
+    Args:
+        quantidade (int): Número de pregões.
+        hoje (datetime.date): Data de referência (padrão: hoje).
+
+    Returns:
+        list: Datas no formato 'YYYY-MM-DD'.
+    """
+    ultimo = dia_util_anterior((hoje or date.today()) - timedelta(days=1))
+    return [deslocar_dias_uteis(ultimo, -i).isoformat() for i in range(quantidade)]
+
+
+class Aquecedor:
+    """
+    Pré-calcula em segundo plano os dados mais pedidos pelas páginas do app.
+
+    Em cada ciclo, para os pregões mais recentes, busca o planilhão, gera as carteiras padrão
+    da Magic Formula (com os demais parâmetros nos valores padrão da página de Estratégia) e baixa
+    o histórico de preços dessas ações e do Ibovespa. Os resultados ficam nos caches locais (disco
+    e memória), de modo que o primeiro acesso do dia já os encontre.
+    """
+
+    def __init__(self, horarios, dias, carteiras, quantidades, data_ini, max_workers):
+        """
+        Args:
+            horarios (list): Tuplas (hora, minuto) em que o ciclo é executado a cada dia.
+            dias (int): Número de pregões recentes pré-calculados.
+            carteiras (list): Pares (indicador_rentabilidade, indicador_desconto) das carteiras padrão.
+            quantidades (list): Quantidades de ações pré-calculadas para cada carteira (as usadas nas páginas).
+            data_ini (str): Início do histórico de preços pré-carregado ('YYYY-MM-DD').
+            max_workers (int): Consultas de preço simultâneas feitas pelo aquecimento.
+        """
+        self.horarios = horarios
+        self.dias = dias
+        self.carteiras = carteiras
+        self.quantidades = quantidades
+        self.data_ini = data_ini
+        self.max_workers = max_workers
+        self._parar = threading.Event()
+        self._thread = None
+
+    def executar_ciclo(self, hoje=None):
+        """
+        Executa um ciclo completo de aquecimento. Falhas em um item são registradas e não
+        interrompem os demais.
+
+        Args:
+            hoje (datetime.date): Data de referência (padrão: hoje).
+
+        Returns:
+            dict: Resumo do ciclo ('datas', 'carteiras', 'tickers', 'falhas' e 'duracao_s').
+        """
+        inicio = time.perf_counter()
+        datas = datas_recentes(self.dias, hoje)
+        data_fim = datas[0]
+        tickers = {}
+        falhas = 0
+        logger.info("Aquecimento iniciado para as datas %s.", datas)
+
+        for data_base in datas:
+            for indicador_rentabilidade, indicador_desconto in self.carteiras:
+                for quantidade_acoes in self.quantidades:
+                    if self._parar.is_set():
+                        break
+                    try:
+                        # Mesma chave da página de Estratégia: a carteira fica pronta na memória compartilhada
+                        carteira = carteira_compartilhada(data_base, indicador_rentabilidade, indicador_desconto,
+                                                          quantidade_acoes).valor
+                        tickers.update(dict.fromkeys(carteira.get('ticker', [])))
+                    except Exception as e:
+                        falhas += 1
+                        logger.warning("Aquecimento: falha na carteira %s/%s (%s ações) de %s: %s",
+                                       indicador_rentabilidade, indicador_desconto, quantidade_acoes, data_base, e)
+
+        if tickers and not self._parar.is_set():
+            try:
+                pegar_preco_corrigido(list(tickers), self.data_ini, data_fim, self.max_workers)
+            except Exception as e:
+                falhas += 1
+                logger.warning("Aquecimento: falha nos preços corrigidos: %s", e)
+        if not self._parar.is_set():
+            try:
+                pegar_dados_ibovespa(self.data_ini, data_fim)
+            except Exception as e:
+                falhas += 1
+                logger.warning("Aquecimento: falha nos dados do Ibovespa: %s", e)
+
+        resumo = {
+            'datas': datas,
+            'carteiras': len(datas) * len(self.carteiras) * len(self.quantidades),
+            'tickers': len(tickers),
+            'falhas': falhas,
+            'duracao_s': time.perf_counter() - inicio,
+        }
+        logger.info("Aquecimento concluído: %s", resumo)
+        return resumo
+
+    def proxima_execucao(self, agora=None):
+        """
+        Calcula o próximo horário agendado, considerando apenas dias de pregão.
+
+        Args:
+            agora (datetime.datetime): Instante de referência (padrão: agora).
+
+        Returns:
+            datetime.datetime: Próxima execução.
+        """
+        agora = agora or datetime.now()
+        dia = agora.date()
+        while True:
+            if eh_dia_util(dia):
+                for hora, minuto in self.horarios:
+                    candidato = datetime.combine(dia, datetime.min.time()).replace(hour=hora, minute=minuto)
+                    if candidato > agora:
+                        return candidato
+            dia += timedelta(days=1)
+
+    def _executar(self, executar_agora):
+        """
+        Laço da thread de aquecimento.
+        """
+        if executar_agora:
+            self._ciclo_protegido()
+        while self.horarios and not self._parar.is_set():
+            proxima = self.proxima_execucao()
+            logger.info("Próximo aquecimento agendado para %s.", proxima)
+            if self._parar.wait((proxima - datetime.now()).total_seconds()):
+                break
+            self._ciclo_protegido()
+
+    def _ciclo_protegido(self):
+        """
+        Executa um ciclo sem deixar que um erro encerre a thread.
+        """
+        try:
+            self.executar_ciclo()
+        except Exception as e:
+            logger.error("Erro no ciclo de aquecimento: %s", e)
+
+    def iniciar(self, executar_agora=True):
+        """
+        Inicia o agendamento em uma thread em segundo plano (daemon).
+
+        Args:
+            executar_agora (bool): Se True, executa um ciclo logo ao iniciar.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if not self.horarios and not executar_agora:
+            logger.warning("Aquecimento sem horários agendados; nada a executar.")
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, args=(executar_agora,),
+                                        name="aquecimento", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout=None):
+        """
+        Interrompe o agendamento (o ciclo em andamento termina o item atual).
+        """
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def criar_aquecedor():
+    """
+    Cria um aquecedor com as configurações do .env (variáveis AQUECIMENTO_*).
+
+    Returns:
+        Aquecedor: Aquecedor configurado.
+    """
+    return Aquecedor(
+        horarios=interpretar_horarios(AQUECIMENTO_HORARIOS),
+        dias=AQUECIMENTO_DIAS,
+        carteiras=interpretar_carteiras(AQUECIMENTO_CARTEIRAS),
+        quantidades=interpretar_quantidades(AQUECIMENTO_QUANTIDADE),
+        data_ini=AQUECIMENTO_DATA_INI,
+        max_workers=AQUECIMENTO_MAX_WORKERS,
+    )
+
+
+_aquecedor = None
+_lock_aquecedor = threading.Lock()
+
+
+def iniciar_aquecimento():
+    """
+    Inicia o aquecimento em segundo plano uma única vez por processo.
+
+    O Streamlit reexecuta o app.py a cada interação, então chamadas repetidas são ignoradas.
+
+    Returns:
+        Aquecedor: Aquecedor em execução.
+    """
+    global _aquecedor
+    with _lock_aquecedor:
+        if _aquecedor is None:
+            _aquecedor = criar_aquecedor()
+            _aquecedor.iniciar()
+    return _aquecedor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-carrega o planilhão, as carteiras padrão e os preços.")
+    parser.add_argument('--uma-vez', action='store_true', help="Executa um único ciclo e encerra.")
+    parser.add_argument('--horarios', default=AQUECIMENTO_HORARIOS, help="Horários diários (HH:MM,HH:MM).")
+    parser.add_argument('--dias', type=int, default=AQUECIMENTO_DIAS, help="Pregões recentes pré-calculados.")
+    parser.add_argument('--max-workers', type=int, default=AQUECIMENTO_MAX_WORKERS,
+                        help="Consultas de preço simultâneas.")
+    args = parser.parse_args()
+
+    aquecedor = Aquecedor(
+        horarios=interpretar_horarios(args.horarios),
+        dias=args.dias,
+        carteiras=interpretar_carteiras(AQUECIMENTO_CARTEIRAS),
+        quantidades=interpretar_quantidades(AQUECIMENTO_QUANTIDADE),
+        data_ini=AQUECIMENTO_DATA_INI,
+        max_workers=args.max_workers,
+    )
+    if args.uma_vez:
+        print(aquecedor.executar_ciclo())
+        return
+
+    aquecedor.iniciar()
+    print("Aquecimento em execução (Ctrl+C para encerrar)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        aquecedor.parar(timeout=5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,443 @@
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from backend.calendario import dias_uteis_entre
+from backend.config import ARMAZEM_ATIVO, ARMAZEM_DATA_INI, CACHE_ATIVO, CACHE_DIR, MAX_WORKERS, obter_logger
+from backend.historico import calcular_cobertos, calcular_lacunas, unir_intervalos
+from backend.metricas import metricas
+
+try:
+    import fcntl  # Trava entre processos (indisponível no Windows, onde vale apenas a trava entre threads)
+except ImportError:
+    fcntl = None
+
+logger = obter_logger(__name__)
+
+# Campos gravados, cada um em um arquivo próprio (formato colunar)
+CAMPOS = ('fechamento', 'volume')
+
+# Colunas (séries) reservadas na criação dos arquivos; a capacidade dobra quando se esgota
+CAPACIDADE_INICIAL = 64
+
+
+class ArmazemPrecos:
+    """
+    Armazém local de preços em arquivos mapeados em memória (numpy.memmap), para todo o universo.
+
+    Cada campo (fechamento, volume) é uma matriz float64 dia útil × série em ordem de coluna
+    (Fortran): a série inteira de um ticker é contígua no disco, e uma nova série é só um bloco
+    acrescentado ao fim do arquivo. A linha de uma data é o número de dias úteis (segunda a sexta)
+    desde o início do eixo, então não há busca de índice; dias sem pregão ficam como NaN.
+
+    Fatias lidas com `coluna` e `fatia` são visões do mapa (sem cópia), e as páginas do arquivo
+    são compartilhadas pelo sistema operacional entre as sessões e os processos (ex.: backtest).
+    A cobertura de cada série segue as mesmas regras do HistoricoPrecos: apenas as lacunas são
+    consultadas na API, o dia atual nunca é marcado como coberto e o último pregão fechado só é
+    coberto depois que a API devolve os seus preços.
+    """
+
+    def __init__(self, diretorio, data_ini, ativo=True):
+        """
+        Args:
+            diretorio (str): Diretório dos arquivos do armazém.
+            data_ini (str): Primeira data do eixo ('YYYY-MM-DD'); períodos anteriores não são armazenados.
+            ativo (bool): Se False, toda consulta vai direto à API, sem armazenamento.
+        """
+        self.diretorio = diretorio
+        self.inicio = np.busday_offset(np.datetime64(data_ini, 'D'), 0, roll='forward')
+        self.ativo = ativo
+        self._lock = threading.RLock()
+        self._locks_series = {}
+        self._indice = None
+        self._versao_indice = None
+        self._mapas = {}
+
+    # ------------------------------------------------------------------ arquivos e índice
+
+    def _caminho(self, nome):
+        return os.path.join(self.diretorio, nome)
+
+    def _lock_serie(self, chave):
+        """
+        Retorna o lock exclusivo de uma série, criando-o se necessário.
+        """
+        with self._lock:
+            return self._locks_series.setdefault(chave, threading.Lock())
+
+    @contextmanager
+    def _trava(self):
+        """
+        Trava as alterações do armazém entre threads e, quando possível, entre processos.
+        """
+        with self._lock:
+            os.makedirs(self.diretorio, exist_ok=True)
+            with open(self._caminho('armazem.lock'), 'a') as arquivo:
+                if fcntl is not None:
+                    fcntl.flock(arquivo, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+    def _carregar_indice(self):
+        """
+        Relê o índice (séries, colunas e cobertura) se outro processo o alterou, reabrindo os mapas
+        quando o tamanho das matrizes mudou. Chamado com self._lock adquirido.
+        """
+        caminho = self._caminho('indice.json')
+        try:
+            estado = os.stat(caminho)
+            versao = (estado.st_mtime_ns, estado.st_size, estado.st_ino)
+        except FileNotFoundError:
+            versao = None
+        if self._indice is not None and versao == self._versao_indice:
+            return
+
+        indice = {'inicio': str(self.inicio), 'linhas': 0, 'capacidade': 0, 'colunas': {}, 'cobertura': {}}
+        if versao is not None:
+            try:
+                with open(caminho, encoding='utf-8') as arquivo:
+                    indice = json.load(arquivo)
+            except Exception as e:
+                logger.warning("Índice do armazém de preços ilegível, será recriado: %s", e)
+                versao = None
+        if indice['inicio'] != str(self.inicio):
+            logger.info("Armazém de preços criado a partir de %s (ARMAZEM_DATA_INI ignorado).", indice['inicio'])
+            self.inicio = np.datetime64(indice['inicio'], 'D')
+
+        tamanho_mudou = self._indice is None or (
+            (self._indice['linhas'], self._indice['capacidade']) != (indice['linhas'], indice['capacidade']))
+        self._indice, self._versao_indice = indice, versao
+        if tamanho_mudou:
+            self._abrir_mapas()
+
+    def _abrir_mapas(self):
+        """
+        Mapeia os arquivos de cada campo com o formato atual do índice.
+        """
+        linhas, capacidade = self._indice['linhas'], self._indice['capacidade']
+        self._mapas = {}
+        if not linhas or not capacidade:
+            return
+        for campo in CAMPOS:
+            self._mapas[campo] = np.memmap(self._caminho(f'{campo}.f8'), dtype='float64', mode='r+',
+                                           shape=(linhas, capacidade), order='F')
+
+    def _gravar_indice(self):
+        """
+        Grava o índice de forma atômica (depois dos dados, para que a cobertura nunca os anteceda).
+        """
+        for mapa in self._mapas.values():
+            mapa.flush()
+        caminho = self._caminho('indice.json')
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(self._indice, arquivo)
+        os.replace(temporario, caminho)
+        estado = os.stat(caminho)
+        self._versao_indice = (estado.st_mtime_ns, estado.st_size, estado.st_ino)
+
+    def _ampliar_linhas(self, linhas):
+        """
+        Estende o eixo de datas até `linhas` dias úteis, regravando os arquivos (operação rara:
+        o eixo é criado com folga até o fim do ano seguinte).
+        """
+        antigas, capacidade = self._indice['linhas'], max(self._indice['capacidade'], CAPACIDADE_INICIAL)
+        logger.info("Armazém de preços: eixo de datas ampliado de %s para %s dias úteis.", antigas, linhas)
+        for campo in CAMPOS:
+            caminho = self._caminho(f'{campo}.f8')
+            temporario = f"{caminho}.{os.getpid()}.tmp"
+            novo = np.memmap(temporario, dtype='float64', mode='w+', shape=(linhas, capacidade), order='F')
+            novo[:] = np.nan
+            if campo in self._mapas:
+                novo[:antigas, :self._indice['capacidade']] = self._mapas[campo]
+            novo.flush()
+            del novo
+            os.replace(temporario, caminho)
+        self._indice['linhas'], self._indice['capacidade'] = linhas, capacidade
+        self._abrir_mapas()
+
+    def _ampliar_colunas(self, capacidade):
+        """
+        Reserva mais colunas: em ordem de coluna, basta aumentar o arquivo (os dados não se movem).
+        """
+        linhas, antigas = self._indice['linhas'], self._indice['capacidade']
+        for campo in CAMPOS:
+            with open(self._caminho(f'{campo}.f8'), 'r+b') as arquivo:
+                arquivo.truncate(linhas * capacidade * 8)
+        self._indice['capacidade'] = capacidade
+        self._abrir_mapas()
+        for mapa in self._mapas.values():
+            mapa[:, antigas:] = np.nan
+
+    def _coluna_da_serie(self, chave):
+        """
+        Retorna a coluna da série, reservando uma nova se ela ainda não existir.
+        """
+        colunas = self._indice['colunas']
+        if chave not in colunas:
+            if len(colunas) >= self._indice['capacidade']:
+                self._ampliar_colunas(max(CAPACIDADE_INICIAL, 2 * self._indice['capacidade']))
+            colunas[chave] = len(colunas)
+        return colunas[chave]
+
+    # ------------------------------------------------------------------ datas
+
+    def _linhas(self, datas):
+        """
+        Converte datas (datetime64[D]) nas linhas do eixo (-1 para fins de semana e datas anteriores).
+        """
+        linhas = np.busday_count(self.inicio, datas)
+        return np.where(np.is_busday(datas) & (datas >= self.inicio), linhas, -1)
+
+    def datas(self, linha_ini, linha_fim):
+        """
+        Returns:
+            np.ndarray: Datas (datetime64[D]) das linhas [linha_ini, linha_fim) do eixo.
+        """
+        return np.busday_offset(self.inicio, np.arange(linha_ini, linha_fim))
+
+    def _intervalo_linhas(self, data_ini, data_fim):
+        """
+        Linhas [inicial, final) do período, limitadas ao eixo existente.
+        """
+        ini = np.busday_offset(np.datetime64(data_ini, 'D'), 0, roll='forward')
+        fim = np.busday_offset(np.datetime64(data_fim, 'D'), 0, roll='backward')
+        inicial = max(int(np.busday_count(self.inicio, ini)), 0)
+        final = min(int(np.busday_count(self.inicio, fim)) + 1, self._indice['linhas'])
+        return inicial, max(inicial, final)
+
+    # ------------------------------------------------------------------ escrita
+
+    def _escrever(self, chave, df):
+        """
+        Grava as linhas de uma consulta da API na coluna da série. Chamado com a trava adquirida.
+        """
+        if df.empty:
+            return
+        datas = pd.to_datetime(df['data'].astype(str).str[:10]).to_numpy().astype('datetime64[D]')
+        linhas = self._linhas(datas)
+        validas = linhas >= 0
+        necessarias = int(linhas.max()) + 1
+        if necessarias > self._indice['linhas']:
+            horizonte = np.datetime64(f'{max(date.today().year, datas.max().astype(object).year) + 2}-01-01')
+            self._ampliar_linhas(max(necessarias, int(np.busday_count(self.inicio, horizonte))))
+        coluna = self._coluna_da_serie(chave)
+        for campo in CAMPOS:
+            if campo in df:
+                self._mapas[campo][linhas[validas], coluna] = df[campo].to_numpy(dtype=float)[validas]
+
+    def garantir(self, chave, data_ini, data_fim, consultar):
+        """
+        Garante que a série cubra o período, consultando a API apenas nas lacunas.
+
+        Args:
+            chave (str): Identificador da série (ex.: 'preco-corrigido/PETR4').
+            data_ini (str): Data inicial no formato 'YYYY-MM-DD' (não anterior ao início do eixo).
+            data_fim (str): Data final no formato 'YYYY-MM-DD'.
+            consultar (callable): Função (data_ini, data_fim) -> pd.DataFrame que consulta a API.
+        """
+        ini = max(date.fromisoformat(data_ini), self.inicio.astype(object))
+        fim = date.fromisoformat(data_fim)
+        with self._lock_serie(chave):
+            with self._lock:
+                self._carregar_indice()
+                intervalos = [(date.fromisoformat(a), date.fromisoformat(b))
+                              for a, b in self._indice['cobertura'].get(chave, [])]
+            lacunas = calcular_lacunas(intervalos, ini, fim)
+            if not lacunas:
+                logger.debug("Armazém já cobre %s de %s a %s", chave, data_ini, data_fim)
+                return
+
+            respostas = []
+            for lacuna_ini, lacuna_fim in lacunas:
+                # Lacunas só com feriados e fins de semana não têm preços
+                if dias_uteis_entre(lacuna_ini, lacuna_fim + timedelta(days=1)) == 0:
+                    respostas.append(((lacuna_ini, lacuna_fim), None))
+                    continue
+                logger.debug("Armazém de %s: buscando lacuna de %s a %s", chave, lacuna_ini, lacuna_fim)
+                respostas.append(((lacuna_ini, lacuna_fim), consultar(lacuna_ini.isoformat(), lacuna_fim.isoformat())))
+
+            with self._trava():
+                self._carregar_indice()  # Outro processo pode ter alterado o armazém
+                for _, df in respostas:
+                    if df is not None:
+                        self._escrever(chave, df)
+                # O dia atual nunca é coberto, e o último pregão só depois de a API devolver os seus preços
+                cobertos = calcular_cobertos(respostas)
+                atuais = [(date.fromisoformat(a), date.fromisoformat(b))
+                          for a, b in self._indice['cobertura'].get(chave, [])]
+                self._indice['cobertura'][chave] = [
+                    (a.isoformat(), b.isoformat()) for a, b in unir_intervalos(atuais + cobertos)]
+                self._gravar_indice()
+
+    # ------------------------------------------------------------------ leitura
+
+    def coluna(self, chave, data_ini, data_fim, campo='fechamento'):
+        """
+        Lê um campo de uma série no período, sem cópia.
+
+        Returns:
+            tuple: (datas datetime64[D] dos dias úteis do período, visão somente leitura dos valores,
+                    com NaN onde não há preço).
+        """
+        datas, matriz = self.fatia([chave], data_ini, data_fim, campo)
+        return datas, matriz[:, 0]
+
+    def fatia(self, chaves, data_ini, data_fim, campo='fechamento'):
+        """
+        Lê um campo de várias séries no período, como matriz dia útil × série.
+
+        A matriz é uma visão do mapa (sem cópia) quando as séries ocupam colunas consecutivas
+        na ordem pedida (ex.: uma série, ou o universo na ordem de inclusão); caso contrário,
+        apenas as células pedidas são copiadas.
+
+        Args:
+            chaves (list): Identificadores das séries, todas já presentes no armazém.
+            data_ini (str): Data inicial no formato 'YYYY-MM-DD'.
+            data_fim (str): Data final no formato 'YYYY-MM-DD'.
+            campo (str): Campo lido ('fechamento' ou 'volume').
+
+        Returns:
+            tuple: (datas datetime64[D], matriz somente leitura de shape (datas, séries)).
+        """
+        with self._lock:
+            self._carregar_indice()
+            faltantes = [chave for chave in chaves if chave not in self._indice['colunas']]
+            if faltantes:
+                raise KeyError(f"Séries ausentes do armazém de preços: {', '.join(faltantes)}")
+            inicial, final = self._intervalo_linhas(data_ini, data_fim)
+            colunas = np.array([self._indice['colunas'][chave] for chave in chaves], dtype=int)
+            if final == inicial or not len(colunas):
+                return self.datas(inicial, inicial), np.empty((0, len(colunas)))
+            mapa = self._mapas[campo]
+            if np.all(np.diff(colunas) == 1):
+                matriz = mapa[inicial:final, colunas[0]:colunas[-1] + 1]
+            else:
+                matriz = mapa[inicial:final][:, colunas]
+            matriz = np.asarray(matriz).view()
+            matriz.flags.writeable = False
+            return self.datas(inicial, final), matriz
+
+    def obter(self, chave, data_ini, data_fim, consultar):
+        """
+        Retorna a série no período pedido, consultando a API apenas nas lacunas (mesma interface
+        de HistoricoPrecos.obter).
+
+        Returns:
+            pd.DataFrame: Colunas 'data' ('YYYY-MM-DD') e os campos armazenados, apenas nas datas com preço.
+        """
+        if not self.ativo or np.datetime64(data_ini, 'D') < self.inicio:
+            return consultar(data_ini, data_fim)
+        self.garantir(chave, data_ini, data_fim, consultar)
+        datas, fechamento = self.coluna(chave, data_ini, data_fim)
+        com_preco = ~np.isnan(fechamento)
+        if not com_preco.any():
+            return pd.DataFrame()
+        _, volume = self.coluna(chave, data_ini, data_fim, 'volume')
+        return pd.DataFrame({
+            'data': np.datetime_as_string(datas[com_preco], unit='D').astype(object),
+            'fechamento': fechamento[com_preco],
+            'volume': volume[com_preco],
+        })
+
+    def series(self):
+        """
+        Returns:
+            dict: Identificador de cada série -> intervalos cobertos [(data_ini, data_fim), ...].
+        """
+        with self._lock:
+            self._carregar_indice()
+            return {chave: self._indice['cobertura'].get(chave, []) for chave in self._indice['colunas']}
+
+    # ------------------------------------------------------------------ manutenção
+
+    def atualizar(self, consultas, data_fim=None, max_workers=None):
+        """
+        Atualização em lote: acrescenta os dias que faltam a cada série, em paralelo.
+
+        Cada série é completada desde o início da sua cobertura (ou do eixo, se nova) até `data_fim`,
+        então apenas os dias novos são consultados na API.
+
+        Args:
+            consultas (dict): Identificador da série -> função (data_ini, data_fim) que consulta a API.
+            data_fim (str): Última data desejada (padrão: ontem).
+            max_workers (int): Séries atualizadas simultaneamente (padrão: MAX_WORKERS).
+
+        Returns:
+            dict: Identificador -> mensagem de erro, apenas das séries que falharam.
+        """
+        if max_workers is not None and max_workers < 1:
+            raise ValueError(f"max_workers inválido: {max_workers}. Use um inteiro maior ou igual a 1.")
+        data_fim = data_fim or (date.today() - timedelta(days=1)).isoformat()
+        cobertura = self.series()
+
+        def atualizar_serie(item):
+            chave, consultar = item
+            data_ini = cobertura[chave][0][0] if cobertura.get(chave) else str(self.inicio)
+            try:
+                self.garantir(chave, data_ini, data_fim, consultar)
+            except Exception as e:
+                logger.warning("Armazém: falha ao atualizar %s: %s", chave, e)
+                return chave, str(e)
+            return chave, None
+
+        with metricas.cronometro("armazem.atualizar_ms"):
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS if max_workers is None else max_workers) as executor:
+                falhas = {chave: erro for chave, erro in executor.map(atualizar_serie, consultas.items()) if erro}
+        logger.info("Armazém de preços atualizado até %s: %s séries, %s falhas.", data_fim, len(consultas), len(falhas))
+        return falhas
+
+    def estatisticas(self):
+        """
+        Returns:
+            dict: Séries armazenadas, dias úteis do eixo, colunas reservadas e bytes em disco.
+        """
+        with self._lock:
+            self._carregar_indice()
+            linhas, capacidade = self._indice['linhas'], self._indice['capacidade']
+            return {
+                'series': len(self._indice['colunas']),
+                'inicio': str(self.inicio),
+                'linhas': linhas,
+                'capacidade': capacidade,
+                'bytes': linhas * capacidade * 8 * len(CAMPOS),
+            }
+
+
+# Instância compartilhada pelo processo
+armazem_precos = ArmazemPrecos(os.path.join(CACHE_DIR, "armazem"), ARMAZEM_DATA_INI,
+                               ativo=CACHE_ATIVO and ARMAZEM_ATIVO)
+metricas.registrar_fonte('armazem_precos', armazem_precos.estatisticas)
+
+
+def main(argv=None):
+    """
+    Ponto de entrada da atualização em lote (`python -m backend.armazem`).
+    """
+    from backend.views import atualizar_armazem  # Importado aqui: views usa este módulo
+
+    parser = argparse.ArgumentParser(description="Atualiza o armazém local de preços com os dias que faltam.")
+    parser.add_argument('--universo', metavar='DATA_BASE',
+                        help="inclui todas as ações do planilhão desta data ('YYYY-MM-DD')")
+    parser.add_argument('--tickers', nargs='*', default=[], help="ações incluídas além das já armazenadas")
+    parser.add_argument('--data-fim', help="última data desejada (padrão: ontem)")
+    parser.add_argument('--max-workers', type=int, default=None, help="consultas simultâneas")
+    args = parser.parse_args(argv)
+
+    if not armazem_precos.ativo:
+        parser.error("Armazém desativado (CACHE_ATIVO=0 ou ARMAZEM_ATIVO=0).")
+    falhas = atualizar_armazem(args.tickers, args.universo, args.data_fim, args.max_workers)
+    print(json.dumps({'falhas': falhas, **armazem_precos.estatisticas()}, indent=2, ensure_ascii=False))
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
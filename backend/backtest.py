@@ -0,0 +1,230 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from backend.cliente import iniciar_trabalhador
+from backend.config import MAX_PROCESSOS, obter_logger
+from backend.painel import montar_painel, retorno_acumulado
+from backend.views import PONDERACOES, gerar_carteira, pegar_dados_ibovespa, pegar_preco_corrigido
+
+logger = obter_logger(__name__)
+
+# Frequências de rebalanceamento aceitas e o período correspondente do pandas
+FREQUENCIAS = {'mensal': 'M', 'trimestral': 'Q', 'anual': 'Y'}
+
+
+def gerar_datas_rebalanceamento(datas_pregao, frequencia):
+    """
+    Seleciona o primeiro pregão de cada período como data de rebalanceamento.
+
+    Args:
+        datas_pregao (pd.Series): Datas de pregão em ordem crescente (formato 'YYYY-MM-DD').
+        frequencia (str): 'mensal', 'trimestral' ou 'anual'.
+
+    Returns:
+        list: Datas de rebalanceamento no formato 'YYYY-MM-DD'.
+    """
+    if frequencia not in FREQUENCIAS:
+        raise ValueError(f"Frequência inválida: {frequencia}. Use uma de {list(FREQUENCIAS)}.")
+    datas = pd.Series(pd.to_datetime(pd.Series(datas_pregao).astype(str).str[:10]).to_numpy())
+    periodos = datas.dt.to_period(FREQUENCIAS[frequencia])
+    return datas[~periodos.duplicated()].dt.strftime('%Y-%m-%d').tolist()
+
+
+def _selecionar_carteira(data_base, indicador_rentabilidade, indicador_desconto, quantidade_acoes,
+                         ranking_setorial=False, maximo_por_setor=None, ponderacao='igual'):
+    """
+    Gera a carteira de uma data de rebalanceamento (executada nos processos do pool).
+
+    Returns:
+        tuple: (data_base, dicionário ticker -> peso dos selecionados; vazio em caso de erro).
+    """
+    try:
+        df_carteira = gerar_carteira(data_base, indicador_rentabilidade, indicador_desconto, quantidade_acoes,
+                                     ranking_setorial, maximo_por_setor, ponderacao)
+        if df_carteira.empty:
+            return data_base, {}
+        return data_base, dict(zip(df_carteira['ticker'], df_carteira['peso'].astype(float)))
+    except Exception as e:
+        logger.warning("Erro ao gerar a carteira do backtest para %s: %s", data_base, e)
+        return data_base, {}
+
+
+def encadear_retornos(precos, inicios, colunas, pesos=None):
+    """
+    Encadeia os retornos de carteiras rebalanceadas periodicamente.
+
+    Em cada período, a carteira é comprada no pregão de início com os pesos do período,
+    renormalizados entre os ativos com preço naquele dia, e mantida (sem rebalancear) até o
+    início do período seguinte.
+
+    Args:
+        precos (np.ndarray): Matriz de preços (datas × tickers), sem lacunas internas.
+        inicios (list): Índice da linha de início de cada período, em ordem crescente.
+        colunas (list): Para cada período, os índices das colunas (tickers) da carteira.
+        pesos (list): Para cada período, o peso de cada coluna de `colunas` (padrão: pesos iguais).
+
+    Returns:
+        np.ndarray: Valor da cota (NAV) em cada data, começando em 1 no primeiro rebalanceamento.
+    """
+    nav = np.full(precos.shape[0], np.nan)
+    if not inicios:
+        return nav
+    nav[inicios[0]] = 1.0
+    fins = list(inicios[1:]) + [precos.shape[0] - 1]
+
+    pesos = pesos if pesos is not None else [np.ones(len(cols)) for cols in colunas]
+    for inicio, fim, cols, pesos_periodo in zip(inicios, fins, colunas, pesos):
+        bloco = precos[inicio:fim + 1, cols]
+        compraveis = ~np.isnan(bloco[0]) if len(cols) else np.array([], dtype=bool)
+        pesos_compraveis = np.nan_to_num(np.asarray(pesos_periodo, dtype=float)[compraveis])
+        if not compraveis.any() or pesos_compraveis.sum() <= 0:
+            # Sem ativos compráveis: o período fica em caixa
+            nav[inicio:fim + 1] = nav[inicio]
+            continue
+        relativos = bloco[:, compraveis] / bloco[0, compraveis]
+        validos = ~np.isnan(relativos)
+        valor = (np.where(validos, relativos, 0.0) @ pesos_compraveis) / (validos @ pesos_compraveis)
+        nav[inicio:fim + 1] = nav[inicio] * valor
+    return nav
+
+
+def executar_backtest(data_ini, data_fim, indicador_rentabilidade, indicador_desconto, quantidade_acoes,
+                      frequencia='mensal', max_processos=None, ranking_setorial=False, maximo_por_setor=None,
+                      ponderacao='igual'):
+    """
+    Executa um backtest da Magic Formula com rebalanceamento periódico contra o Ibovespa.
+
+    As carteiras de cada data de rebalanceamento são geradas em paralelo em um pool de processos
+    (cada planilhão é consultado uma única vez) e a série de preços de cada ticker é baixada uma
+    única vez para todo o período.
+
+    Args:
+        data_ini (str): Data inicial no formato 'YYYY-MM-DD'.
+        data_fim (str): Data final no formato 'YYYY-MM-DD'.
+        indicador_rentabilidade (str): Indicador de rentabilidade (ex.: 'roe' ou 'roic').
+        indicador_desconto (str): Indicador de desconto (ex.: 'earning_yield' ou 'dividend_yield').
+        quantidade_acoes (int): Número de ações em cada carteira.
+        frequencia (str): 'mensal', 'trimestral' ou 'anual'.
+        max_processos (int): Número máximo de processos (padrão: MAX_PROCESSOS).
+        ranking_setorial (bool): Se True, ranqueia cada ação apenas dentro do seu setor.
+        maximo_por_setor (int): Máximo de ações de um mesmo setor em cada carteira (None = sem limite).
+        ponderacao (str): Pesos de cada carteira: 'igual' ou 'neutra_setor' (ver gerar_carteira).
+
+    Returns:
+        pd.DataFrame: Colunas 'data', 'nav_carteira', 'nav_ibovespa', 'retorno_acumulado_carteira'
+                      e 'retorno_acumulado_ibovespa'. As carteiras de cada rebalanceamento ficam
+                      em `df.attrs['carteiras']` e os pesos em `df.attrs['pesos']`.
+    """
+    logger.info("Iniciando backtest %s de %s a %s com "
+                "%s/%s e %s ações.", frequencia, data_ini, data_fim, indicador_rentabilidade, indicador_desconto,
+                quantidade_acoes)
+    try:
+        # Calendário de pregões a partir do Ibovespa
+        df_ibovespa = pegar_dados_ibovespa(data_ini, data_fim)
+        if df_ibovespa.empty:
+            logger.warning("Backtest sem dados do Ibovespa no período.")
+            return pd.DataFrame()
+        df_ibovespa = df_ibovespa.sort_values(by='data').reset_index(drop=True)
+        datas_rebalanceamento = gerar_datas_rebalanceamento(df_ibovespa['data'], frequencia)
+
+        # Gera as carteiras de todas as datas em paralelo
+        max_processos = max(1, min(max_processos or MAX_PROCESSOS, len(datas_rebalanceamento)))
+        logger.info("Gerando %s carteiras com %s processos.", len(datas_rebalanceamento), max_processos)
+        argumentos = (
+            datas_rebalanceamento,
+            [indicador_rentabilidade] * len(datas_rebalanceamento),
+            [indicador_desconto] * len(datas_rebalanceamento),
+            [quantidade_acoes] * len(datas_rebalanceamento),
+            [ranking_setorial] * len(datas_rebalanceamento),
+            [maximo_por_setor] * len(datas_rebalanceamento),
+            [ponderacao] * len(datas_rebalanceamento),
+        )
+        if max_processos == 1:
+            carteiras = dict(map(_selecionar_carteira, *argumentos))
+        else:
+            # Os processos dividem entre si a taxa da API (cada um tem o seu limitador)
+            with ProcessPoolExecutor(max_workers=max_processos, initializer=iniciar_trabalhador,
+                                     initargs=(max_processos,)) as executor:
+                carteiras = dict(executor.map(_selecionar_carteira, *argumentos))
+
+        # Baixa uma única vez a série completa de cada ticker que aparece em alguma carteira
+        tickers = list(dict.fromkeys(t for lista in carteiras.values() for t in lista))
+        if not tickers:
+            logger.warning("Nenhuma carteira gerada no período do backtest.")
+            return pd.DataFrame()
+        df_precos = pegar_preco_corrigido(tickers, data_ini, data_fim)
+        if df_precos.empty:
+            logger.warning("Nenhum preço obtido para as carteiras do backtest.")
+            return pd.DataFrame()
+
+        # Matriz de preços alinhada aos pregões; o último preço é mantido em dias sem negociação
+        datas, colunas_painel, precos = montar_painel(df_precos, df_ibovespa['data'], preenchimento='ffill')
+        inicios = datas.get_indexer(datas_rebalanceamento).tolist()
+        colunas, pesos = [], []
+        for data in datas_rebalanceamento:
+            cols = colunas_painel.get_indexer(list(carteiras[data]))
+            colunas.append(cols[cols >= 0])
+            pesos.append(np.fromiter(carteiras[data].values(), dtype=float, count=len(cols))[cols >= 0])
+
+        nav_carteira = encadear_retornos(precos, inicios, colunas, pesos)
+        nav_ibovespa = retorno_acumulado(df_ibovespa['fechamento'].to_numpy(dtype=float)) + 1
+
+        df_final = pd.DataFrame({
+            'data': df_ibovespa['data'],
+            'nav_carteira': nav_carteira,
+            'nav_ibovespa': nav_ibovespa,
+        })
+        df_final = df_final[~np.isnan(nav_carteira)].reset_index(drop=True)
+        df_final['retorno_acumulado_carteira'] = df_final['nav_carteira'] - 1
+        df_final['retorno_acumulado_ibovespa'] = df_final['nav_ibovespa'] / df_final['nav_ibovespa'].iloc[0] - 1
+        df_final.attrs['carteiras'] = {data: list(selecao) for data, selecao in carteiras.items()}
+        df_final.attrs['pesos'] = carteiras
+
+        logger.info("Backtest concluído: %s rebalanceamentos, "
+                    "%s tickers distintos.", len(datas_rebalanceamento), len(tickers))
+        return df_final
+    except Exception as e:
+        logger.error("Erro ao executar backtest: %s", e)
+        raise
+
+
+def main(argv=None):
+    """
+    Ponto de entrada do backtest sem interface (`python -m backend.backtest`).
+    """
+    from backend.cli import FORMATOS, gravar_tabela, verificar_formato
+
+    parser = argparse.ArgumentParser(description="Backtest da Magic Formula com rebalanceamento periódico.")
+    parser.add_argument('data_ini', help="data inicial ('YYYY-MM-DD')")
+    parser.add_argument('data_fim', help="data final ('YYYY-MM-DD')")
+    parser.add_argument('--rentabilidade', default='roe', help="indicador de rentabilidade (padrão: roe)")
+    parser.add_argument('--desconto', default='earning_yield', help="indicador de desconto (padrão: earning_yield)")
+    parser.add_argument('--quantidade', type=int, default=10, help="ações em cada carteira (padrão: 10)")
+    parser.add_argument('--frequencia', choices=list(FREQUENCIAS), default='mensal', help="rebalanceamento")
+    parser.add_argument('--ranking-setorial', action='store_true', help="ranqueia cada ação dentro do seu setor")
+    parser.add_argument('--maximo-por-setor', type=int, default=None, help="máximo de ações por setor")
+    parser.add_argument('--ponderacao', choices=PONDERACOES, default='igual', help="pesos de cada carteira")
+    parser.add_argument('--max-processos', type=int, default=None, help="processos do pool")
+    parser.add_argument('--saida', help="grava a série (data, NAVs e retornos) neste caminho, sem extensão")
+    parser.add_argument('--formato', choices=FORMATOS, default='csv', help="formato da saída (padrão: csv)")
+    args = parser.parse_args(argv)
+
+    if args.saida:
+        verificar_formato(args.formato)
+    df = executar_backtest(args.data_ini, args.data_fim, args.rentabilidade, args.desconto, args.quantidade,
+                           args.frequencia, args.max_processos, args.ranking_setorial, args.maximo_por_setor,
+                           args.ponderacao)
+    if df.empty:
+        print("Backtest sem resultados no período.")
+        return 1
+    final = df.iloc[-1]
+    print(f"{len(df.attrs['carteiras'])} rebalanceamentos de {df['data'].iloc[0]} a {final['data']}: "
+          f"carteira {final['retorno_acumulado_carteira']:.2%}, Ibovespa {final['retorno_acumulado_ibovespa']:.2%}")
+    if args.saida:
+        print(f"Série gravada em {gravar_tabela(df, args.saida, args.formato)}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,256 @@
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from backend.calendario import dia_util_anterior
+from backend.config import CACHE_ATIVO, CACHE_DIR, CACHE_TAMANHO_MAX_MB, CACHE_TTL_HOJE, obter_logger
+from backend.metricas import metricas
+
+logger = obter_logger(__name__)
+
+# Parâmetros de data usados para decidir se uma resposta é histórica (imutável)
+PARAMETROS_DATA = ('data_base', 'data_fim')
+
+
+class CacheRespostas:
+    """
+    Cache persistente em SQLite para as respostas da API do Laboratório de Finanças.
+
+    As respostas são indexadas pelo endpoint e pelos parâmetros da consulta e armazenadas
+    como DataFrames serializados. Consultas a datas anteriores ao último pregão fechado nunca
+    expiram; consultas que incluem esse pregão ou o dia atual (ainda dentro da janela de
+    publicação) expiram após `ttl_hoje` segundos. Respostas vazias não são armazenadas. Quando
+    o tamanho total excede o limite, as entradas acessadas há mais tempo são removidas.
+    """
+
+    def __init__(self, caminho, tamanho_max_bytes, ttl_hoje, ativo=True):
+        """
+        Args:
+            caminho (str): Caminho do arquivo SQLite.
+            tamanho_max_bytes (int): Tamanho máximo do cache em bytes.
+            ttl_hoje (int): Validade, em segundos, de respostas que incluem o dia atual.
+            ativo (bool): Se False, o cache não lê nem grava nada.
+        """
+        self.caminho = caminho
+        self.tamanho_max_bytes = tamanho_max_bytes
+        self.ttl_hoje = ttl_hoje
+        self.ativo = ativo
+        self._conexao = None
+        self._conexoes_herdadas = []
+        self._lock = threading.Lock()
+        self._acertos = 0
+        self._falhas = 0
+
+        # Processos criados por fork (ex.: backtest) não podem usar a conexão aberta pelo pai
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reiniciar_apos_fork)
+
+    def _reiniciar_apos_fork(self):
+        """
+        Descarta, no processo filho, a conexão e o lock herdados do pai: o SQLite não permite usar
+        uma conexão depois de um fork, então o filho abre a sua na primeira consulta.
+        """
+        if self._conexao is not None:
+            # Mantida sem uso e nunca fechada: fechá-la no filho também mexeria no banco do pai
+            self._conexoes_herdadas.append(self._conexao)
+            self._conexao = None
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        """
+        Abre (uma única vez) a conexão com o banco e cria a tabela de respostas.
+
+        Returns:
+            sqlite3.Connection: Conexão compartilhada entre as threads do processo.
+        """
+        if self._conexao is None:
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")  # Permite leituras concorrentes entre processos
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS respostas (
+                    chave TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    dados BLOB NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    criado_em REAL NOT NULL,
+                    expira_em REAL,
+                    ultimo_acesso REAL NOT NULL
+                )
+            """)
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_ultimo_acesso ON respostas (ultimo_acesso)")
+            conexao.commit()
+            self._conexao = conexao
+        return self._conexao
+
+    @staticmethod
+    def gerar_chave(endpoint, params):
+        """
+        Gera a chave do cache a partir do endpoint e dos parâmetros da consulta.
+
+        Args:
+            endpoint (str): Nome do endpoint (ex.: 'planilhao').
+            params (dict): Parâmetros da consulta.
+
+        Returns:
+            str: Chave determinística da consulta.
+        """
+        return f"{endpoint}?{json.dumps(params, sort_keys=True, default=str)}"
+
+    def calcular_expiracao(self, params, agora=None):
+        """
+        Define quando uma resposta expira de acordo com as datas consultadas.
+
+        Os dados do último pregão fechado podem ainda não ter sido publicados (ou estar
+        incompletos), então ele é tratado como o dia atual; só datas anteriores são imutáveis.
+
+        Args:
+            params (dict): Parâmetros da consulta.
+            agora (float): Instante atual em segundos (opcional, para testes).
+
+        Returns:
+            float | None: Instante de expiração, ou None se a resposta for imutável (data passada).
+        """
+        agora = agora if agora is not None else time.time()
+        datas = [str(params[nome]) for nome in PARAMETROS_DATA if params.get(nome)]
+        ultimo_pregao = dia_util_anterior(date.fromtimestamp(agora) - timedelta(days=1))
+        if datas and max(datas) < ultimo_pregao.isoformat():
+            return None
+        return agora + self.ttl_hoje
+
+    def obter(self, endpoint, params):
+        """
+        Busca uma resposta válida no cache.
+
+        Args:
+            endpoint (str): Nome do endpoint (ex.: 'planilhao').
+            params (dict): Parâmetros da consulta.
+
+        Returns:
+            pd.DataFrame | None: DataFrame armazenado, ou None se não houver entrada válida.
+        """
+        if not self.ativo:
+            return None
+        chave = self.gerar_chave(endpoint, params)
+        agora = time.time()
+        try:
+            with self._lock:
+                conexao = self._conectar()
+                linha = conexao.execute(
+                    "SELECT dados, expira_em FROM respostas WHERE chave = ?", (chave,)
+                ).fetchone()
+                if linha is not None and (linha[1] is None or linha[1] > agora):
+                    conexao.execute("UPDATE respostas SET ultimo_acesso = ? WHERE chave = ?", (agora, chave))
+                    conexao.commit()
+                    self._acertos += 1
+                    return pickle.loads(linha[0])
+                if linha is not None:
+                    # Entrada expirada: remove para liberar espaço
+                    conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                    conexao.commit()
+                self._falhas += 1
+                return None
+        except Exception as e:
+            logger.warning("Erro ao ler o cache para %s: %s", chave, e)
+            return None
+
+    def salvar(self, endpoint, params, df):
+        """
+        Armazena uma resposta no cache e aplica o limite de tamanho.
+
+        Args:
+            endpoint (str): Nome do endpoint (ex.: 'planilhao').
+            params (dict): Parâmetros da consulta.
+            df (pd.DataFrame): DataFrame a ser armazenado (respostas vazias são ignoradas).
+        """
+        if not self.ativo:
+            return
+        if getattr(df, 'empty', False):
+            # Uma resposta vazia pode ser só atraso na publicação: não fixa o resultado no cache
+            logger.info("Resposta vazia de %s não armazenada no cache.", endpoint)
+            return
+        chave = self.gerar_chave(endpoint, params)
+        agora = time.time()
+        try:
+            dados = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+            with self._lock:
+                conexao = self._conectar()
+                conexao.execute(
+                    "INSERT OR REPLACE INTO respostas "
+                    "(chave, endpoint, dados, tamanho, criado_em, expira_em, ultimo_acesso) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (chave, endpoint, dados, len(dados), agora, self.calcular_expiracao(params, agora), agora)
+                )
+                self._remover_excedente(conexao)
+                conexao.commit()
+        except Exception as e:
+            logger.warning("Erro ao gravar o cache para %s: %s", chave, e)
+
+    def _remover_excedente(self, conexao):
+        """
+        Remove as entradas menos usadas recentemente até o cache caber no limite de tamanho.
+
+        Args:
+            conexao (sqlite3.Connection): Conexão aberta com o banco.
+        """
+        total = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total <= self.tamanho_max_bytes:
+            return
+        removidas = 0
+        for chave, tamanho in conexao.execute(
+            "SELECT chave, tamanho FROM respostas ORDER BY ultimo_acesso ASC"
+        ).fetchall():
+            if total <= self.tamanho_max_bytes:
+                break
+            conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            total -= tamanho
+            removidas += 1
+        logger.info("Cache acima do limite: %s entradas removidas.", removidas)
+
+    def estatisticas(self):
+        """
+        Retorna os contadores de uso do cache.
+
+        Returns:
+            dict: Acertos, falhas, taxa de acerto, número de entradas e tamanho total em bytes.
+        """
+        entradas, tamanho = 0, 0
+        if self.ativo:
+            with self._lock:
+                entradas, tamanho = self._conectar().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas"
+                ).fetchone()
+        consultas = self._acertos + self._falhas
+        return {
+            'acertos': self._acertos,
+            'falhas': self._falhas,
+            'taxa_acerto': self._acertos / consultas if consultas else 0.0,
+            'entradas': entradas,
+            'tamanho_bytes': tamanho,
+        }
+
+    def limpar(self):
+        """
+        Remove todas as entradas do cache e zera os contadores.
+        """
+        with self._lock:
+            if self.ativo:
+                self._conectar().execute("DELETE FROM respostas")
+                self._conexao.commit()
+            self._acertos = 0
+            self._falhas = 0
+
+
+# Instância compartilhada pelo processo
+cache_api = CacheRespostas(
+    caminho=os.path.join(CACHE_DIR, "respostas.sqlite3"),
+    tamanho_max_bytes=CACHE_TAMANHO_MAX_MB * 1024 * 1024,
+    ttl_hoje=CACHE_TTL_HOJE,
+    ativo=CACHE_ATIVO,
+)
+
+# Taxa de acerto e ocupação incluídas no resumo das métricas
+metricas.registrar_fonte('cache_api', cache_api.estatisticas)
@@ -0,0 +1,213 @@
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+# Período coberto pelo calendário pré-calculado
+ANO_INICIAL = 1990
+ANO_FINAL = 2060
+
+
+def calcular_pascoa(ano):
+    """
+    Calcula a data da Páscoa (calendário gregoriano, algoritmo de Meeus/Jones/Butcher).
+
+    Args:
+        ano (int): Ano desejado.
+
+    Returns:
+        datetime.date: Domingo de Páscoa.
+    """
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def feriados_b3(ano):
+    """
+    Lista os dias sem pregão na B3 em um ano (feriados nacionais, móveis e de São Paulo).
+
+    Args:
+        ano (int): Ano desejado.
+
+    Returns:
+        list: Datas (datetime.date) sem pregão, incluindo as que caem em fins de semana.
+    """
+    pascoa = calcular_pascoa(ano)
+    feriados = [
+        date(ano, 1, 1),                 # Confraternização Universal
+        pascoa - timedelta(days=48),     # Carnaval (segunda-feira)
+        pascoa - timedelta(days=47),     # Carnaval (terça-feira)
+        pascoa - timedelta(days=2),      # Sexta-feira Santa
+        date(ano, 4, 21),                # Tiradentes
+        date(ano, 5, 1),                 # Dia do Trabalho
+        pascoa + timedelta(days=60),     # Corpus Christi
+        date(ano, 9, 7),                 # Independência
+        date(ano, 10, 12),               # Nossa Senhora Aparecida
+        date(ano, 11, 2),                # Finados
+        date(ano, 11, 15),               # Proclamação da República
+        date(ano, 12, 24),               # Véspera de Natal (sem pregão)
+        date(ano, 12, 25),               # Natal
+        date(ano, 12, 31),               # Último dia do ano (sem pregão)
+    ]
+    if ano <= 2021:
+        # Feriados municipais de São Paulo, respeitados pela B3 até 2021
+        feriados += [date(ano, 1, 25), date(ano, 7, 9)]
+    if 2004 <= ano <= 2021 or ano >= 2024:
+        # Consciência Negra: municipal em São Paulo até 2021 e nacional a partir de 2024
+        feriados.append(date(ano, 11, 20))
+    return feriados
+
+
+# Calendário pré-calculado: conjunto para consultas O(1) e busdaycalendar para operações vetorizadas
+FERIADOS = frozenset(d for ano in range(ANO_INICIAL, ANO_FINAL + 1) for d in feriados_b3(ano))
+CALENDARIO_B3 = np.busdaycalendar(weekmask='1111100', holidays=np.array(sorted(FERIADOS), dtype='datetime64[D]'))
+
+
+def _para_datetime64(datas):
+    """
+    Converte datas (escalares ou coleções) para datetime64[D].
+
+    Returns:
+        tuple: (np.ndarray de datetime64[D], True se a entrada era um único valor).
+    """
+    if isinstance(datas, (pd.Series, pd.Index)):
+        return pd.to_datetime(datas).to_numpy().astype('datetime64[D]'), False
+    escalar = np.ndim(datas) == 0
+    if escalar and isinstance(datas, pd.Timestamp):
+        datas = datas.to_datetime64()
+    return np.asarray(datas, dtype='datetime64[D]'), escalar
+
+
+def _formatar_saida(resultado, escalar):
+    """
+    Devolve um datetime.date para entradas escalares e o array datetime64[D] para coleções.
+    """
+    return resultado.astype(object) if escalar else resultado
+
+
+def eh_dia_util(data):
+    """
+    Verifica, em O(1), se uma data é dia de pregão na B3.
+
+    Args:
+        data (datetime.date): Data a ser verificada.
+
+    Returns:
+        bool: True se houver pregão na data.
+    """
+    return data.weekday() < 5 and data not in FERIADOS
+
+
+def eh_dia_util_vetor(datas):
+    """
+    Verifica, de forma vetorizada, quais datas são dias de pregão.
+
+    Args:
+        datas (array-like): Datas a verificar.
+
+    Returns:
+        np.ndarray: Array booleano com o mesmo shape da entrada.
+    """
+    datas, _ = _para_datetime64(datas)
+    return np.is_busday(datas, busdaycal=CALENDARIO_B3)
+
+
+def proximo_dia_util(datas):
+    """
+    Ajusta cada data para o próprio dia, se for pregão, ou para o pregão seguinte.
+
+    Args:
+        datas (date | array-like): Data ou coleção de datas.
+
+    Returns:
+        datetime.date | np.ndarray: Datas ajustadas (mesmo formato da entrada).
+    """
+    valores, escalar = _para_datetime64(datas)
+    return _formatar_saida(np.busday_offset(valores, 0, roll='forward', busdaycal=CALENDARIO_B3), escalar)
+
+
+def dia_util_anterior(datas):
+    """
+    Ajusta cada data para o próprio dia, se for pregão, ou para o pregão anterior.
+
+    Args:
+        datas (date | array-like): Data ou coleção de datas.
+
+    Returns:
+        datetime.date | np.ndarray: Datas ajustadas (mesmo formato da entrada).
+    """
+    valores, escalar = _para_datetime64(datas)
+    return _formatar_saida(np.busday_offset(valores, 0, roll='backward', busdaycal=CALENDARIO_B3), escalar)
+
+
+def deslocar_dias_uteis(datas, quantidade):
+    """
+    Desloca cada data por um número de pregões (datas fora de pregão partem do pregão seguinte).
+
+    Args:
+        datas (date | array-like): Data ou coleção de datas.
+        quantidade (int | array-like): Pregões a avançar (negativo para recuar).
+
+    Returns:
+        datetime.date | np.ndarray: Datas deslocadas (mesmo formato da entrada).
+    """
+    valores, escalar = _para_datetime64(datas)
+    resultado = np.busday_offset(valores, quantidade, roll='forward', busdaycal=CALENDARIO_B3)
+    return _formatar_saida(resultado, escalar and np.ndim(quantidade) == 0)
+
+
+def dias_uteis_entre(datas_ini, datas_fim):
+    """
+    Conta os pregões no intervalo [data_ini, data_fim), de forma vetorizada.
+
+    Args:
+        datas_ini (date | array-like): Datas iniciais (incluídas).
+        datas_fim (date | array-like): Datas finais (excluídas).
+
+    Returns:
+        int | np.ndarray: Quantidade de pregões em cada intervalo.
+    """
+    inicio, _ = _para_datetime64(datas_ini)
+    fim, _ = _para_datetime64(datas_fim)
+    return np.busday_count(inicio, fim, busdaycal=CALENDARIO_B3)
+
+
+def dias_uteis(data_ini, data_fim):
+    """
+    Lista os pregões entre duas datas, inclusive.
+
+    Args:
+        data_ini (date | str): Data inicial.
+        data_fim (date | str): Data final.
+
+    Returns:
+        np.ndarray: Datas de pregão (datetime64[D]) em ordem crescente.
+    """
+    inicio = np.datetime64(data_ini, 'D')
+    fim = np.datetime64(data_fim, 'D')
+    datas = np.arange(inicio, fim + 1, dtype='datetime64[D]')
+    return datas[np.is_busday(datas, busdaycal=CALENDARIO_B3)]
+
+
+def ajustar_dia_util(data, direcao='anterior'):
+    """
+    Ajusta uma data escolhida pelo usuário para o pregão mais próximo na direção indicada.
+
+    Args:
+        data (datetime.date): Data escolhida.
+        direcao (str): 'anterior' ou 'seguinte'.
+
+    Returns:
+        datetime.date: A própria data, se for pregão, ou o pregão ajustado.
+    """
+    if eh_dia_util(data):
+        return data
+    return dia_util_anterior(data) if direcao == 'anterior' else proximo_dia_util(data)
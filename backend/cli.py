@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from backend.cliente import iniciar_trabalhador
+from backend.config import CACHE_ATIVO, MAX_PROCESSOS, MAX_WORKERS, obter_logger
+from backend.views import (
+    PONDERACOES, agrupar_dados, gerar_carteira, pegar_dados_ibovespa, pegar_preco_corrigido, validar_max_workers
+)
+
+logger = obter_logger(__name__)
+
+FORMATOS = ('parquet', 'csv')
+
+# Parâmetros de carteira aceitos em cada tarefa (e no bloco "padrao" do arquivo de tarefas)
+PARAMETROS_CARTEIRA = {
+    'indicador_rentabilidade': 'roe',
+    'indicador_desconto': 'earning_yield',
+    'quantidade_acoes': 10,
+    'ranking_setorial': False,
+    'maximo_por_setor': None,
+    'ponderacao': 'igual',
+}
+
+
+def carregar_tarefas(caminho):
+    """
+    Lê o arquivo de tarefas e expande cada tarefa em uma execução por data base.
+
+    Formato (JSON):
+        {
+          "saida": "resultados/noturno",
+          "formato": "parquet",
+          "padrao": {"quantidade_acoes": 10, "data_fim": "2024-12-30"},
+          "tarefas": [
+            {"nome": "roe_ey", "datas_base": ["2024-01-02", "2024-02-01"],
+             "indicador_rentabilidade": "roe", "indicador_desconto": "earning_yield"}
+          ]
+        }
+
+    Cada tarefa aceita os parâmetros de gerar_carteira, `data_ini` (padrão: a própria data base)
+    e `data_fim` (fim do período de desempenho). Valores ausentes vêm de "padrao".
+
+    Args:
+        caminho (str): Caminho do arquivo JSON.
+
+    Returns:
+        tuple: (configuração geral do arquivo, lista de execuções com 'id' único).
+    """
+    with open(caminho, encoding='utf-8') as arquivo:
+        configuracao = json.load(arquivo)
+
+    padrao = configuracao.get('padrao', {})
+    execucoes = []
+    for i, tarefa in enumerate(configuracao.get('tarefas', [])):
+        tarefa = {**PARAMETROS_CARTEIRA, **padrao, **tarefa}
+        nome = tarefa.get('nome') or f"tarefa{i + 1}"
+        if tarefa['ponderacao'] not in PONDERACOES:
+            raise ValueError(f"Tarefa {nome}: ponderação inválida ({tarefa['ponderacao']}).")
+        if not tarefa.get('data_fim'):
+            raise ValueError(f"Tarefa {nome}: informe 'data_fim' (na tarefa ou em 'padrao').")
+        datas_base = tarefa.get('datas_base') or [tarefa.get('data_base')]
+        for data_base in filter(None, datas_base):
+            execucoes.append({
+                'id': f"{nome}_{data_base}",
+                'nome': nome,
+                'data_base': data_base,
+                'data_ini': tarefa.get('data_ini') or data_base,
+                'data_fim': tarefa['data_fim'],
+                **{parametro: tarefa[parametro] for parametro in PARAMETROS_CARTEIRA},
+            })
+
+    ids = [execucao['id'] for execucao in execucoes]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Há tarefas com o mesmo nome e data base; use nomes diferentes.")
+    return configuracao, execucoes
+
+
+def verificar_formato(formato):
+    """
+    Confere se o formato de saída pode ser gravado neste ambiente.
+
+    O Parquet depende do pacote opcional pyarrow (ou fastparquet).
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}. Use {', '.join(FORMATOS)}.")
+    if formato == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            try:
+                import fastparquet  # noqa: F401
+            except ImportError:
+                raise ValueError("Formato parquet requer o pacote pyarrow (pip install pyarrow). "
+                                 "Use --formato csv para gravar em CSV.") from None
+
+
+def gravar_tabela(df, caminho, formato):
+    """
+    Grava um DataFrame em Parquet ou CSV, criando o diretório se necessário.
+
+    Args:
+        df (pd.DataFrame): Tabela a ser gravada.
+        caminho (str): Caminho do arquivo sem extensão.
+        formato (str): 'parquet' ou 'csv'.
+
+    Returns:
+        str: Caminho do arquivo gravado.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    caminho = f"{caminho}.{formato}"
+    if formato == 'parquet':
+        df.to_parquet(caminho, index=False)
+    else:
+        df.to_csv(caminho, index=False)
+    return caminho
+
+
+def _gerar_carteiras_da_data(data_base, execucoes):
+    """
+    Gera as carteiras de todas as execuções de uma data base (executada nos processos do pool).
+
+    Agrupar por data faz cada planilhão ser consultado e deduplicado uma única vez.
+
+    Returns:
+        dict: id da execução -> DataFrame da carteira (ou a mensagem de erro, em texto).
+    """
+    carteiras = {}
+    for execucao in execucoes:
+        try:
+            carteiras[execucao['id']] = gerar_carteira(
+                data_base, execucao['indicador_rentabilidade'], execucao['indicador_desconto'],
+                execucao['quantidade_acoes'], execucao['ranking_setorial'], execucao['maximo_por_setor'],
+                execucao['ponderacao']
+            )
+        except Exception as e:
+            logger.warning("Falha ao gerar a carteira %s: %s", execucao['id'], e)
+            carteiras[execucao['id']] = str(e)
+    return carteiras
+
+
+def _avaliar_execucao(execucao, carteira, diretorio, formato, max_workers):
+    """
+    Calcula o desempenho de uma carteira e grava a carteira e a série de retornos
+    (executada nos processos do pool).
+
+    Returns:
+        dict: Linha do resumo da execução.
+    """
+    inicio = time.perf_counter()
+    resumo = {
+        'id': execucao['id'],
+        'nome': execucao['nome'],
+        'data_base': execucao['data_base'],
+        'data_ini': execucao['data_ini'],
+        'data_fim': execucao['data_fim'],
+        'indicador_rentabilidade': execucao['indicador_rentabilidade'],
+        'indicador_desconto': execucao['indicador_desconto'],
+        'acoes': len(carteira),
+        'retorno_carteira': None,
+        'retorno_ibovespa': None,
+        'erro': None,
+    }
+    try:
+        gravar_tabela(carteira, os.path.join(diretorio, 'carteiras', execucao['id']), formato)
+        df_retornos = agrupar_dados(carteira, execucao['data_ini'], execucao['data_fim'], max_workers)
+        if df_retornos.empty:
+            resumo['erro'] = "Sem preços no período."
+        else:
+            gravar_tabela(df_retornos, os.path.join(diretorio, 'retornos', execucao['id']), formato)
+            resumo['retorno_carteira'] = float(df_retornos['retorno_acumulado_carteira'].iloc[-1])
+            resumo['retorno_ibovespa'] = float(df_retornos['retorno_acumulado_ibovespa'].iloc[-1])
+    except Exception as e:
+        logger.warning("Falha ao avaliar a execução %s: %s", execucao['id'], e)
+        resumo['erro'] = str(e)
+    resumo['duracao_s'] = time.perf_counter() - inicio
+    return resumo
+
+
+def _pre_carregar_precos(execucoes, carteiras, max_workers):
+    """
+    Baixa uma única vez, no processo principal, os preços de todos os tickers das carteiras.
+
+    Os processos do pool passam a encontrá-los no histórico local em disco (compartilhado),
+    em vez de repetir as mesmas consultas em paralelo.
+    """
+    tickers = list(dict.fromkeys(
+        ticker for carteira in carteiras.values() if isinstance(carteira, pd.DataFrame) and not carteira.empty
+        for ticker in carteira['ticker']
+    ))
+    if not tickers:
+        return
+    data_ini = min(execucao['data_ini'] for execucao in execucoes)
+    data_fim = max(execucao['data_fim'] for execucao in execucoes)
+    logger.info("Pré-carregando preços de %s tickers de %s a %s.", len(tickers), data_ini, data_fim)
+    pegar_preco_corrigido(tickers, data_ini, data_fim, max_workers)
+    pegar_dados_ibovespa(data_ini, data_fim)
+
+
+def executar_lote(execucoes, diretorio, formato='parquet', max_processos=None, max_workers=None):
+    """
+    Executa um lote de execuções em um pool de processos e grava os resultados.
+
+    Etapas: (1) carteiras geradas em paralelo, agrupadas por data base; (2) preços de todos os
+    tickers baixados uma vez, com o cache local ativo; (3) desempenho de cada carteira calculado
+    em paralelo e gravado em `diretorio/carteiras` e `diretorio/retornos`, mais um resumo.
+
+    Args:
+        execucoes (list): Execuções expandidas por carregar_tarefas.
+        diretorio (str): Diretório de saída.
+        formato (str): 'parquet' ou 'csv'.
+        max_processos (int): Número de processos (padrão: MAX_PROCESSOS, todos os núcleos).
+        max_workers (int): Consultas de preço simultâneas em cada processo (padrão: MAX_WORKERS).
+
+    Returns:
+        pd.DataFrame: Resumo com uma linha por execução.
+    """
+    verificar_formato(formato)
+    max_workers = validar_max_workers(max_workers)
+    por_data = {}
+    for execucao in execucoes:
+        por_data.setdefault(execucao['data_base'], []).append(execucao)
+    max_processos = max(1, min(max_processos or MAX_PROCESSOS, len(execucoes)))
+    logger.info("Executando lote de %s execuções (%s datas base) com %s processos.",
+                len(execucoes), len(por_data), max_processos)
+
+    inicio = time.perf_counter()
+    # Os processos dividem entre si a taxa da API (cada um tem o seu limitador)
+    with ProcessPoolExecutor(max_workers=max_processos, initializer=iniciar_trabalhador,
+                             initargs=(max_processos,)) as executor:
+        # 1. Carteiras, uma tarefa por data base
+        carteiras = {}
+        for resultado in executor.map(_gerar_carteiras_da_data, por_data.keys(), por_data.values()):
+            carteiras.update(resultado)
+
+        # 2. Preços compartilhados pelo cache em disco
+        if CACHE_ATIVO:
+            _pre_carregar_precos(execucoes, carteiras, max_workers)
+
+        # 3. Desempenho e gravação de cada execução
+        resumos = []
+        futuros = []
+        for execucao in execucoes:
+            carteira = carteiras.get(execucao['id'])
+            if not isinstance(carteira, pd.DataFrame) or carteira.empty:
+                erro = carteira if isinstance(carteira, str) else "Carteira vazia."
+                resumos.append({'id': execucao['id'], 'nome': execucao['nome'], 'data_base': execucao['data_base'],
+                                'acoes': 0, 'erro': erro})
+                continue
+            futuros.append(executor.submit(_avaliar_execucao, execucao, carteira, diretorio, formato,
+                                           max_workers))
+        resumos += [futuro.result() for futuro in futuros]
+
+    df_resumo = pd.DataFrame(resumos)
+    df_resumo = df_resumo.set_index('id').reindex([execucao['id'] for execucao in execucoes]).reset_index()
+    gravar_tabela(df_resumo, os.path.join(diretorio, 'resumo'), formato)
+    logger.info("Lote concluído em %.1fs: %s execuções, %s com erro.", time.perf_counter() - inicio,
+                len(df_resumo), int(df_resumo['erro'].notna().sum()))
+    return df_resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera carteiras e relatórios de desempenho em lote, sem a interface.")
+    parser.add_argument('arquivo', help="Arquivo JSON com as tarefas (ver backend.cli.carregar_tarefas).")
+    parser.add_argument('--saida', help="Diretório de saída (padrão: 'saida' do arquivo ou 'resultados').")
+    parser.add_argument('--formato', choices=FORMATOS, help="Formato dos arquivos (padrão: 'formato' do arquivo "
+                                                              "ou parquet).")
+    parser.add_argument('--max-processos', type=int, default=MAX_PROCESSOS, help="Processos do pool.")
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS,
+                        help="Consultas de preço simultâneas por processo.")
+    args = parser.parse_args()
+
+    configuracao, execucoes = carregar_tarefas(args.arquivo)
+    if not execucoes:
+        parser.error("O arquivo não tem tarefas.")
+    diretorio = args.saida or configuracao.get('saida', 'resultados')
+    formato = args.formato or configuracao.get('formato', 'parquet')
+
+    df_resumo = executar_lote(execucoes, diretorio, formato, args.max_processos, args.max_workers)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(df_resumo[['id', 'acoes', 'retorno_carteira', 'retorno_ibovespa', 'erro']].to_string(index=False))
+    print(f"Resultados gravados em {diretorio}")
+    if df_resumo['erro'].notna().any():
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
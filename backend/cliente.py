@@ -0,0 +1,248 @@
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from backend.config import (
+    API_BACKOFF, API_FIXTURES_DIR, API_MODO, API_RAJADA, API_TAXA, API_TENTATIVAS, API_TIMEOUT, API_URL,
+    MAX_WORKERS, TOKEN, obter_logger
+)
+from backend.metricas import metricas
+from backend.simulador import AdaptadorGravador, AdaptadorReplay, criar_simulador
+
+logger = obter_logger(__name__)
+
+# Status HTTP transitórios que levam a uma nova tentativa
+STATUS_RETENTAVEIS = (429, 500, 502, 503, 504)
+
+
+class LimitadorTaxa:
+    """
+    Limitador de taxa do tipo token bucket, seguro para uso entre threads.
+
+    O balde começa cheio com `capacidade` fichas e é reabastecido a `taxa` fichas por segundo.
+    Cada requisição consome uma ficha; sem fichas disponíveis, a chamada aguarda.
+    """
+
+    def __init__(self, taxa, capacidade):
+        """
+        Args:
+            taxa (float): Fichas repostas por segundo (requisições por segundo em regime).
+            capacidade (int): Número máximo de fichas acumuladas (tamanho da rajada).
+        """
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._fichas = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        """
+        Bloqueia até haver uma ficha disponível e a consome.
+        """
+        if self.taxa <= 0:
+            return
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.taxa
+            time.sleep(espera)
+
+
+class ClienteAPI:
+    """
+    Cliente HTTP compartilhado para a API do Laboratório de Finanças.
+
+    Mantém uma única `requests.Session` com pool de conexões keep-alive, cabeçalho de
+    autenticação fixo, compressão gzip, novas tentativas com backoff exponencial para
+    erros transitórios (429 e 5xx) e limitação de taxa no lado do cliente. Cada tentativa,
+    inclusive as novas, consome uma ficha do limitador.
+    """
+
+    def __init__(self, url_base, token, timeout, tentativas, backoff, taxa, rajada, tamanho_pool,
+                 simulador=None, diretorio_gravacao=None):
+        """
+        Args:
+            url_base (str): URL base da API (ex.: 'https://laboratoriodefinancas.com/api/v1').
+            token (str): Token JWT de acesso.
+            timeout (float): Tempo máximo, em segundos, de cada requisição.
+            tentativas (int): Número máximo de novas tentativas em erros transitórios.
+            backoff (float): Fator do backoff exponencial entre tentativas, em segundos.
+            taxa (float): Requisições por segundo permitidas (0 desativa o limitador).
+            rajada (int): Requisições que podem ser feitas de uma vez antes do limitador atuar.
+            tamanho_pool (int): Número de conexões mantidas abertas no pool.
+            simulador (SimuladorAPI): Se informado, as respostas vêm do simulador local, sem rede.
+            diretorio_gravacao (str): Se informado, as respostas da API real são gravadas neste diretório.
+        """
+        self.url_base = url_base.rstrip('/')
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.backoff = backoff
+        self.limitador = LimitadorTaxa(taxa, rajada)
+
+        # As novas tentativas ficam em get() (e não no adaptador) para passarem pelo limitador
+        if simulador is not None:
+            adaptador = AdaptadorReplay(simulador)
+        elif diretorio_gravacao:
+            adaptador = AdaptadorGravador(diretorio_gravacao, pool_connections=tamanho_pool,
+                                          pool_maxsize=tamanho_pool)
+        else:
+            adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool)
+
+        self.sessao = requests.Session()
+        self.sessao.mount('https://', adaptador)
+        self.sessao.mount('http://', adaptador)
+        self.sessao.headers.update({
+            'Authorization': f'JWT {token}',
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+
+    def _espera_nova_tentativa(self, tentativa, response=None):
+        """
+        Calcula a espera antes da próxima tentativa: o cabeçalho Retry-After da resposta, se houver
+        (em segundos ou como data HTTP), ou o backoff exponencial.
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        return self.backoff * (2 ** tentativa)
+
+    def get(self, endpoint, params):
+        """
+        Faz uma requisição GET a um endpoint da API respeitando o limite de taxa.
+
+        Erros transitórios (429 e 5xx) e falhas de conexão levam a até `tentativas` novas tentativas,
+        respeitando o Retry-After; cada tentativa aguarda uma ficha do limitador, então as novas
+        tentativas também contam no limite de taxa. Esgotadas as tentativas, a última resposta é
+        devolvida para que o chamador registre o erro.
+
+        A resposta é aberta em modo streaming: o corpo é lido sob demanda (ver backend.leitura).
+        O tempo de espera do limitador, o tempo até cada resposta, as novas tentativas e o status
+        ficam registrados em backend.metricas.
+
+        Args:
+            endpoint (str): Nome do endpoint (ex.: 'planilhao').
+            params (dict): Parâmetros da consulta.
+
+        Returns:
+            requests.Response: Resposta da API.
+        """
+        tentativa = 0
+        while True:
+            with metricas.cronometro(f"api.{endpoint}.espera_ms"):
+                self.limitador.aguardar()
+            try:
+                with metricas.cronometro(f"api.{endpoint}.resposta_ms"):
+                    response = self.sessao.get(f"{self.url_base}/{endpoint}", params=params,
+                                               timeout=self.timeout, stream=True)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if tentativa >= self.tentativas:
+                    raise
+                espera = self._espera_nova_tentativa(tentativa)
+                logger.warning("Falha de conexão em %s (%s); nova tentativa em %.2fs.", endpoint, e, espera)
+            else:
+                metricas.incrementar(f"api.{endpoint}.status.{response.status_code}")
+                if response.status_code not in STATUS_RETENTAVEIS or tentativa >= self.tentativas:
+                    return response
+                espera = self._espera_nova_tentativa(tentativa, response)
+                logger.warning("Status %s em %s; nova tentativa em %.2fs.", response.status_code, endpoint, espera)
+                response.close()
+            metricas.incrementar(f"api.{endpoint}.novas_tentativas")
+            tentativa += 1
+            time.sleep(espera)
+
+
+_cliente = None
+_lock_cliente = threading.Lock()
+_processos = 1  # Processos de um pool que dividem a taxa da API (ver iniciar_trabalhador)
+
+
+def _reiniciar_apos_fork():
+    """
+    Descarta, no processo filho, o cliente e o lock herdados do pai: as conexões do pool e o
+    estado do limitador pertencem ao pai, então o filho cria o seu cliente no primeiro acesso.
+    """
+    global _cliente, _lock_cliente
+    _cliente = None
+    _lock_cliente = threading.Lock()
+
+
+# Processos criados por fork (ex.: backtest, cli) não podem usar a sessão aberta pelo pai
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reiniciar_apos_fork)
+
+
+def obter_cliente():
+    """
+    Retorna o cliente compartilhado da API, criando-o na primeira chamada.
+
+    O modo de acesso segue API_MODO: 'real' (rede), 'gravar' (rede, gravando as respostas
+    em API_FIXTURES_DIR) ou 'reproduzir' (respostas do simulador local, sem rede nem token).
+    Em processos de um pool (ver iniciar_trabalhador), a taxa e a rajada são divididas entre eles.
+
+    Returns:
+        ClienteAPI: Cliente único do processo.
+    """
+    global _cliente
+    if _cliente is None:
+        with _lock_cliente:
+            if _cliente is None:
+                if API_MODO not in ('real', 'gravar', 'reproduzir'):
+                    raise ValueError(f"API_MODO inválido: {API_MODO}. Use 'real', 'gravar' ou 'reproduzir'.")
+                if not TOKEN and API_MODO != 'reproduzir':
+                    logger.error("Token de autenticação não encontrado no arquivo .env.")
+                    raise ValueError("Token de autenticação não encontrado no arquivo .env.")
+                logger.info("Criando cliente da API para %s (modo %s)", API_URL, API_MODO)
+                _cliente = ClienteAPI(
+                    url_base=API_URL,
+                    token=TOKEN,
+                    timeout=API_TIMEOUT,
+                    tentativas=API_TENTATIVAS,
+                    backoff=API_BACKOFF,
+                    taxa=API_TAXA / _processos,
+                    rajada=max(1, API_RAJADA // _processos),
+                    tamanho_pool=max(MAX_WORKERS, 1),
+                    simulador=criar_simulador() if API_MODO == 'reproduzir' else None,
+                    diretorio_gravacao=API_FIXTURES_DIR if API_MODO == 'gravar' else None,
+                )
+    return _cliente
+
+
+def definir_cliente(cliente):
+    """
+    Substitui o cliente compartilhado do processo (ex.: por um cliente ligado a um simulador).
+
+    Args:
+        cliente (ClienteAPI | None): Novo cliente; None faz o próximo acesso recriá-lo pelo .env.
+    """
+    global _cliente
+    with _lock_cliente:
+        _cliente = cliente
+
+
+def iniciar_trabalhador(processos):
+    """
+    Inicializa um processo de um pool (ProcessPoolExecutor) que acessa a API.
+
+    Cada processo tem o seu próprio limitador, então a taxa é dividida entre os `processos` do
+    pool para que, somados, eles respeitem API_TAXA. O cliente herdado do pai é descartado.
+
+    Args:
+        processos (int): Número de processos do pool.
+    """
+    global _processos
+    _processos = max(1, int(processos))
+    definir_cliente(None)
@@ -1,36 +1,85 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-import logging
+from backend.log import configurar_logs, obter_logger
 
 # Diretórios base do projeto
 BASE_DIR = Path(__file__).parent.parent.resolve()
 BACK_DIR = str(BASE_DIR / "backend")
 FRONT_DIR = str(BASE_DIR / "frontend")
 LOG_DIR = str(BASE_DIR / "logs")
+CACHE_DIR = str(BASE_DIR / "cache")
+FIXTURES_DIR = str(BASE_DIR / "fixtures")
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 TOKEN = os.getenv("TOKEN")  # Token da API
 
-# Configuração de logs
-LOG_FILE = LOG_DIR + "/app.log"
+# Cliente HTTP da API do Laboratório de Finanças
+API_URL = os.getenv("API_URL", "https://laboratoriodefinancas.com/api/v1")
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "30"))  # Tempo máximo (s) de cada requisição
+API_TENTATIVAS = int(os.getenv("API_TENTATIVAS", "3"))  # Novas tentativas em erros 429/5xx
+API_BACKOFF = float(os.getenv("API_BACKOFF", "0.5"))  # Fator do backoff exponencial (s)
+API_TAXA = float(os.getenv("API_TAXA", "10"))  # Requisições por segundo (0 = sem limite)
+API_RAJADA = int(os.getenv("API_RAJADA", "10"))  # Requisições permitidas em rajada
+
+# Modo da API: 'real' (rede), 'gravar' (rede + grava respostas) ou 'reproduzir' (offline)
+API_MODO = os.getenv("API_MODO", "real")
+API_FIXTURES_DIR = os.getenv("API_FIXTURES_DIR", FIXTURES_DIR)  # Respostas gravadas
+SIMULADOR_TICKERS = int(os.getenv("SIMULADOR_TICKERS", "0"))  # Tickers sintéticos (0 = apenas gravações)
+SIMULADOR_LATENCIA = float(os.getenv("SIMULADOR_LATENCIA", "0"))  # Latência injetada (s) por resposta
+
+# Número máximo de consultas simultâneas à API de preços (1 = sequencial)
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "8"))
+
+# Número máximo de processos usados em cálculos paralelos (ex.: backtest)
+MAX_PROCESSOS = int(os.getenv("MAX_PROCESSOS", str(os.cpu_count() or 1)))
+
+# Cache local das respostas da API
+CACHE_ATIVO = os.getenv("CACHE_ATIVO", "1") != "0"
+CACHE_TTL_HOJE = int(os.getenv("CACHE_TTL_HOJE", "900"))  # Validade (s) de respostas que incluem o dia atual
+CACHE_TAMANHO_MAX_MB = int(os.getenv("CACHE_TAMANHO_MAX_MB", "512"))  # Tamanho máximo do cache em disco
+
+# Armazém local de preços mapeado em memória (ver backend.armazem); depende de CACHE_ATIVO
+ARMAZEM_ATIVO = os.getenv("ARMAZEM_ATIVO", "1") != "0"
+ARMAZEM_DATA_INI = os.getenv("ARMAZEM_DATA_INI", "2000-01-03")  # Primeira data armazenada
 
-# Garante que o diretório de logs existe
-os.makedirs(LOG_DIR, exist_ok=True)
+# Memória compartilhada entre sessões para resultados intermediários (planilhão e rankings)
+MEMORIA_ATIVA = os.getenv("MEMORIA_ATIVA", "1") != "0"
+MEMORIA_TAMANHO_MAX_MB = int(os.getenv("MEMORIA_TAMANHO_MAX_MB", "256"))  # Memória máxima ocupada
+
+# Aquecimento em segundo plano dos caches (ver backend.aquecimento)
+AQUECIMENTO_ATIVO = os.getenv("AQUECIMENTO_ATIVO", "0") == "1"  # Inicia junto com o app
+AQUECIMENTO_HORARIOS = os.getenv("AQUECIMENTO_HORARIOS", "07:30,19:00")  # Horários diários (HH:MM)
+AQUECIMENTO_DIAS = int(os.getenv("AQUECIMENTO_DIAS", "2"))  # Pregões recentes pré-calculados
+AQUECIMENTO_CARTEIRAS = os.getenv("AQUECIMENTO_CARTEIRAS", "roe:earning_yield")  # rentabilidade:desconto
+AQUECIMENTO_QUANTIDADE = os.getenv("AQUECIMENTO_QUANTIDADE", "10")  # Ações por carteira (ex.: 10,20)
+AQUECIMENTO_DATA_INI = os.getenv("AQUECIMENTO_DATA_INI", "2024-01-02")  # Início do histórico de preços
+AQUECIMENTO_MAX_WORKERS = int(os.getenv("AQUECIMENTO_MAX_WORKERS", "2"))  # Consultas de preço simultâneas
+
+# Gráficos (ver views.gerar_grafico)
+GRAFICO_PONTOS_MAX = int(os.getenv("GRAFICO_PONTOS_MAX", "1500"))  # Pontos por série após a redução (LTTB)
+GRAFICO_LIMITE_WEBGL = int(os.getenv("GRAFICO_LIMITE_WEBGL", "5000"))  # Total de pontos que ativa o WebGL
+
+# Métricas de latência e volume (ver backend.metricas)
+METRICAS_ATIVAS = os.getenv("METRICAS_ATIVAS", "1") != "0"
+METRICAS_ADMIN = os.getenv("METRICAS_ADMIN", "0") == "1"  # Exibe a página de administração no menu
+METRICAS_ARQUIVO = os.getenv("METRICAS_ARQUIVO", "")  # JSON gravado ao encerrar o processo (vazio = não grava)
+
+# Configuração de logs: escrita em segundo plano, com rotação e níveis por módulo (ver backend.log)
+LOG_FILE = LOG_DIR + "/app.log"
+LOG_NIVEL = os.getenv("LOG_NIVEL", "INFO")  # Nível padrão
+LOG_NIVEIS = os.getenv("LOG_NIVEIS", "")  # Níveis por módulo (ex.: backend.cache=WARNING,backend.views=DEBUG)
+LOG_FORMATO = os.getenv("LOG_FORMATO", "texto")  # 'texto' ou 'json' (um objeto por linha)
+LOG_TAMANHO_MAX_MB = float(os.getenv("LOG_TAMANHO_MAX_MB", "10"))  # Tamanho que dispara a rotação (0 = sem rotação)
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))  # Arquivos antigos mantidos na rotação
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    filename=LOG_FILE,  # Nome do arquivo de log
-    filemode="a",  # Modo de escrita no arquivo (append)
-)
+configurar_logs(LOG_FILE, LOG_NIVEL, LOG_NIVEIS, LOG_FORMATO, LOG_TAMANHO_MAX_MB, LOG_BACKUPS)
 
-logger = logging.getLogger(__name__)
+logger = obter_logger(__name__)
 
-# Validações básicas
-if not TOKEN:
-    logger.error("Token de autenticação não encontrado no arquivo .env.")
-    raise ValueError("Token de autenticação não encontrado no arquivo .env.")
+# Validações básicas (o token só é exigido ao acessar a API real; ver backend.cliente)
+if not TOKEN and API_MODO != "reproduzir":
+    logger.warning("Token de autenticação não encontrado no arquivo .env.")
 
 logger.info("Configuração carregada com sucesso.")
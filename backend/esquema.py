@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from backend.config import obter_logger
+
+logger = obter_logger(__name__)
+
+# Colunas do planilhão usadas pelo sistema
+COLUNAS_PLANILHAO = ['ticker', 'setor', 'volume', 'roc', 'roe', 'roic', 'earning_yield', 'dividend_yield', 'p_vp']
+
+# Colunas de texto com muitos valores repetidos, armazenadas como categorias
+COLUNAS_CATEGORICAS = ['ticker', 'setor']
+
+# Colunas que mantêm precisão dupla (valores de grande magnitude)
+COLUNAS_PRECISAO_DUPLA = ['volume']
+
+
+def validar_colunas(df, colunas, nome):
+    """
+    Verifica se o DataFrame contém as colunas esperadas.
+
+    Args:
+        df (pd.DataFrame): DataFrame a ser validado.
+        colunas (list): Colunas obrigatórias.
+        nome (str): Nome do conjunto de dados, usado na mensagem de erro.
+
+    Raises:
+        ValueError: Se alguma coluna obrigatória estiver ausente.
+    """
+    ausentes = [coluna for coluna in colunas if coluna not in df.columns]
+    if ausentes:
+        logger.error("Colunas ausentes no %s: %s", nome, ausentes)
+        raise ValueError(f"Colunas ausentes no {nome}: {ausentes}")
+
+
+def converter_float32(serie, tolerancia=1e-6):
+    """
+    Converte uma série float64 para float32 quando a conversão não perde precisão relevante.
+
+    Args:
+        serie (pd.Series): Série numérica em float64.
+        tolerancia (float): Erro relativo máximo aceito na conversão.
+
+    Returns:
+        pd.Series: Série em float32, ou a série original se a conversão não for segura.
+    """
+    valores = serie.to_numpy()
+    with np.errstate(over='ignore'):
+        convertidos = valores.astype(np.float32)
+    if np.allclose(convertidos, valores, rtol=tolerancia, atol=0.0, equal_nan=True):
+        return pd.Series(convertidos, index=serie.index, name=serie.name)
+    return serie
+
+
+def otimizar_planilhao(df):
+    """
+    Valida o planilhão e converte suas colunas para tipos compactos.
+
+    Tickers, setores e demais textos repetitivos viram categorias, indicadores float64 viram
+    float32 quando seguro e inteiros são reduzidos ao menor tipo possível. O uso de memória
+    antes e depois da conversão é registrado no log e em `df.attrs['memoria']`.
+
+    Args:
+        df (pd.DataFrame): Planilhão bruto retornado pela API.
+
+    Returns:
+        pd.DataFrame: Planilhão com tipos compactos.
+    """
+    if df.empty:
+        return df
+    validar_colunas(df, COLUNAS_PLANILHAO, "planilhão")
+
+    memoria_antes = int(df.memory_usage(deep=True).sum())
+    colunas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if coluna in COLUNAS_CATEGORICAS or (serie.dtype == object and serie.nunique() <= len(serie) // 2):
+            serie = serie.astype('category')
+        elif serie.dtype == np.float64 and coluna not in COLUNAS_PRECISAO_DUPLA:
+            serie = converter_float32(serie)
+        elif pd.api.types.is_integer_dtype(serie.dtype):
+            serie = pd.to_numeric(serie, downcast='integer')
+        colunas[coluna] = serie
+    df_otimizado = pd.DataFrame(colunas, index=df.index)
+
+    memoria_depois = int(df_otimizado.memory_usage(deep=True).sum())
+    df_otimizado.attrs['memoria'] = {'antes': memoria_antes, 'depois': memoria_depois}
+    logger.info("Memória do planilhão: %.1f KB -> %.1f KB "
+                "(%.1fx menor)", memoria_antes / 1024, memoria_depois / 1024,
+                memoria_antes / max(memoria_depois, 1))
+    return df_otimizado
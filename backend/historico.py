@@ -0,0 +1,204 @@
+import os
+import pickle
+import threading
+from datetime import date, timedelta
+import pandas as pd
+from backend.calendario import dia_util_anterior, dias_uteis_entre
+from backend.config import CACHE_ATIVO, CACHE_DIR, obter_logger
+
+logger = obter_logger(__name__)
+
+
+def unir_intervalos(intervalos):
+    """
+    Une intervalos de datas sobrepostos ou adjacentes.
+
+    Args:
+        intervalos (list): Lista de tuplas (data_ini, data_fim) do tipo datetime.date.
+
+    Returns:
+        list: Intervalos ordenados e sem sobreposição.
+    """
+    unidos = []
+    for ini, fim in sorted(intervalos):
+        if unidos and ini <= unidos[-1][1] + timedelta(days=1):
+            unidos[-1] = (unidos[-1][0], max(unidos[-1][1], fim))
+        else:
+            unidos.append((ini, fim))
+    return unidos
+
+
+def calcular_lacunas(intervalos, data_ini, data_fim):
+    """
+    Calcula os trechos de [data_ini, data_fim] que não estão cobertos pelos intervalos.
+
+    Args:
+        intervalos (list): Intervalos já cobertos, ordenados e sem sobreposição.
+        data_ini (datetime.date): Data inicial desejada.
+        data_fim (datetime.date): Data final desejada.
+
+    Returns:
+        list: Lista de tuplas (data_ini, data_fim) ainda não cobertas.
+    """
+    lacunas = []
+    inicio = data_ini
+    for ini, fim in intervalos:
+        if fim < inicio:
+            continue
+        if ini > data_fim:
+            break
+        if ini > inicio:
+            lacunas.append((inicio, ini - timedelta(days=1)))
+        inicio = max(inicio, fim + timedelta(days=1))
+        if inicio > data_fim:
+            break
+    if inicio <= data_fim:
+        lacunas.append((inicio, data_fim))
+    return lacunas
+
+
+def calcular_cobertos(respostas, hoje=None):
+    """
+    Define até onde cada lacuna consultada pode ser marcada como coberta.
+
+    Trechos anteriores ao último pregão fechado são cobertos por inteiro, mesmo sem preços
+    (ex.: ação ainda não listada). A partir desse pregão os dados podem ainda não ter sido
+    publicados, então só conta como coberto o que a API de fato devolveu; o dia atual nunca é coberto.
+
+    Args:
+        respostas (list): Tuplas ((data_ini, data_fim), DataFrame ou None se a lacuna não foi consultada).
+        hoje (datetime.date): Data atual (opcional, para testes).
+
+    Returns:
+        list: Intervalos (data_ini, data_fim) que podem ser marcados como cobertos.
+    """
+    ultimo_fechado = (hoje or date.today()) - timedelta(days=1)
+    publicacao = dia_util_anterior(ultimo_fechado)
+    cobertos = []
+    for (ini, fim), df in respostas:
+        fim = min(fim, ultimo_fechado)
+        if fim >= publicacao:
+            limite = publicacao - timedelta(days=1)
+            if df is not None and not df.empty:
+                limite = max(limite, pd.to_datetime(df['data']).max().date())
+            fim = min(fim, limite)
+        if ini <= fim:
+            cobertos.append((ini, fim))
+    return cobertos
+
+
+class HistoricoPrecos:
+    """
+    Armazém incremental de séries de preços por ticker.
+
+    Cada série é gravada em disco junto com os intervalos de datas já consultados na API.
+    Um novo pedido busca apenas os trechos ainda não cobertos e os incorpora à série.
+    O dia atual nunca é marcado como coberto, pois o preço de hoje ainda pode mudar, e o último
+    pregão fechado só é coberto depois que a API devolve os seus preços.
+    """
+
+    def __init__(self, diretorio, ativo=True):
+        """
+        Args:
+            diretorio (str): Diretório onde as séries são gravadas.
+            ativo (bool): Se False, toda consulta vai direto à API, sem armazenamento.
+        """
+        self.diretorio = diretorio
+        self.ativo = ativo
+        self._lock = threading.Lock()
+        self._locks_series = {}
+
+    def _lock_serie(self, chave):
+        """
+        Retorna o lock exclusivo de uma série, criando-o se necessário.
+        """
+        with self._lock:
+            return self._locks_series.setdefault(chave, threading.Lock())
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, chave.replace('/', '__') + '.pkl')
+
+    def _carregar(self, chave):
+        """
+        Lê a série e os intervalos cobertos do disco.
+
+        Returns:
+            tuple: (DataFrame da série, lista de intervalos cobertos).
+        """
+        caminho = self._caminho(chave)
+        if not os.path.exists(caminho):
+            return pd.DataFrame(), []
+        try:
+            with open(caminho, 'rb') as arquivo:
+                conteudo = pickle.load(arquivo)
+            return conteudo['dados'], conteudo['intervalos']
+        except Exception as e:
+            logger.warning("Histórico de %s ilegível, será recriado: %s", chave, e)
+            return pd.DataFrame(), []
+
+    def _gravar(self, chave, dados, intervalos):
+        """
+        Grava a série em disco de forma atômica.
+        """
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self._caminho(chave)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'wb') as arquivo:
+            pickle.dump({'dados': dados, 'intervalos': intervalos}, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+
+    def obter(self, chave, data_ini, data_fim, consultar):
+        """
+        Retorna a série no período pedido, consultando a API apenas nas lacunas.
+
+        Args:
+            chave (str): Identificador da série (ex.: 'preco-corrigido/PETR4').
+            data_ini (str): Data inicial no formato 'YYYY-MM-DD'.
+            data_fim (str): Data final no formato 'YYYY-MM-DD'.
+            consultar (callable): Função (data_ini, data_fim) -> pd.DataFrame que consulta a API.
+
+        Returns:
+            pd.DataFrame: Preços do período, ordenados por data.
+        """
+        if not self.ativo:
+            return consultar(data_ini, data_fim)
+
+        ini = date.fromisoformat(data_ini)
+        fim = date.fromisoformat(data_fim)
+        with self._lock_serie(chave):
+            dados, intervalos = self._carregar(chave)
+            lacunas = calcular_lacunas(intervalos, ini, fim)
+
+            if lacunas:
+                respostas = []
+                for lacuna_ini, lacuna_fim in lacunas:
+                    # Lacunas só com feriados e fins de semana (ex.: sábado e domingo) não têm preços
+                    if dias_uteis_entre(lacuna_ini, lacuna_fim + timedelta(days=1)) == 0:
+                        respostas.append(((lacuna_ini, lacuna_fim), None))
+                        continue
+                    logger.debug("Histórico de %s: buscando lacuna de %s a %s", chave, lacuna_ini, lacuna_fim)
+                    respostas.append(((lacuna_ini, lacuna_fim), consultar(lacuna_ini.isoformat(), lacuna_fim.isoformat())))
+
+                # Incorpora os novos dados, priorizando os mais recentes em caso de data repetida
+                partes = [df for df in [dados, *(novo for _, novo in respostas if novo is not None)] if not df.empty]
+                if partes:
+                    dados = pd.concat(partes, ignore_index=True)
+                    dados = (
+                        dados.drop_duplicates(subset='data', keep='last')
+                        .sort_values(by='data')
+                        .reset_index(drop=True)
+                    )
+
+                intervalos = unir_intervalos(intervalos + calcular_cobertos(respostas))
+                self._gravar(chave, dados, intervalos)
+            else:
+                logger.debug("Histórico de %s já cobre o período de %s a %s", chave, data_ini, data_fim)
+
+        if dados.empty:
+            return pd.DataFrame()
+        datas = dados['data'].astype(str).str[:10]
+        return dados[(datas >= data_ini) & (datas <= data_fim)].reset_index(drop=True)
+
+
+# Instância compartilhada pelo processo
+historico_precos = HistoricoPrecos(os.path.join(CACHE_DIR, "historico"), ativo=CACHE_ATIVO)
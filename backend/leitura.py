@@ -0,0 +1,264 @@
+import codecs
+import json
+import re
+from array import array
+import numpy as np
+import pandas as pd
+
+# Tamanho dos blocos lidos da resposta HTTP
+TAMANHO_BLOCO = 64 * 1024
+
+_ESPACOS = ' \t\n\r'
+_SEPARADORES = re.compile(r'[\s,]*')
+_decodificador_json = json.JSONDecoder()
+
+
+class ErroLeituraJSON(ValueError):
+    """
+    Erro de formato ao ler o corpo JSON de uma resposta da API.
+    """
+
+
+def _pular_espacos(texto, posicao):
+    while posicao < len(texto) and texto[posicao] in _ESPACOS:
+        posicao += 1
+    return posicao
+
+
+def iterar_lotes_registros(blocos, chave='dados'):
+    """
+    Percorre incrementalmente os objetos do array `chave` de um documento JSON.
+
+    O documento é lido bloco a bloco e os objetos completos de cada bloco são entregues
+    juntos, sem que o corpo inteiro ou a lista completa de registros fique em memória.
+
+    Args:
+        blocos (iterable): Blocos de bytes do corpo da resposta (ex.: response.iter_content()).
+        chave (str): Chave do array de registros no objeto raiz.
+
+    Yields:
+        list: Registros (dicionários) completados a cada bloco lido, na ordem do documento.
+    """
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    marcador = f'"{chave}"'
+    texto = ''
+    posicao = 0
+    dentro_do_array = False
+    iterador = iter(blocos)
+    fim_dos_dados = False
+
+    while True:
+        if not dentro_do_array:
+            inicio = texto.find(marcador, posicao)
+            if inicio >= 0:
+                cursor = _pular_espacos(texto, inicio + len(marcador))
+                if cursor < len(texto) and texto[cursor] == ':':
+                    cursor = _pular_espacos(texto, cursor + 1)
+                    if cursor < len(texto):
+                        if texto[cursor] == 'n':
+                            return  # "dados": null
+                        if texto[cursor] != '[':
+                            raise ErroLeituraJSON(f"O campo '{chave}' não é uma lista.")
+                        dentro_do_array = True
+                        posicao = cursor + 1
+                elif cursor < len(texto):
+                    posicao = inicio + len(marcador)  # Ocorrência do texto que não é a chave
+                    continue
+            else:
+                # Mantém o final do texto, que pode conter parte do marcador
+                posicao = max(posicao, len(texto) - len(marcador))
+
+        if dentro_do_array:
+            lote = []
+            while True:
+                posicao = _SEPARADORES.match(texto, posicao).end()
+                if posicao >= len(texto):
+                    break
+                if texto[posicao] == ']':
+                    if lote:
+                        yield lote
+                    return
+                try:
+                    registro, posicao = _decodificador_json.raw_decode(texto, posicao)
+                except json.JSONDecodeError:
+                    if fim_dos_dados:
+                        raise ErroLeituraJSON(f"JSON inválido ou incompleto na posição {posicao}.")
+                    break  # Registro incompleto: aguarda o próximo bloco
+                lote.append(registro)
+            if lote:
+                yield lote
+
+        if fim_dos_dados:
+            raise ErroLeituraJSON(f"Campo '{chave}' não encontrado ou lista não encerrada.")
+
+        # Descarta o texto já consumido e lê o próximo bloco
+        texto = texto[posicao:]
+        posicao = 0
+        bloco = next(iterador, None)
+        if bloco is None:
+            texto += decodificador.decode(b'', final=True)
+            fim_dos_dados = True
+        else:
+            texto += decodificador.decode(bloco)
+
+
+def iterar_registros(blocos, chave='dados'):
+    """
+    Percorre, um a um, os objetos do array `chave` de um documento JSON lido em blocos.
+
+    Args:
+        blocos (iterable): Blocos de bytes do corpo da resposta.
+        chave (str): Chave do array de registros no objeto raiz.
+
+    Yields:
+        dict: Cada registro do array, na ordem do documento.
+    """
+    for lote in iterar_lotes_registros(blocos, chave):
+        yield from lote
+
+
+class BuffersColunas:
+    """
+    Acumula registros em buffers tipados por coluna, no lugar de uma lista de dicionários.
+
+    Números ficam em `array` compactos (int64 ou float64) e só viram listas de objetos se a
+    coluna tiver valores de outro tipo ou inteiros fora do int64. Campos ausentes são preenchidos com nulo.
+    """
+
+    def __init__(self):
+        self._colunas = {}
+        self._tamanho = 0
+
+    def __len__(self):
+        return self._tamanho
+
+    def _nova_coluna(self, valor):
+        """
+        Cria o buffer de uma coluna nova, preenchendo com nulo os registros anteriores.
+        """
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            return [None] * self._tamanho
+        if isinstance(valor, int) and self._tamanho == 0:
+            return array('q')
+        return array('d', [np.nan]) * self._tamanho
+
+    def _adicionar_valor(self, nome, buffer, valor):
+        """
+        Acrescenta um valor ao buffer, promovendo o tipo da coluna quando necessário.
+        """
+        if isinstance(buffer, array):
+            if valor is None:
+                if buffer.typecode == 'q':
+                    buffer = self._colunas[nome] = array('d', buffer)
+                valor = np.nan
+            elif buffer.typecode == 'q' and isinstance(valor, float):
+                buffer = self._colunas[nome] = array('d', buffer)
+            elif isinstance(valor, (str, list, dict)):
+                buffer = self._colunas[nome] = buffer.tolist()
+        try:
+            buffer.append(valor)
+        except OverflowError:
+            # Inteiro fora do int64 (ou do float64): a coluna passa a objetos, sem perder precisão
+            buffer = self._colunas[nome] = buffer.tolist()
+            buffer.append(valor)
+
+    def adicionar(self, registro):
+        """
+        Acrescenta um registro (dicionário) aos buffers.
+        """
+        for nome, valor in registro.items():
+            buffer = self._colunas.get(nome)
+            if buffer is None:
+                buffer = self._colunas[nome] = self._nova_coluna(valor)
+            self._adicionar_valor(nome, buffer, valor)
+        self._tamanho += 1
+
+        # Completa com nulo as colunas que não vieram neste registro
+        if len(registro) != len(self._colunas):
+            for nome, buffer in list(self._colunas.items()):
+                if len(buffer) < self._tamanho:
+                    self._adicionar_valor(nome, buffer, None)
+
+    def adicionar_lote(self, registros):
+        """
+        Acrescenta vários registros de uma vez.
+
+        Quando todos os registros têm as mesmas colunas já conhecidas, cada coluna é estendida
+        de uma só vez; caso contrário, os registros são acrescentados um a um.
+        """
+        if not registros:
+            return
+        nomes = self._colunas.keys()
+        if self._colunas and all(registro.keys() == nomes for registro in registros):
+            try:
+                for nome, buffer in self._colunas.items():
+                    buffer.extend([registro[nome] for registro in registros])
+            except (TypeError, OverflowError):
+                # Algum valor exige promover o tipo da coluna: desfaz e segue registro a registro.
+                # Todas as colunas são cortadas, inclusive a que falhou: array.extend já terá
+                # acrescentado os valores anteriores ao que não coube no tipo.
+                for buffer in self._colunas.values():
+                    del buffer[self._tamanho:]
+            else:
+                self._tamanho += len(registros)
+                return
+        for registro in registros:
+            self.adicionar(registro)
+
+    def para_dataframe(self):
+        """
+        Monta o DataFrame a partir dos buffers. As colunas numéricas são lidas dos arrays sem
+        conversão por valor; o pandas ainda as copia uma vez ao consolidá-las em blocos.
+
+        Returns:
+            pd.DataFrame: DataFrame com uma coluna por campo dos registros.
+        """
+        colunas = {}
+        for nome, buffer in self._colunas.items():
+            if isinstance(buffer, array):
+                colunas[nome] = np.frombuffer(buffer, dtype=np.int64 if buffer.typecode == 'q' else np.float64)
+            else:
+                colunas[nome] = np.array(buffer, dtype=object)
+        return pd.DataFrame(colunas, copy=False)
+
+
+def iterar_lotes(response, tamanho_lote=5000, chave='dados'):
+    """
+    Lê a resposta em streaming e entrega DataFrames parciais assim que cada lote é completado.
+
+    Args:
+        response (requests.Response): Resposta obtida com stream=True.
+        tamanho_lote (int): Número de registros por DataFrame.
+        chave (str): Chave do array de registros no JSON.
+
+    Yields:
+        pd.DataFrame: Lotes consecutivos de registros.
+    """
+    buffers = BuffersColunas()
+    for registros in iterar_lotes_registros(response.iter_content(chunk_size=TAMANHO_BLOCO), chave):
+        buffers.adicionar_lote(registros)
+        if len(buffers) >= tamanho_lote:
+            yield buffers.para_dataframe()
+            buffers = BuffersColunas()
+    if len(buffers):
+        yield buffers.para_dataframe()
+
+
+def ler_dados(response, chave='dados'):
+    """
+    Lê a resposta em streaming direto para buffers por coluna e monta o DataFrame final.
+
+    O pico de memória fica próximo do tamanho do DataFrame final, pois nem o corpo completo
+    nem a lista de dicionários decodificada são mantidos em memória.
+
+    Args:
+        response (requests.Response): Resposta obtida com stream=True.
+        chave (str): Chave do array de registros no JSON.
+
+    Returns:
+        pd.DataFrame: DataFrame com todos os registros.
+    """
+    buffers = BuffersColunas()
+    for registros in iterar_lotes_registros(response.iter_content(chunk_size=TAMANHO_BLOCO), chave):
+        buffers.adicionar_lote(registros)
+    return buffers.para_dataframe()
@@ -0,0 +1,173 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+from multiprocessing import util
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+FORMATO_TEXTO = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+FORMATOS = ('texto', 'json')
+
+
+class FormatadorJSON(logging.Formatter):
+    """
+    Formata cada registro como um objeto JSON por linha, para ingestão por ferramentas de análise.
+    """
+
+    def format(self, record):
+        registro = {
+            'data': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'modulo': record.name,
+            'mensagem': record.getMessage(),
+            'processo': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            registro['excecao'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            registro['excecao'] = record.exc_text
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+class ManipuladorFila(QueueHandler):
+    """
+    Coloca os registros na fila com a mensagem já montada (os argumentos podem mudar depois da
+    chamada), mas sem formatá-los: data, nível e traceback são formatados pela thread de escrita.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None  # O traceback guarda referências a objetos que não devem ficar na fila
+        return record
+
+
+def interpretar_niveis(texto):
+    """
+    Converte a configuração de níveis por módulo em um dicionário.
+
+    Args:
+        texto (str): Pares 'modulo=NIVEL' separados por vírgula (ex.: 'backend.cache=WARNING,urllib3=ERROR').
+
+    Returns:
+        dict: Nome do logger -> nível (int).
+    """
+    niveis = {}
+    for item in texto.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        modulo, _, nivel = item.partition('=')
+        valor = logging.getLevelName(nivel.strip().upper())
+        if not modulo.strip() or not isinstance(valor, int):
+            raise ValueError(f"Nível de log inválido: '{item}'. Use modulo=NIVEL (ex.: backend.cache=WARNING).")
+        niveis[modulo.strip()] = valor
+    return niveis
+
+
+_ouvinte = None
+_manipulador_fila = None
+_manipuladores_herdados = []
+
+
+def configurar_logs(arquivo, nivel='INFO', niveis_modulos='', formato='texto', tamanho_max_mb=10, backups=5):
+    """
+    Configura o log do processo com escrita em segundo plano.
+
+    Quem registra uma mensagem apenas a coloca em uma fila em memória (ManipuladorFila); uma thread
+    própria (QueueListener) formata e grava no arquivo, com rotação por tamanho. Assim a escrita
+    em disco nunca fica no caminho das consultas. Chamadas repetidas são ignoradas.
+
+    Args:
+        arquivo (str): Caminho do arquivo de log.
+        nivel (str): Nível padrão (ex.: 'INFO').
+        niveis_modulos (str): Níveis por módulo (ver interpretar_niveis).
+        formato (str): 'texto' ou 'json' (um objeto JSON por linha).
+        tamanho_max_mb (float): Tamanho do arquivo que dispara a rotação (0 = sem rotação).
+        backups (int): Quantidade de arquivos antigos mantidos na rotação.
+    """
+    global _ouvinte, _manipulador_fila
+    if _ouvinte is not None:
+        return
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de log inválido: {formato}. Use {', '.join(FORMATOS)}.")
+
+    os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+    manipulador_arquivo = RotatingFileHandler(arquivo, maxBytes=int(tamanho_max_mb * 1024 * 1024),
+                                              backupCount=backups, encoding='utf-8')
+    manipulador_arquivo.setFormatter(FormatadorJSON() if formato == 'json' else logging.Formatter(FORMATO_TEXTO))
+
+    fila = queue.SimpleQueue()
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel.upper())
+    _manipulador_fila = ManipuladorFila(fila)
+    raiz.addHandler(_manipulador_fila)
+    for modulo, nivel_modulo in interpretar_niveis(niveis_modulos).items():
+        logging.getLogger(modulo).setLevel(nivel_modulo)
+
+    _ouvinte = QueueListener(fila, manipulador_arquivo, respect_handler_level=True)
+    _ouvinte.start()
+    atexit.register(encerrar_logs)
+
+    # Processos criados por fork (ex.: backtest) herdam a fila, mas não a thread de escrita
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_reiniciar_ouvinte)
+
+
+def _arquivo_do_processo(manipulador):
+    """
+    Cria, para o processo atual, um manipulador com as mesmas configurações gravando em um arquivo
+    próprio (ex.: logs/app.log -> logs/app.12345.log).
+    """
+    raiz, extensao = os.path.splitext(manipulador.baseFilename)
+    novo = RotatingFileHandler(f"{raiz}.{os.getpid()}{extensao}", maxBytes=manipulador.maxBytes,
+                               backupCount=manipulador.backupCount, encoding=manipulador.encoding, delay=True)
+    novo.setFormatter(manipulador.formatter)
+    novo.setLevel(manipulador.level)
+    return novo
+
+
+def _reiniciar_ouvinte():
+    """
+    Recria a fila e a thread de escrita no processo filho após um fork (a cópia da fila pode
+    conter mensagens do processo pai, que já serão gravadas por ele).
+
+    O filho grava em um arquivo próprio: dois processos rotacionando o mesmo arquivo renomeariam
+    e truncariam o log um do outro.
+    """
+    global _ouvinte
+    if _ouvinte is not None:
+        # Os manipuladores do pai ficam sem uso e nunca são fechados (fechar gravaria o buffer herdado)
+        _manipuladores_herdados.extend(_ouvinte.handlers)
+        manipuladores = [_arquivo_do_processo(manipulador) if isinstance(manipulador, RotatingFileHandler)
+                         else manipulador for manipulador in _ouvinte.handlers]
+        _manipulador_fila.queue = queue.SimpleQueue()
+        _ouvinte = QueueListener(_manipulador_fila.queue, *manipuladores, respect_handler_level=True)
+        _ouvinte.start()
+        # Processos do multiprocessing encerram com os._exit (sem atexit): esvazia a fila antes
+        util.Finalize(None, encerrar_logs, exitpriority=0)
+
+
+def encerrar_logs():
+    """
+    Grava as mensagens pendentes na fila e encerra a thread de escrita.
+    """
+    global _ouvinte
+    if _ouvinte is not None:
+        _ouvinte.stop()
+        _ouvinte = None
+
+
+def obter_logger(nome):
+    """
+    Retorna o logger de um módulo (use `obter_logger(__name__)`), cujo nível pode ser ajustado
+    individualmente em LOG_NIVEIS.
+    """
+    return logging.getLogger(nome)
@@ -0,0 +1,300 @@
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from backend.calendario import dia_util_anterior
+from backend.config import CACHE_TTL_HOJE, MEMORIA_ATIVA, MEMORIA_TAMANHO_MAX_MB, obter_logger
+from backend.metricas import metricas
+
+logger = obter_logger(__name__)
+
+
+def medir_tamanho(valor):
+    """
+    Estima a memória ocupada por um resultado armazenado.
+
+    Args:
+        valor (object): DataFrame, Series, array ou outro objeto.
+
+    Returns:
+        int: Tamanho aproximado em bytes.
+    """
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(medir_tamanho(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+class Referencia:
+    """
+    Referência de uma sessão a um resultado compartilhado da memória.
+
+    É o que as sessões guardam (ex.: no st.session_state): a chave e o próprio objeto compartilhado,
+    sem cópia. Enquanto existir, a entrada correspondente não é removida pelo LRU; quando a
+    referência é descartada (a sessão troca o valor ou termina), a contagem é decrementada.
+    """
+
+    def __init__(self, memoria, chave, valor):
+        self.chave = chave
+        self.valor = valor  # Compartilhado entre as sessões: não deve ser alterado
+        memoria.fixar(chave)
+        weakref.finalize(self, memoria.liberar, chave)
+
+    def __repr__(self):
+        return f"Referencia({self.chave!r})"
+
+
+class CacheMemoria:
+    """
+    Cache LRU em memória para resultados intermediários das views, limitado pelo tamanho total.
+
+    A instância é criada no nível do módulo, então é compartilhada por todas as sessões do
+    Streamlit no mesmo processo. Os valores armazenados não devem ser alterados por quem os lê.
+    Resultados que dependem do dia atual expiram após `ttl_hoje` segundos.
+
+    Entradas com referências ativas (ver Referencia) não são removidas pelo LRU, e cálculos
+    idênticos pedidos ao mesmo tempo por sessões diferentes são feitos uma única vez.
+    """
+
+    def __init__(self, tamanho_max_bytes, ttl_hoje, ativo=True):
+        """
+        Args:
+            tamanho_max_bytes (int): Memória máxima ocupada pelos resultados, em bytes.
+            ttl_hoje (int): Validade, em segundos, de resultados que incluem o dia atual.
+            ativo (bool): Se False, todo resultado é recalculado.
+        """
+        self.tamanho_max_bytes = tamanho_max_bytes
+        self.ttl_hoje = ttl_hoje
+        self.ativo = ativo
+        self._entradas = OrderedDict()  # chave -> (valor, tamanho, expira_em), da menos para a mais recente
+        self._tamanho_total = 0
+        self._referencias = {}  # chave -> número de referências ativas
+        self._em_andamento = {}  # chave -> Future do cálculo em execução
+        self._lock = threading.Lock()
+        self._acertos = 0
+        self._falhas = 0
+        self._coalescidas = 0
+
+    def calcular_expiracao(self, data_referencia, agora=None):
+        """
+        Define quando um resultado expira de acordo com a data a que ele se refere.
+
+        Como no cache da API, o último pregão fechado é tratado como o dia atual: os seus dados
+        podem ainda não ter sido publicados.
+
+        Args:
+            data_referencia (str): Data dos dados no formato 'YYYY-MM-DD'.
+            agora (float): Instante atual em segundos (opcional, para testes).
+
+        Returns:
+            float | None: Instante de expiração, ou None se a data for passada (resultado imutável).
+        """
+        agora = agora if agora is not None else time.time()
+        ultimo_pregao = dia_util_anterior(date.fromtimestamp(agora) - timedelta(days=1))
+        if str(data_referencia)[:10] < ultimo_pregao.isoformat():
+            return None
+        return agora + self.ttl_hoje
+
+    def obter(self, chave):
+        """
+        Busca um resultado válido e o marca como o mais recentemente usado.
+
+        Args:
+            chave (tuple): Identificador do resultado.
+
+        Returns:
+            object | None: Valor armazenado, ou None se não houver entrada válida.
+        """
+        if not self.ativo:
+            return None
+        with self._lock:
+            valor = self._buscar(chave)
+            if valor is None:
+                self._falhas += 1
+            else:
+                self._acertos += 1
+            return valor
+
+    def _buscar(self, chave):
+        """
+        Busca uma entrada válida, descartando-a se expirada (chamado com o lock adquirido).
+        """
+        entrada = self._entradas.get(chave)
+        if entrada is not None and (entrada[2] is None or entrada[2] > time.time()):
+            self._entradas.move_to_end(chave)
+            return entrada[0]
+        if entrada is not None:
+            self._remover(chave)
+        return None
+
+    def salvar(self, chave, valor, expira_em=None):
+        """
+        Armazena um resultado e remove os menos usados até caber no limite de memória.
+
+        Args:
+            chave (tuple): Identificador do resultado.
+            valor (object): Resultado a ser armazenado.
+            expira_em (float | None): Instante de expiração (None = não expira).
+        """
+        if not self.ativo:
+            return
+        tamanho = medir_tamanho(valor)
+        if tamanho > self.tamanho_max_bytes:
+            logger.info("Resultado %s (%s bytes) maior que o limite da memória; não armazenado.", chave, tamanho)
+            return
+        with self._lock:
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (valor, tamanho, expira_em)
+            self._tamanho_total += tamanho
+            removidas = 0
+            # Remove as menos usadas, exceto as que ainda têm referências de alguma sessão
+            for antiga in list(self._entradas):
+                if self._tamanho_total <= self.tamanho_max_bytes:
+                    break
+                if antiga != chave and not self._referencias.get(antiga):
+                    self._remover(antiga)
+                    removidas += 1
+        if removidas:
+            logger.info("Memória de resultados acima do limite: %s entradas removidas.", removidas)
+
+    def _remover(self, chave):
+        """
+        Remove uma entrada (chamado com o lock adquirido).
+        """
+        _, tamanho, _ = self._entradas.pop(chave)
+        self._tamanho_total -= tamanho
+
+    def obter_ou_calcular(self, chave, calcular, data_referencia):
+        """
+        Retorna o resultado armazenado ou o calcula e armazena.
+
+        Se outra thread (ex.: outra sessão) já estiver calculando a mesma chave, aguarda e
+        devolve o resultado dela em vez de repetir o cálculo e as consultas à API.
+
+        Args:
+            chave (tuple): Identificador do resultado (deve conter todas as entradas do cálculo).
+            calcular (callable): Função sem argumentos que produz o resultado; não deve pedir a
+                                 mesma chave (o cálculo ficaria aguardando a si mesmo).
+            data_referencia (str): Data dos dados, usada para definir a expiração.
+
+        Returns:
+            object: Resultado armazenado ou recém-calculado.
+        """
+        valor = self.obter(chave)
+        if valor is not None:
+            return valor
+
+        with self._lock:
+            valor = self._buscar(chave)  # Pode ter sido salvo por outra thread desde a consulta acima
+            if valor is not None:
+                return valor
+            futuro = self._em_andamento.get(chave)
+            calcular_aqui = futuro is None
+            if calcular_aqui:
+                futuro = self._em_andamento[chave] = Future()
+            else:
+                self._coalescidas += 1
+        if not calcular_aqui:
+            return futuro.result()
+
+        try:
+            valor = calcular()
+            expira_em = self.calcular_expiracao(data_referencia)
+            if expira_em is None and isinstance(valor, pd.DataFrame) and valor.empty:
+                # Um resultado vazio pode ser só atraso na publicação: não fica fixado para sempre
+                expira_em = time.time() + self.ttl_hoje
+            self.salvar(chave, valor, expira_em)
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(valor)
+        finally:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+        return valor
+
+    def referenciar(self, chave, calcular, data_referencia):
+        """
+        Obtém (ou calcula) um resultado e devolve uma referência a ele para ser guardada pela sessão.
+
+        Args:
+            chave (tuple): Identificador do resultado.
+            calcular (callable): Função sem argumentos que produz o resultado.
+            data_referencia (str): Data dos dados, usada para definir a expiração.
+
+        Returns:
+            Referencia: Referência com a chave e o valor compartilhado.
+        """
+        return Referencia(self, chave, self.obter_ou_calcular(chave, calcular, data_referencia))
+
+    def fixar(self, chave):
+        """
+        Registra uma referência ativa à entrada (que deixa de ser removida pelo LRU).
+        """
+        with self._lock:
+            self._referencias[chave] = self._referencias.get(chave, 0) + 1
+
+    def liberar(self, chave):
+        """
+        Descarta uma referência ativa à entrada.
+        """
+        with self._lock:
+            restantes = self._referencias.get(chave, 0) - 1
+            if restantes > 0:
+                self._referencias[chave] = restantes
+            else:
+                self._referencias.pop(chave, None)
+
+    def estatisticas(self):
+        """
+        Retorna os contadores de uso da memória.
+
+        Returns:
+            dict: Acertos, falhas, taxa de acerto, cálculos coalescidos, número de entradas,
+                  referências ativas e tamanho total em bytes.
+        """
+        with self._lock:
+            consultas = self._acertos + self._falhas
+            return {
+                'acertos': self._acertos,
+                'falhas': self._falhas,
+                'taxa_acerto': self._acertos / consultas if consultas else 0.0,
+                'coalescidas': self._coalescidas,
+                'entradas': len(self._entradas),
+                'referencias': sum(self._referencias.values()),
+                'tamanho_bytes': self._tamanho_total,
+            }
+
+    def limpar(self):
+        """
+        Remove todos os resultados e zera os contadores (as referências ativas são mantidas).
+        """
+        with self._lock:
+            self._entradas.clear()
+            self._tamanho_total = 0
+            self._acertos = 0
+            self._falhas = 0
+            self._coalescidas = 0
+
+
+# Instância compartilhada pelo processo (e, portanto, por todas as sessões do Streamlit)
+memoria_views = CacheMemoria(
+    tamanho_max_bytes=MEMORIA_TAMANHO_MAX_MB * 1024 * 1024,
+    ttl_hoje=CACHE_TTL_HOJE,
+    ativo=MEMORIA_ATIVA,
+)
+
+# Taxa de acerto e ocupação incluídas no resumo das métricas
+metricas.registrar_fonte('memoria_views', memoria_views.estatisticas)
@@ -0,0 +1,221 @@
+import atexit
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from backend.config import METRICAS_ARQUIVO, METRICAS_ATIVAS, obter_logger
+
+logger = obter_logger(__name__)
+
+# Percentis incluídos no resumo de cada histograma
+PERCENTIS = (50, 90, 95, 99)
+
+# Razão entre os limites de faixas consecutivas do histograma (erro relativo máximo de ~9%)
+FATOR_FAIXA = 2 ** 0.25
+
+
+class Histograma:
+    """
+    Histograma de faixas logarítmicas para estimar percentis sem guardar as observações.
+
+    Cada valor positivo cai na faixa [FATOR_FAIXA**k, FATOR_FAIXA**(k+1)), então a memória
+    depende apenas da amplitude dos valores e os percentis têm erro relativo limitado.
+    """
+
+    def __init__(self):
+        self.faixas = {}  # índice da faixa -> quantidade de observações
+        self.quantidade = 0
+        self.soma = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    def observar(self, valor):
+        """
+        Registra uma observação (valores <= 0 ficam na faixa mais baixa).
+        """
+        indice = math.floor(math.log(valor, FATOR_FAIXA)) if valor > 0 else -10 ** 6
+        self.faixas[indice] = self.faixas.get(indice, 0) + 1
+        self.quantidade += 1
+        self.soma += valor
+        self.minimo = min(self.minimo, valor)
+        self.maximo = max(self.maximo, valor)
+
+    def percentil(self, p):
+        """
+        Estima o percentil `p` (0 a 100) pelo ponto médio geométrico da faixa correspondente.
+
+        Returns:
+            float: Valor estimado, limitado ao mínimo e ao máximo observados (NaN sem observações).
+        """
+        if not self.quantidade:
+            return math.nan
+        alvo = max(1, math.ceil(self.quantidade * p / 100))
+        acumulado = 0
+        for indice in sorted(self.faixas):
+            acumulado += self.faixas[indice]
+            if acumulado >= alvo:
+                estimativa = FATOR_FAIXA ** (indice + 0.5) if indice > -10 ** 6 else self.minimo
+                return min(max(estimativa, self.minimo), self.maximo)
+        return self.maximo
+
+    def resumo(self):
+        """
+        Returns:
+            dict: Quantidade, soma, média, mínimo, máximo e percentis (chaves 'p50', 'p90'...).
+        """
+        if not self.quantidade:
+            return {'quantidade': 0}
+        resumo = {
+            'quantidade': self.quantidade,
+            'soma': self.soma,
+            'media': self.soma / self.quantidade,
+            'minimo': self.minimo,
+            'maximo': self.maximo,
+        }
+        resumo.update({f'p{p}': self.percentil(p) for p in PERCENTIS})
+        return resumo
+
+
+class RegistroMetricas:
+    """
+    Registro de métricas do processo: histogramas (latências, tamanhos), contadores e fontes
+    externas de estatísticas (ex.: caches), seguro para uso entre threads.
+
+    Convenção de nomes: '<camada>.<item>_ms' para durações em milissegundos, '<camada>.<item>.bytes'
+    para tamanhos e '<camada>.<item>.<evento>' para contadores.
+    """
+
+    def __init__(self, ativo=True):
+        """
+        Args:
+            ativo (bool): Se False, nenhuma métrica é registrada.
+        """
+        self.ativo = ativo
+        self.inicio = time.time()
+        self._histogramas = {}
+        self._contadores = {}
+        self._fontes = {}
+        self._lock = threading.Lock()
+
+    def observar(self, nome, valor):
+        """
+        Registra um valor no histograma `nome`.
+        """
+        if not self.ativo:
+            return
+        with self._lock:
+            histograma = self._histogramas.get(nome)
+            if histograma is None:
+                histograma = self._histogramas[nome] = Histograma()
+            histograma.observar(valor)
+
+    def incrementar(self, nome, valor=1):
+        """
+        Soma `valor` ao contador `nome`.
+        """
+        if not self.ativo:
+            return
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + valor
+
+    @contextmanager
+    def cronometro(self, nome):
+        """
+        Mede a duração do bloco `with` e a registra em milissegundos no histograma `nome`.
+        Blocos que terminam com exceção também contam em '<nome>.erros'.
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.incrementar(f"{nome}.erros")
+            raise
+        finally:
+            self.observar(nome, (time.perf_counter() - inicio) * 1000)
+
+    def medir(self, nome):
+        """
+        Decorador que cronometra cada chamada da função no histograma `nome` (em milissegundos).
+        """
+        def decorador(funcao):
+            @functools.wraps(funcao)
+            def envolvida(*args, **kwargs):
+                with self.cronometro(nome):
+                    return funcao(*args, **kwargs)
+            return envolvida
+        return decorador
+
+    def registrar_fonte(self, nome, funcao):
+        """
+        Registra uma função sem argumentos que devolve estatísticas (dict) incluídas no resumo.
+
+        Args:
+            nome (str): Nome da fonte (ex.: 'cache_api').
+            funcao (callable): Função chamada a cada resumo (ex.: cache_api.estatisticas).
+        """
+        with self._lock:
+            self._fontes[nome] = funcao
+
+    def resumo(self):
+        """
+        Monta uma fotografia de todas as métricas.
+
+        Returns:
+            dict: 'gerado_em', 'ativo_desde', 'histogramas' (resumo de cada um), 'contadores'
+                  e 'fontes' (estatísticas de cada fonte registrada).
+        """
+        with self._lock:
+            histogramas = {nome: histograma.resumo() for nome, histograma in sorted(self._histogramas.items())}
+            contadores = dict(sorted(self._contadores.items()))
+            fontes = dict(self._fontes)
+        estatisticas = {}
+        for nome, funcao in fontes.items():
+            try:
+                estatisticas[nome] = funcao()
+            except Exception as e:
+                logger.warning("Falha ao coletar as estatísticas de %s: %s", nome, e)
+        return {
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'ativo_desde': datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+            'histogramas': histogramas,
+            'contadores': contadores,
+            'fontes': estatisticas,
+        }
+
+    def exportar_json(self, caminho=None):
+        """
+        Serializa o resumo das métricas em JSON.
+
+        Args:
+            caminho (str): Se informado, grava o JSON neste arquivo.
+
+        Returns:
+            str: Documento JSON.
+        """
+        documento = json.dumps(self.resumo(), indent=2, ensure_ascii=False, default=str)
+        if caminho:
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+            with open(caminho, 'w', encoding='utf-8') as arquivo:
+                arquivo.write(documento)
+            logger.info("Métricas gravadas em %s", caminho)
+        return documento
+
+    def limpar(self):
+        """
+        Remove os histogramas e contadores (as fontes registradas são mantidas).
+        """
+        with self._lock:
+            self._histogramas.clear()
+            self._contadores.clear()
+            self.inicio = time.time()
+
+
+# Instância compartilhada pelo processo
+metricas = RegistroMetricas(ativo=METRICAS_ATIVAS)
+
+if METRICAS_ARQUIVO and METRICAS_ATIVAS:
+    atexit.register(metricas.exportar_json, METRICAS_ARQUIVO)
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+
+def normalizar_datas(datas):
+    """
+    Converte uma coleção de datas para strings 'YYYY-MM-DD', usadas como chave de alinhamento.
+
+    Args:
+        datas (iterable): Datas como strings, datetime ou Timestamp.
+
+    Returns:
+        pd.Index: Índice de strings no formato 'YYYY-MM-DD'.
+    """
+    datas = pd.Series(datas)
+    if pd.api.types.is_datetime64_any_dtype(datas):
+        return pd.Index(datas.dt.strftime('%Y-%m-%d'))
+    return pd.Index(datas.astype(str).str[:10])
+
+
+def montar_painel(df_precos, datas_referencia, coluna='fechamento', preenchimento='mascara'):
+    """
+    Converte os preços em formato longo em uma matriz data × ticker alinhada a um calendário.
+
+    Preços em datas fora de `datas_referencia` são descartados. Datas sem preço ficam como NaN
+    (preenchimento 'mascara') ou recebem o último preço conhecido (preenchimento 'ffill').
+
+    Args:
+        df_precos (pd.DataFrame): Preços com as colunas 'data', 'ticker' e `coluna`.
+        datas_referencia (iterable): Datas do calendário de referência (ex.: pregões do Ibovespa), em ordem.
+        coluna (str): Coluna de preço usada na matriz.
+        preenchimento (str): 'mascara' para manter lacunas como NaN ou 'ffill' para repetir o último preço.
+
+    Returns:
+        tuple: (pd.Index de datas, pd.Index de tickers, np.ndarray de shape (datas, tickers)).
+    """
+    if preenchimento not in ('mascara', 'ffill'):
+        raise ValueError(f"Preenchimento inválido: {preenchimento}. Use 'mascara' ou 'ffill'.")
+
+    datas = normalizar_datas(datas_referencia)
+    codigos, tickers = pd.factorize(df_precos['ticker'])
+
+    # Normaliza apenas as datas distintas e propaga a posição para todas as linhas
+    codigos_datas, datas_distintas = pd.factorize(df_precos['data'])
+    linhas = datas.get_indexer(normalizar_datas(datas_distintas))[codigos_datas]
+    validos = (linhas >= 0) & (codigos_datas >= 0) & (codigos >= 0)
+
+    # Preenche a matriz em uma única atribuição vetorizada
+    matriz = np.full((len(datas), len(tickers)), np.nan)
+    matriz[linhas[validos], codigos[validos]] = df_precos[coluna].to_numpy(dtype=float)[validos]
+
+    if preenchimento == 'ffill':
+        matriz = preencher_adiante(matriz)
+    return datas, pd.Index(tickers), matriz
+
+
+def preencher_adiante(matriz):
+    """
+    Repete o último valor válido de cada coluna nas linhas seguintes (forward-fill).
+
+    Args:
+        matriz (np.ndarray): Matriz 2D com NaN nas lacunas.
+
+    Returns:
+        np.ndarray: Nova matriz com as lacunas preenchidas; NaN iniciais são mantidos.
+    """
+    posicoes = np.where(np.isnan(matriz), 0, np.arange(matriz.shape[0])[:, None])
+    np.maximum.accumulate(posicoes, axis=0, out=posicoes)
+    return matriz[posicoes, np.arange(matriz.shape[1])]
+
+
+def retorno_acumulado(matriz):
+    """
+    Calcula o retorno acumulado de cada coluna em relação ao seu primeiro valor válido.
+
+    Args:
+        matriz (np.ndarray): Preços com shape (datas, ativos) ou (datas,).
+
+    Returns:
+        np.ndarray: Retornos acumulados com o mesmo shape da entrada.
+    """
+    matriz = np.asarray(matriz, dtype=float)
+    if matriz.ndim == 1:
+        return retorno_acumulado(matriz[:, None])[:, 0]
+    primeira = np.argmax(~np.isnan(matriz), axis=0)
+    base = matriz[primeira, np.arange(matriz.shape[1])]
+    return matriz / base - 1
+
+
+def media_carteira(retornos, pesos=None):
+    """
+    Calcula a média, por data, dos retornos dos ativos disponíveis naquela data.
+
+    Com `pesos`, a média é ponderada e os pesos são renormalizados entre os ativos com dado em cada data.
+
+    Args:
+        retornos (np.ndarray): Retornos com shape (datas, ativos), com NaN onde não há dado.
+        pesos (np.ndarray): Peso de cada ativo (opcional; padrão: pesos iguais).
+
+    Returns:
+        np.ndarray: Retorno médio por data (NaN quando nenhum ativo tem dado).
+    """
+    disponiveis = ~np.isnan(retornos)
+    if pesos is None:
+        quantidade = disponiveis.sum(axis=1)
+        soma = np.where(disponiveis, retornos, 0.0).sum(axis=1)
+    else:
+        pesos = np.nan_to_num(np.asarray(pesos, dtype=float))
+        quantidade = disponiveis @ pesos
+        soma = np.where(disponiveis, retornos, 0.0) @ pesos
+    return np.divide(soma, quantidade, out=np.full(len(soma), np.nan), where=quantidade > 0)
@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+
+# Direção de cada indicador do planilhão: True = quanto maior, melhor
+MAIOR_MELHOR = {
+    'roe': True,
+    'roc': True,
+    'roic': True,
+    'earning_yield': True,
+    'dividend_yield': True,
+    'p_vp': False,  # Preço sobre valor patrimonial: quanto menor, mais descontada a ação
+}
+
+POLITICAS_NAN = ('excluir', 'pior', 'neutro')
+NORMALIZACOES = ('rank', 'zscore')
+
+# Tamanho mínimo de um grupo (ações com o indicador) para ranquear dentro dele; abaixo disso, a
+# nota vem do universo inteiro (uma empresa sozinha no setor não ganha o percentil máximo)
+MINIMO_GRUPO = 5
+
+
+class Fator:
+    """
+    Critério de um ranking multifator: um indicador do planilhão com peso, direção,
+    winsorização e tratamento de valores ausentes.
+    """
+
+    def __init__(self, coluna, peso=1.0, maior_melhor=None, winsorizar=None, nan='excluir'):
+        """
+        Args:
+            coluna (str): Indicador usado (ex.: 'roe').
+            peso (float): Peso do fator na pontuação final.
+            maior_melhor (bool): Direção do fator; se None, usa MAIOR_MELHOR (padrão: True).
+            winsorizar (tuple): Quantis (inferior, superior) para limitar valores extremos (ex.: (0.01, 0.99)).
+            nan (str): Tratamento de valores ausentes: 'excluir' (a ação não é selecionada),
+                       'pior' (recebe a pior nota do fator) ou 'neutro' (recebe a nota mediana).
+        """
+        if nan not in POLITICAS_NAN:
+            raise ValueError(f"Política de NaN inválida: {nan}. Use {', '.join(POLITICAS_NAN)}.")
+        self.coluna = coluna
+        self.peso = float(peso)
+        self.maior_melhor = MAIOR_MELHOR.get(coluna, True) if maior_melhor is None else maior_melhor
+        self.winsorizar = winsorizar
+        self.nan = nan
+
+    def __repr__(self):
+        return (f"Fator({self.coluna!r}, peso={self.peso}, maior_melhor={self.maior_melhor}, "
+                f"winsorizar={self.winsorizar}, nan={self.nan!r})")
+
+
+def fatores_magic_formula(indicador_rentabilidade, indicador_desconto):
+    """
+    Fatores da Magic Formula: um indicador de rentabilidade e um de desconto, com o mesmo peso.
+
+    Returns:
+        list: Dois objetos Fator.
+    """
+    return [Fator(indicador_rentabilidade), Fator(indicador_desconto)]
+
+
+def normalizar_fatores(df, fatores, normalizacao='rank', grupo=None, minimo_grupo=MINIMO_GRUPO):
+    """
+    Converte os indicadores em notas comparáveis, todas orientadas para "maior é melhor".
+
+    Todos os fatores são tratados juntos, como uma única matriz ações × fatores. Com `grupo`,
+    cada ação é comparada apenas às do mesmo grupo (ex.: setor), em uma única operação agrupada;
+    no modo 'rank' as notas passam a ser percentis (de 0 a 1) para que grupos de tamanhos
+    diferentes fiquem na mesma escala. Em grupos com menos de `minimo_grupo` ações com o
+    indicador, a nota é calculada contra o universo inteiro (percentil ou z-score global).
+
+    Args:
+        df (pd.DataFrame): Universo de ações com as colunas dos fatores.
+        fatores (list): Objetos Fator.
+        normalizacao (str): 'rank' (posição média, de 1 a n) ou 'zscore' (desvios em relação à média).
+        grupo (str): Coluna que define os grupos de comparação (ex.: 'setor'); None = universo inteiro.
+        minimo_grupo (int): Tamanho mínimo de um grupo para a comparação dentro dele.
+
+    Returns:
+        np.ndarray: Matriz de notas (ações × fatores); NaN onde a política do fator é 'excluir'.
+    """
+    if normalizacao not in NORMALIZACOES:
+        raise ValueError(f"Normalização inválida: {normalizacao}. Use {', '.join(NORMALIZACOES)}.")
+    valores = df[[fator.coluna for fator in fatores]].to_numpy(dtype=float, copy=True)
+
+    # Winsorização pelos quantis de cada fator
+    for j, fator in enumerate(fatores):
+        if fator.winsorizar is not None and np.isfinite(valores[:, j]).any():
+            limites = np.nanquantile(valores[:, j], fator.winsorizar)
+            np.clip(valores[:, j], limites[0], limites[1], out=valores[:, j])
+
+    # Orienta todos os fatores para "maior é melhor"
+    valores *= np.where([fator.maior_melhor for fator in fatores], 1.0, -1.0)
+
+    ausentes = np.isnan(valores)
+    if grupo is not None:
+        # Todos os grupos e fatores de uma vez: nenhum laço por grupo
+        agrupado = pd.DataFrame(valores).groupby(pd.factorize(df[grupo])[0])
+        pequenos = agrupado.transform('count').to_numpy() < minimo_grupo
+        if normalizacao == 'rank':
+            notas = agrupado.rank(pct=True).to_numpy()
+            if pequenos.any():
+                notas = np.where(pequenos, pd.DataFrame(valores).rank(pct=True).to_numpy(), notas)
+            neutras = np.full(len(fatores), 0.5)
+        else:
+            desvios = agrupado.transform('std', ddof=0).to_numpy()
+            notas = (valores - agrupado.transform('mean').to_numpy()) / np.where(desvios > 0, desvios, 1.0)
+            if pequenos.any():
+                notas = np.where(pequenos, _zscore(valores), notas)
+            neutras = np.zeros(len(fatores))
+        piores = np.zeros(len(fatores)) if normalizacao == 'rank' else _minimo_colunas(notas)
+    elif normalizacao == 'rank':
+        notas = pd.DataFrame(valores).rank().to_numpy()
+        piores = np.zeros(len(fatores))
+        neutras = (np.sum(~ausentes, axis=0) + 1) / 2
+    else:
+        notas = _zscore(valores)
+        piores = _minimo_colunas(notas)
+        neutras = np.zeros(len(fatores))
+
+    # Política de valores ausentes de cada fator
+    for j, fator in enumerate(fatores):
+        if fator.nan == 'pior':
+            notas[ausentes[:, j], j] = piores[j]
+        elif fator.nan == 'neutro':
+            notas[ausentes[:, j], j] = neutras[j]
+    return notas
+
+
+def _zscore(valores):
+    """
+    Z-score de cada coluna em relação ao universo inteiro, ignorando NaN.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        desvios = np.nanstd(valores, axis=0)
+        return (valores - np.nanmean(valores, axis=0)) / np.where(desvios > 0, desvios, 1.0)
+
+
+def _minimo_colunas(notas):
+    """
+    Menor nota de cada coluna, ignorando NaN (0 para colunas sem nenhuma nota).
+    """
+    return np.nan_to_num(np.nanmin(notas, axis=0, initial=np.inf, where=~np.isnan(notas)), posinf=0.0)
+
+
+def calcular_pontuacao(df, fatores, normalizacao='rank', grupo=None):
+    """
+    Calcula a pontuação multifator de cada ação como a soma ponderada das notas dos fatores.
+
+    Args:
+        df (pd.DataFrame): Universo de ações com as colunas dos fatores.
+        fatores (list): Objetos Fator.
+        normalizacao (str): 'rank' ou 'zscore' (ver normalizar_fatores).
+        grupo (str): Coluna dos grupos de comparação (ex.: 'setor'); None = universo inteiro.
+
+    Returns:
+        np.ndarray: Pontuação de cada ação (NaN para ações excluídas por falta de dados).
+    """
+    notas = normalizar_fatores(df, fatores, normalizacao, grupo)
+    return notas @ np.array([fator.peso for fator in fatores])
+
+
+def selecionar_top(pontuacao, quantidade=None):
+    """
+    Seleciona as posições das ações de maior pontuação, da melhor para a pior.
+
+    Usa seleção parcial (np.partition) para achar a pontuação de corte e ordena apenas as
+    `quantidade` ações escolhidas.
+    Empates são decididos pela ordem original das ações; pontuações NaN nunca são selecionadas.
+
+    Args:
+        pontuacao (np.ndarray): Pontuação de cada ação.
+        quantidade (int): Número de ações desejado (None = todas as ações com pontuação).
+
+    Returns:
+        np.ndarray: Posições selecionadas, em ordem decrescente de pontuação.
+    """
+    pontuacao = np.asarray(pontuacao, dtype=float)
+    validas = np.flatnonzero(~np.isnan(pontuacao))
+    if quantidade is None or quantidade >= len(validas):
+        selecionadas = validas
+    elif quantidade <= 0:
+        return np.array([], dtype=np.intp)
+    else:
+        # Pontuação de corte (k-ésima maior) sem ordenar o universo inteiro
+        corte = -np.partition(-pontuacao[validas], quantidade - 1)[quantidade - 1]
+        acima = validas[pontuacao[validas] > corte]
+        empatadas = validas[pontuacao[validas] == corte][:quantidade - len(acima)]
+        selecionadas = np.sort(np.concatenate([acima, empatadas]))
+    return selecionadas[np.argsort(-pontuacao[selecionadas], kind='stable')]
+
+
+def selecionar_top_por_grupo(pontuacao, grupos, quantidade=None, maximo_por_grupo=None):
+    """
+    Seleciona as ações de maior pontuação respeitando um limite de ações por grupo.
+
+    A posição de cada ação dentro do seu grupo é obtida com uma contagem agrupada sobre a
+    ordem global, sem laço por grupo.
+
+    Args:
+        pontuacao (np.ndarray): Pontuação de cada ação.
+        grupos (array-like): Grupo de cada ação (ex.: setor).
+        quantidade (int): Número de ações desejado (None = todas as que cabem nos limites).
+        maximo_por_grupo (int): Máximo de ações por grupo (None = sem limite).
+
+    Returns:
+        np.ndarray: Posições selecionadas, em ordem decrescente de pontuação.
+    """
+    if not maximo_por_grupo:
+        return selecionar_top(pontuacao, quantidade)
+    ordem = selecionar_top(pontuacao)
+    codigos = pd.factorize(np.asarray(grupos)[ordem])[0]
+    posicao_no_grupo = pd.Series(codigos).groupby(codigos).cumcount().to_numpy()
+    selecionadas = ordem[posicao_no_grupo < maximo_por_grupo]
+    return selecionadas if quantidade is None else selecionadas[:max(quantidade, 0)]
+
+
+def pesos_neutros(grupos):
+    """
+    Pesos que dão a mesma fatia da carteira a cada grupo, divididos igualmente entre suas ações.
+
+    Args:
+        grupos (array-like): Grupo de cada ação da carteira (ex.: setor).
+
+    Returns:
+        np.ndarray: Peso de cada ação (soma 1).
+    """
+    codigos = pd.factorize(np.asarray(grupos))[0]
+    if len(codigos) == 0:
+        return np.array([])
+    tamanhos = np.bincount(codigos)
+    return 1.0 / (len(tamanhos) * tamanhos[codigos])
+
+
+def ranquear(df, fatores, quantidade=None, normalizacao='rank', grupo=None, maximo_por_grupo=None):
+    """
+    Ranqueia o universo por vários fatores e devolve as melhores ações.
+
+    Args:
+        df (pd.DataFrame): Universo de ações com as colunas dos fatores.
+        fatores (list): Objetos Fator.
+        quantidade (int): Número de ações desejado (None = todas as ações com pontuação).
+        normalizacao (str): 'rank' ou 'zscore' (ver normalizar_fatores).
+        grupo (str): Se informado, cada ação é ranqueada apenas dentro do seu grupo (ex.: 'setor').
+        maximo_por_grupo (int): Máximo de ações de um mesmo grupo (exige `grupo`).
+
+    Returns:
+        pd.DataFrame: Ações selecionadas da melhor para a pior, com a pontuação na coluna 'ranking'.
+    """
+    pontuacao = calcular_pontuacao(df, fatores, normalizacao, grupo)
+    return montar_ranking(df, pontuacao, quantidade, grupo, maximo_por_grupo)
+
+
+def montar_ranking(df, pontuacao, quantidade=None, grupo=None, maximo_por_grupo=None):
+    """
+    Monta o DataFrame das melhores ações a partir de uma pontuação já calculada.
+
+    Args:
+        df (pd.DataFrame): Universo de ações, na mesma ordem da pontuação.
+        pontuacao (np.ndarray): Pontuação de cada ação (ver calcular_pontuacao).
+        quantidade (int): Número de ações desejado (None = todas as ações com pontuação).
+        grupo (str): Coluna dos grupos usada no limite por grupo (ex.: 'setor').
+        maximo_por_grupo (int): Máximo de ações de um mesmo grupo (None = sem limite).
+
+    Returns:
+        pd.DataFrame: Ações selecionadas da melhor para a pior, com a pontuação na coluna 'ranking'.
+    """
+    if grupo is not None and maximo_por_grupo:
+        posicoes = selecionar_top_por_grupo(pontuacao, df[grupo], quantidade, maximo_por_grupo)
+    else:
+        posicoes = selecionar_top(pontuacao, quantidade)
+    df_ranking = df.iloc[posicoes].reset_index(drop=True)
+    df_ranking['ranking'] = pontuacao[posicoes]
+    return df_ranking
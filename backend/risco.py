@@ -0,0 +1,268 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Pregões por ano, usados para anualizar as métricas diárias
+PREGOES_ANO = 252
+
+
+def calcular_retornos(precos):
+    """
+    Calcula os retornos diários simples de cada coluna.
+
+    Args:
+        precos (np.ndarray): Preços com shape (datas, ativos) ou (datas,), com NaN nas lacunas.
+
+    Returns:
+        np.ndarray: Retornos com o mesmo shape; a primeira linha e as datas sem preço (ou sem
+                    preço no dia anterior) ficam como NaN.
+    """
+    precos = np.asarray(precos, dtype=float)
+    retornos = np.full(precos.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        retornos[1:] = precos[1:] / precos[:-1] - 1
+    return retornos
+
+
+def _como_matriz(valores):
+    """
+    Garante uma matriz 2D (datas, colunas) e informa se a entrada era 1D.
+    """
+    valores = np.asarray(valores, dtype=float)
+    return (valores[:, None], True) if valores.ndim == 1 else (valores, False)
+
+
+def _soma_movel(valores, janela):
+    """
+    Soma móvel de cada coluna ignorando NaN, calculada por diferença de somas acumuladas.
+
+    Args:
+        valores (np.ndarray): Matriz (datas, colunas).
+        janela (int): Tamanho da janela, em linhas.
+
+    Returns:
+        tuple: (somas, quantidade de valores válidos) de cada janela terminada em cada linha.
+    """
+    validos = ~np.isnan(valores)
+    acumulado = np.zeros((valores.shape[0] + 1, valores.shape[1]))
+    np.cumsum(np.where(validos, valores, 0.0), axis=0, out=acumulado[1:])
+    contagem = np.zeros(acumulado.shape)
+    np.cumsum(validos, axis=0, out=contagem[1:])
+
+    inicio = np.maximum(np.arange(1, valores.shape[0] + 1) - janela, 0)
+    return acumulado[1:] - acumulado[inicio], contagem[1:] - contagem[inicio]
+
+
+def _momentos(retornos, janela=None):
+    """
+    Média e desvio padrão amostral dos retornos, no período inteiro ou em janelas móveis.
+
+    Returns:
+        tuple: (médias, desvios, quantidade de observações).
+    """
+    if janela is None:
+        quantidade = np.sum(~np.isnan(retornos), axis=0).astype(float)
+        soma = np.nansum(retornos, axis=0)
+        soma_quadrados = np.nansum(retornos ** 2, axis=0)
+    else:
+        soma, quantidade = _soma_movel(retornos, janela)
+        soma_quadrados, _ = _soma_movel(retornos ** 2, janela)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = soma / quantidade
+        variancia = (soma_quadrados - soma * media) / (quantidade - 1)
+    return media, np.sqrt(np.maximum(variancia, 0.0)), quantidade
+
+
+def _exigir_minimo(valores, quantidade, minimo):
+    """
+    Substitui por NaN os resultados calculados com menos de `minimo` observações.
+    """
+    return np.where(quantidade >= minimo, valores, np.nan)
+
+
+def _formatar(valores, era_vetor):
+    """
+    Devolve o resultado no formato da entrada (1D se a entrada era um vetor).
+    """
+    return valores[..., 0] if era_vetor else valores
+
+
+def volatilidade(retornos, janela=None, minimo=None):
+    """
+    Volatilidade anualizada dos retornos diários.
+
+    Args:
+        retornos (np.ndarray): Retornos diários (datas, ativos) ou (datas,).
+        janela (int): Se informado, calcula a volatilidade móvel com esta quantidade de pregões.
+        minimo (int): Observações mínimas por cálculo (padrão: a janela, ou 2 no período inteiro).
+
+    Returns:
+        np.ndarray: Um valor por ativo, ou uma série por ativo (datas, ativos) na versão móvel.
+    """
+    retornos, era_vetor = _como_matriz(retornos)
+    _, desvio, quantidade = _momentos(retornos, janela)
+    resultado = _exigir_minimo(desvio * np.sqrt(PREGOES_ANO), quantidade, minimo or janela or 2)
+    return _formatar(resultado, era_vetor)
+
+
+def beta(retornos, retornos_mercado, janela=None, minimo=None):
+    """
+    Beta de cada ativo em relação ao mercado (ex.: Ibovespa): cov(ativo, mercado) / var(mercado).
+
+    Apenas as datas em que o ativo e o mercado têm retorno entram no cálculo de cada ativo.
+
+    Args:
+        retornos (np.ndarray): Retornos diários (datas, ativos) ou (datas,).
+        retornos_mercado (np.ndarray): Retornos diários do mercado (datas,).
+        janela (int): Se informado, calcula o beta móvel com esta quantidade de pregões.
+        minimo (int): Observações mínimas por cálculo (padrão: a janela, ou 2 no período inteiro).
+
+    Returns:
+        np.ndarray: Um valor por ativo, ou uma série por ativo (datas, ativos) na versão móvel.
+    """
+    retornos, era_vetor = _como_matriz(retornos)
+    mercado = np.broadcast_to(np.asarray(retornos_mercado, dtype=float)[:, None], retornos.shape)
+    pares = ~np.isnan(retornos) & ~np.isnan(mercado)
+    x = np.where(pares, retornos, np.nan)
+    m = np.where(pares, mercado, np.nan)
+
+    if janela is None:
+        quantidade = pares.sum(axis=0).astype(float)
+        somas = [np.nansum(v, axis=0) for v in (x, m, x * m, m * m)]
+    else:
+        somas = [_soma_movel(v, janela)[0] for v in (x, m, x * m, m * m)]
+        quantidade = _soma_movel(x, janela)[1]
+    soma_x, soma_m, soma_xm, soma_mm = somas
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariancia = soma_xm - soma_x * soma_m / quantidade
+        variancia_mercado = soma_mm - soma_m * soma_m / quantidade
+        resultado = np.where(variancia_mercado > 0, covariancia / variancia_mercado, np.nan)
+    return _formatar(_exigir_minimo(resultado, quantidade, minimo or janela or 2), era_vetor)
+
+
+def sharpe(retornos, taxa_livre_risco=0.0, janela=None, minimo=None):
+    """
+    Índice de Sharpe anualizado: retorno médio em excesso à taxa livre de risco dividido pela volatilidade.
+
+    Args:
+        retornos (np.ndarray): Retornos diários (datas, ativos) ou (datas,).
+        taxa_livre_risco (float): Taxa livre de risco anual (ex.: 0.10 = 10% a.a.).
+        janela (int): Se informado, calcula o Sharpe móvel com esta quantidade de pregões.
+        minimo (int): Observações mínimas por cálculo (padrão: a janela, ou 2 no período inteiro).
+
+    Returns:
+        np.ndarray: Um valor por ativo, ou uma série por ativo (datas, ativos) na versão móvel.
+    """
+    retornos, era_vetor = _como_matriz(retornos)
+    excesso = retornos - ((1 + taxa_livre_risco) ** (1 / PREGOES_ANO) - 1)
+    media, desvio, quantidade = _momentos(excesso, janela)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        resultado = np.where(desvio > 0, media / desvio * np.sqrt(PREGOES_ANO), np.nan)
+    return _formatar(_exigir_minimo(resultado, quantidade, minimo or janela or 2), era_vetor)
+
+
+def sortino(retornos, taxa_livre_risco=0.0, janela=None, minimo=None):
+    """
+    Índice de Sortino anualizado: como o Sharpe, mas dividindo apenas pelo desvio dos retornos
+    abaixo da taxa livre de risco (downside deviation).
+
+    Args:
+        retornos (np.ndarray): Retornos diários (datas, ativos) ou (datas,).
+        taxa_livre_risco (float): Taxa livre de risco anual (ex.: 0.10 = 10% a.a.).
+        janela (int): Se informado, calcula o Sortino móvel com esta quantidade de pregões.
+        minimo (int): Observações mínimas por cálculo (padrão: a janela, ou 2 no período inteiro).
+
+    Returns:
+        np.ndarray: Um valor por ativo, ou uma série por ativo (datas, ativos) na versão móvel.
+    """
+    retornos, era_vetor = _como_matriz(retornos)
+    excesso = retornos - ((1 + taxa_livre_risco) ** (1 / PREGOES_ANO) - 1)
+    perdas_quadrado = np.minimum(excesso, 0.0) ** 2
+    if janela is None:
+        quantidade = np.sum(~np.isnan(excesso), axis=0).astype(float)
+        soma = np.nansum(excesso, axis=0)
+        soma_perdas = np.nansum(perdas_quadrado, axis=0)
+    else:
+        soma, quantidade = _soma_movel(excesso, janela)
+        soma_perdas, _ = _soma_movel(perdas_quadrado, janela)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        desvio_negativo = np.sqrt(soma_perdas / quantidade)
+        resultado = np.where(desvio_negativo > 0, (soma / quantidade) / desvio_negativo * np.sqrt(PREGOES_ANO),
+                             np.nan)
+    return _formatar(_exigir_minimo(resultado, quantidade, minimo or janela or 2), era_vetor)
+
+
+def drawdown(precos, janela=None):
+    """
+    Queda de cada data em relação ao maior preço anterior (no período inteiro ou na janela móvel).
+
+    Args:
+        precos (np.ndarray): Preços ou cotas (datas, ativos) ou (datas,), com NaN nas lacunas.
+        janela (int): Se informado, o pico considerado é o maior preço dos últimos `janela` pregões.
+
+    Returns:
+        np.ndarray: Drawdown (valores <= 0) com o mesmo shape da entrada.
+    """
+    precos, era_vetor = _como_matriz(precos)
+    if janela is None:
+        picos = np.fmax.accumulate(precos, axis=0)
+    else:
+        # Máximo móvel sobre uma visão das janelas (sem cópia e sem laço por janela)
+        preenchido = np.vstack([np.full((janela - 1, precos.shape[1]), -np.inf), np.nan_to_num(precos, nan=-np.inf)])
+        picos = sliding_window_view(preenchido, janela, axis=0).max(axis=-1)
+        picos[np.isinf(picos)] = np.nan
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return _formatar(precos / picos - 1, era_vetor)
+
+
+def max_drawdown(precos, janela=None):
+    """
+    Maior queda de pico a vale de cada ativo.
+
+    Args:
+        precos (np.ndarray): Preços ou cotas (datas, ativos) ou (datas,).
+        janela (int): Se informado, considera apenas picos dos últimos `janela` pregões.
+
+    Returns:
+        np.ndarray: Um valor (<= 0) por ativo.
+    """
+    quedas, era_vetor = _como_matriz(drawdown(precos, janela))
+    com_dados = ~np.isnan(quedas).all(axis=0)
+    resultado = np.full(quedas.shape[1], np.nan)
+    resultado[com_dados] = np.nanmin(quedas[:, com_dados], axis=0)
+    return resultado[0] if era_vetor else resultado
+
+
+def resumir_risco(precos, precos_mercado, nomes, taxa_livre_risco=0.0):
+    """
+    Monta a tabela de métricas de risco do período inteiro, uma linha por série de preços.
+
+    Args:
+        precos (np.ndarray): Preços ou cotas (datas, séries), alinhados às datas do mercado.
+        precos_mercado (np.ndarray): Preços do mercado (datas,), usados no beta.
+        nomes (list): Nome de cada série (coluna de `precos`).
+        taxa_livre_risco (float): Taxa livre de risco anual.
+
+    Returns:
+        pd.DataFrame: Colunas 'ativo', 'retorno_total', 'volatilidade_anual', 'beta', 'sharpe',
+                      'sortino' e 'max_drawdown'.
+    """
+    precos, _ = _como_matriz(precos)
+    retornos = calcular_retornos(precos)
+    retornos_mercado = calcular_retornos(precos_mercado)
+
+    primeira = np.argmax(~np.isnan(precos), axis=0)
+    ultima = precos.shape[0] - 1 - np.argmax(~np.isnan(precos[::-1]), axis=0)
+    colunas = np.arange(precos.shape[1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        retorno_total = precos[ultima, colunas] / precos[primeira, colunas] - 1
+
+    return pd.DataFrame({
+        'ativo': list(nomes),
+        'retorno_total': retorno_total,
+        'volatilidade_anual': volatilidade(retornos),
+        'beta': beta(retornos, retornos_mercado),
+        'sharpe': sharpe(retornos, taxa_livre_risco),
+        'sortino': sortino(retornos, taxa_livre_risco),
+        'max_drawdown': max_drawdown(precos),
+    })
@@ -0,0 +1,359 @@
+import argparse
+import io
+import json
+import os
+import random
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+import numpy as np
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from backend.config import API_FIXTURES_DIR, SIMULADOR_LATENCIA, SIMULADOR_TICKERS, obter_logger
+
+logger = obter_logger(__name__)
+
+# Setores usados no universo sintético (os mesmos do filtro da página do Planilhão)
+SETORES = [
+    'petróleo', 'mineração', 'banco', 'financeiro', 'saúde', 'energia',
+    'indústria', 'transporte', 'saneamento', 'seguro', 'varejo',
+    'consumo', 'madeira-papel', 'telecom', 'siderurgico', 'construção',
+    'shopping', 'químico', 'proteína', 'supermercado', 'tecnologia',
+    'agrícola', 'aviação', 'educação', 'textil'
+]
+
+
+def interpretar_url(url):
+    """
+    Extrai o endpoint e os parâmetros de uma URL da API.
+
+    Args:
+        url (str): URL completa (ex.: '.../api/v1/planilhao?data_base=2024-01-02').
+
+    Returns:
+        tuple: (endpoint, dict de parâmetros).
+    """
+    partes = urlsplit(url)
+    endpoint = partes.path.rstrip('/').rsplit('/', 1)[-1]
+    params = {nome: valores[0] for nome, valores in parse_qs(partes.query).items()}
+    return endpoint, params
+
+
+def caminho_fixture(diretorio, endpoint, params):
+    """
+    Monta o caminho do arquivo que guarda a resposta gravada de uma consulta.
+
+    Args:
+        diretorio (str): Diretório raiz das gravações.
+        endpoint (str): Nome do endpoint (ex.: 'planilhao').
+        params (dict): Parâmetros da consulta.
+
+    Returns:
+        str: Caminho do arquivo JSON (ex.: 'fixtures/planilhao/data_base=2024-01-02.json').
+    """
+    return os.path.join(diretorio, endpoint, urlencode(sorted(params.items())) + '.json')
+
+
+def gravar_fixture(diretorio, endpoint, params, corpo):
+    """
+    Grava em disco o corpo de uma resposta da API.
+
+    Args:
+        diretorio (str): Diretório raiz das gravações.
+        endpoint (str): Nome do endpoint.
+        params (dict): Parâmetros da consulta.
+        corpo (bytes): Corpo da resposta.
+    """
+    caminho = caminho_fixture(diretorio, endpoint, params)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(corpo)
+    logger.info("Resposta de %s gravada em %s", endpoint, caminho)
+
+
+class UniversoSintetico:
+    """
+    Gera dados determinísticos no formato da API: planilhão, preços corrigidos e Ibovespa.
+
+    Os preços seguem um passeio aleatório geométrico com semente fixa por ticker, de modo que
+    qualquer período consultado é sempre consistente com os demais.
+    """
+
+    def __init__(self, quantidade_tickers=500, inicio='1995-01-02', semente=42):
+        """
+        Args:
+            quantidade_tickers (int): Número de tickers do universo.
+            inicio (str): Primeira data com preços, no formato 'YYYY-MM-DD'.
+            semente (int): Semente que define todo o universo.
+        """
+        self.inicio = np.datetime64(inicio, 'D')
+        self.semente = semente
+        self.tickers = []
+        empresa = 0
+        while len(self.tickers) < quantidade_tickers:
+            base = ''.join(chr(65 + (empresa // 26 ** k) % 26) for k in range(4))
+            # Uma a cada cinco empresas tem duas classes de ação, para exercitar filtrar_duplicadas
+            classes = ['3', '4'] if empresa % 5 == 0 else ['3']
+            self.tickers.extend(base + classe for classe in classes)
+            empresa += 1
+        self.tickers = self.tickers[:quantidade_tickers]
+        self.setores = [SETORES[zlib.crc32(t[:4].encode()) % len(SETORES)] for t in self.tickers]
+
+    def _gerador(self, *partes):
+        """
+        Cria um gerador de números aleatórios determinístico para a combinação de partes.
+        """
+        return np.random.default_rng(zlib.crc32(f"{self.semente}|{'|'.join(partes)}".encode()))
+
+    def _serie(self, nome, data_fim, volatilidade):
+        """
+        Gera a série de fechamento de um ativo desde o início do universo até `data_fim`.
+
+        Returns:
+            tuple: (np.ndarray de datas em dias úteis, np.ndarray de preços).
+        """
+        fim = np.datetime64(data_fim, 'D') + 1
+        if fim <= self.inicio:
+            return np.array([], dtype='datetime64[D]'), np.array([])
+        datas = np.arange(self.inicio, fim, dtype='datetime64[D]')
+        datas = datas[np.is_busday(datas)]
+        gerador = self._gerador('preco', nome)
+        preco_inicial = gerador.uniform(5, 100)
+        retornos = gerador.normal(0.0003, volatilidade, len(datas))
+        return datas, preco_inicial * np.exp(np.cumsum(retornos))
+
+    def precos(self, ticker, data_ini, data_fim, volatilidade=0.02):
+        """
+        Retorna os preços de um ticker no período, no formato da API ('dados').
+
+        Returns:
+            list: Lista de dicionários com 'data', 'fechamento' e 'volume'.
+        """
+        datas, precos = self._serie(ticker, data_fim, volatilidade)
+        selecao = datas >= np.datetime64(data_ini, 'D')
+        datas, precos = datas[selecao], precos[selecao]
+        volumes = self._gerador('volume', ticker).lognormal(14, 1, len(datas))
+        return [
+            {'data': str(data), 'fechamento': round(float(preco), 4), 'volume': round(float(volume), 2)}
+            for data, preco, volume in zip(datas, precos, volumes)
+        ]
+
+    def planilhao(self, data_base):
+        """
+        Retorna o planilhão sintético de uma data, no formato da API ('dados').
+
+        Os indicadores variam por mês, sendo estáveis dentro de um mesmo mês.
+
+        Returns:
+            list: Lista de dicionários, uma entrada por ticker (vazia em finais de semana).
+        """
+        if not np.is_busday(np.datetime64(data_base, 'D')):
+            return []
+        gerador = self._gerador('planilhao', data_base[:7])
+        n = len(self.tickers)
+        indicadores = {
+            'roc': gerador.normal(0.12, 0.10, n),
+            'roe': gerador.normal(0.15, 0.12, n),
+            'roic': gerador.normal(0.10, 0.08, n),
+            'earning_yield': gerador.normal(0.08, 0.06, n),
+            'dividend_yield': np.abs(gerador.normal(0.05, 0.04, n)),
+            'p_vp': np.abs(gerador.lognormal(0.3, 0.6, n)),
+            'volume': gerador.lognormal(15, 2, n),
+        }
+        return [
+            {
+                'ticker': ticker,
+                'setor': setor,
+                'data_base': data_base,
+                **{nome: round(float(valores[i]), 6) for nome, valores in indicadores.items()},
+            }
+            for i, (ticker, setor) in enumerate(zip(self.tickers, self.setores))
+        ]
+
+    def responder(self, endpoint, params):
+        """
+        Gera os dados de uma consulta à API.
+
+        Args:
+            endpoint (str): 'planilhao', 'preco-corrigido' ou 'preco-diversos'.
+            params (dict): Parâmetros da consulta.
+
+        Returns:
+            list | None: Lista 'dados' da resposta, ou None se o endpoint não for conhecido.
+        """
+        if endpoint == 'planilhao':
+            return self.planilhao(params['data_base'])
+        if endpoint == 'preco-corrigido':
+            return self.precos(params['ticker'], params['data_ini'], params['data_fim'])
+        if endpoint == 'preco-diversos':
+            return self.precos(params['ticker'], params['data_ini'], params['data_fim'], volatilidade=0.012)
+        return None
+
+
+class SimuladorAPI:
+    """
+    Substituto local da API: responde com gravações em disco ou, na falta delas, com dados sintéticos.
+    """
+
+    def __init__(self, diretorio_fixtures=None, universo=None, latencia=0.0, variacao=0.0, semente=42):
+        """
+        Args:
+            diretorio_fixtures (str): Diretório com as respostas gravadas (opcional).
+            universo (UniversoSintetico): Gerador de dados sintéticos (opcional).
+            latencia (float): Latência média injetada em cada resposta, em segundos.
+            variacao (float): Variação máxima (±) da latência, em segundos.
+            semente (int): Semente do sorteio da latência.
+        """
+        self.diretorio_fixtures = diretorio_fixtures
+        self.universo = universo
+        self.latencia = latencia
+        self.variacao = variacao
+        self._aleatorio = random.Random(semente)
+
+    def responder(self, endpoint, params):
+        """
+        Produz a resposta de uma consulta, aplicando a latência configurada.
+
+        Returns:
+            tuple: (código de status HTTP, corpo em bytes).
+        """
+        if self.latencia or self.variacao:
+            time.sleep(max(0.0, self.latencia + self._aleatorio.uniform(-self.variacao, self.variacao)))
+
+        if self.diretorio_fixtures:
+            caminho = caminho_fixture(self.diretorio_fixtures, endpoint, params)
+            if os.path.exists(caminho):
+                with open(caminho, 'rb') as arquivo:
+                    return 200, arquivo.read()
+
+        dados = self.universo.responder(endpoint, params) if self.universo else None
+        if dados is None:
+            return 404, json.dumps({'erro': f'Sem dados para {endpoint} com {params}'}).encode()
+        return 200, json.dumps({'dados': dados}).encode()
+
+
+class AdaptadorReplay(BaseAdapter):
+    """
+    Adaptador do `requests` que responde localmente pelo SimuladorAPI, sem acessar a rede.
+    """
+
+    def __init__(self, simulador):
+        super().__init__()
+        self.simulador = simulador
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        endpoint, params = interpretar_url(request.url)
+        status, corpo = self.simulador.responder(endpoint, params)
+
+        resposta = requests.Response()
+        resposta.status_code = status
+        resposta.reason = 'OK' if status == 200 else 'Not Found'
+        resposta.headers = CaseInsensitiveDict({
+            'Content-Type': 'application/json',
+            'Content-Length': str(len(corpo)),
+        })
+        resposta.raw = io.BytesIO(corpo)
+        resposta.encoding = 'utf-8'
+        resposta.url = request.url
+        resposta.request = request
+        return resposta
+
+    def close(self):
+        pass
+
+
+class AdaptadorGravador(HTTPAdapter):
+    """
+    Adaptador HTTP que acessa a API real e grava cada resposta bem-sucedida em disco.
+    """
+
+    def __init__(self, diretorio, **kwargs):
+        super().__init__(**kwargs)
+        self.diretorio = diretorio
+
+    def send(self, request, **kwargs):
+        resposta = super().send(request, **kwargs)
+        if resposta.status_code == 200:
+            endpoint, params = interpretar_url(request.url)
+            gravar_fixture(self.diretorio, endpoint, params, resposta.content)
+        return resposta
+
+
+def criar_simulador():
+    """
+    Cria o simulador a partir das configurações do .env.
+
+    Returns:
+        SimuladorAPI: Simulador com as gravações de API_FIXTURES_DIR e, se SIMULADOR_TICKERS > 0,
+                      um universo sintético para as consultas não gravadas.
+    """
+    universo = UniversoSintetico(SIMULADOR_TICKERS) if SIMULADOR_TICKERS > 0 else None
+    return SimuladorAPI(API_FIXTURES_DIR, universo=universo, latencia=SIMULADOR_LATENCIA)
+
+
+class _ManipuladorSimulador(BaseHTTPRequestHandler):
+    """
+    Atende as requisições HTTP do servidor local repassando-as ao SimuladorAPI.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        endpoint, params = interpretar_url(self.path)
+        status, corpo = self.server.simulador.responder(endpoint, params)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        logger.info("Simulador: " + formato, *args)
+
+
+def criar_servidor(simulador, host='127.0.0.1', porta=8765):
+    """
+    Cria um servidor HTTP local que imita a API do Laboratório de Finanças.
+
+    Args:
+        simulador (SimuladorAPI): Simulador que produz as respostas.
+        host (str): Endereço de escuta.
+        porta (int): Porta de escuta (0 escolhe uma porta livre).
+
+    Returns:
+        ThreadingHTTPServer: Servidor pronto para `serve_forever()`.
+    """
+    servidor = ThreadingHTTPServer((host, porta), _ManipuladorSimulador)
+    servidor.simulador = simulador
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API do Laboratório de Finanças.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--fixtures', default=API_FIXTURES_DIR, help="Diretório com respostas gravadas.")
+    parser.add_argument('--tickers', type=int, default=SIMULADOR_TICKERS or 500,
+                        help="Tickers do universo sintético (0 = apenas gravações).")
+    parser.add_argument('--inicio', default='1995-01-02', help="Primeira data dos preços sintéticos.")
+    parser.add_argument('--latencia', type=float, default=SIMULADOR_LATENCIA, help="Latência média (s).")
+    parser.add_argument('--variacao', type=float, default=0.0, help="Variação máxima da latência (s).")
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    universo = UniversoSintetico(args.tickers, args.inicio, args.semente) if args.tickers > 0 else None
+    simulador = SimuladorAPI(args.fixtures, universo, args.latencia, args.variacao, args.semente)
+    servidor = criar_servidor(simulador, args.host, args.porta)
+    print(f"Simulador da API em http://{args.host}:{servidor.server_port}/api/v1 (Ctrl+C para encerrar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,17 @@
 from datetime import datetime
+from backend.calendario import eh_dia_util
 
-def validar_dia_util(data, feriados):
+def validar_dia_util(data, feriados=None):
     """
     Verifica se uma data é dia útil (não é final de semana nem feriado).
 
     Args:
         data (datetime.date): Data a ser validada.
-        feriados (list): Lista de datas de feriados.
+        feriados (list): Lista de datas de feriados. Se None, usa o calendário da B3 (backend.calendario).
 
     Returns:
         bool: True se for dia útil, False caso contrário.
     """
+    if feriados is None:
+        return eh_dia_util(data)
     return data.weekday() < 5 and data not in feriados
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+from backend.config import obter_logger
+from backend.painel import montar_painel, retorno_acumulado
+from backend.ranking import Fator, normalizar_fatores, selecionar_top
+from backend.views import pegar_dados_ibovespa, pegar_planilhao_filtrado, pegar_preco_corrigido
+
+logger = obter_logger(__name__)
+
+# Indicadores disponíveis na página de Estratégia
+INDICADORES_RENTABILIDADE = ['roe', 'roc', 'roic']
+INDICADORES_DESCONTO = ['earning_yield', 'dividend_yield', 'p_vp']
+
+
+def ordenar_combinacoes(df_planilhao, indicadores_rentabilidade, indicadores_desconto, quantidade_maxima):
+    """
+    Ordena o universo uma vez por combinação de indicadores, ranqueando cada indicador uma única vez.
+
+    Args:
+        df_planilhao (pd.DataFrame): DataFrame do planilhão filtrado.
+        indicadores_rentabilidade (list): Indicadores de rentabilidade avaliados.
+        indicadores_desconto (list): Indicadores de desconto avaliados.
+        quantidade_maxima (int): Maior quantidade de ações avaliada.
+
+    Returns:
+        dict: {(rentabilidade, desconto): np.ndarray com as posições das melhores ações, em ordem}.
+    """
+    indicadores = list(dict.fromkeys(indicadores_rentabilidade + indicadores_desconto))
+    # Uma única matriz de notas (ações × indicadores), com a direção de cada indicador
+    notas = normalizar_fatores(df_planilhao, [Fator(indicador) for indicador in indicadores])
+    posicao = {indicador: j for j, indicador in enumerate(indicadores)}
+
+    ordens = {}
+    for rentabilidade in indicadores_rentabilidade:
+        for desconto in indicadores_desconto:
+            # Mesmo critério de gerar_carteira: soma dos rankings e seleção parcial das melhores
+            pontuacao = notas[:, posicao[rentabilidade]] + notas[:, posicao[desconto]]
+            ordens[(rentabilidade, desconto)] = selecionar_top(pontuacao, quantidade_maxima)
+    return ordens
+
+
+def _metricas_prefixos(retornos):
+    """
+    Calcula, de uma só vez, as séries das carteiras formadas pelas N primeiras colunas.
+
+    Args:
+        retornos (np.ndarray): Retornos acumulados (datas × ações), colunas na ordem do ranking.
+
+    Returns:
+        np.ndarray: Retorno acumulado médio das carteiras top-1..top-N (datas × N).
+    """
+    disponiveis = ~np.isnan(retornos)
+    somas = np.cumsum(np.where(disponiveis, retornos, 0.0), axis=1)
+    quantidades = np.cumsum(disponiveis, axis=1)
+    return np.divide(somas, quantidades, out=np.full(somas.shape, np.nan), where=quantidades > 0)
+
+
+def varrer_parametros(data_base, data_ini, data_fim, indicadores_rentabilidade=None,
+                      indicadores_desconto=None, quantidade_maxima=20):
+    """
+    Avalia todas as combinações de indicadores e tamanhos de carteira em uma única execução.
+
+    O planilhão e os preços são obtidos uma única vez; cada combinação de indicadores é ordenada
+    uma vez e todas as carteiras top-1..top-N são derivadas da mesma ordenação.
+
+    Args:
+        data_base (str): Data base do planilhão no formato 'YYYY-MM-DD'.
+        data_ini (str): Data inicial do período de avaliação no formato 'YYYY-MM-DD'.
+        data_fim (str): Data final do período de avaliação no formato 'YYYY-MM-DD'.
+        indicadores_rentabilidade (list): Indicadores de rentabilidade (padrão: todos).
+        indicadores_desconto (list): Indicadores de desconto (padrão: todos).
+        quantidade_maxima (int): Avalia carteiras de 1 até esta quantidade de ações.
+
+    Returns:
+        pd.DataFrame: Uma linha por combinação, com retorno, volatilidade e drawdown da carteira
+                      e o retorno do Ibovespa no período.
+    """
+    indicadores_rentabilidade = indicadores_rentabilidade or INDICADORES_RENTABILIDADE
+    indicadores_desconto = indicadores_desconto or INDICADORES_DESCONTO
+    logger.info("Iniciando varredura de %s "
+                "combinações de indicadores com até %s ações.",
+                len(indicadores_rentabilidade) * len(indicadores_desconto), quantidade_maxima)
+    try:
+        df_planilhao = pegar_planilhao_filtrado(data_base)
+        if df_planilhao.empty:
+            logger.warning("Planilhão vazio para a data base: %s", data_base)
+            return pd.DataFrame()
+        ordens = ordenar_combinacoes(df_planilhao, indicadores_rentabilidade, indicadores_desconto,
+                                     quantidade_maxima)
+
+        # Baixa os preços de todas as ações que aparecem em alguma carteira, uma única vez
+        tickers_planilhao = df_planilhao['ticker'].to_numpy()
+        tickers = list(dict.fromkeys(tickers_planilhao[np.concatenate(list(ordens.values()))]))
+        df_precos = pegar_preco_corrigido(tickers, data_ini, data_fim)
+        df_ibovespa = pegar_dados_ibovespa(data_ini, data_fim)
+        if df_precos.empty or df_ibovespa.empty:
+            logger.warning("Sem preços suficientes para a varredura.")
+            return pd.DataFrame()
+
+        df_ibovespa = df_ibovespa.sort_values(by='data').reset_index(drop=True)
+        _, colunas_painel, precos = montar_painel(df_precos, df_ibovespa['data'])
+        retornos = retorno_acumulado(precos)
+        retorno_ibovespa = retorno_acumulado(df_ibovespa['fechamento'].to_numpy(dtype=float))[-1]
+
+        linhas = []
+        for (rentabilidade, desconto), ordem in ordens.items():
+            colunas = colunas_painel.get_indexer(tickers_planilhao[ordem])
+            retornos_ordenados = np.where(colunas >= 0, retornos[:, np.maximum(colunas, 0)], np.nan)
+            series = _metricas_prefixos(retornos_ordenados)
+
+            # Métricas de todas as quantidades de ações em operações vetorizadas
+            cotas = series + 1
+            variacoes = cotas[1:] / cotas[:-1] - 1
+            volatilidade = np.nanstd(variacoes, axis=0) * np.sqrt(252) if len(variacoes) else np.nan
+            drawdown = np.nanmin(cotas / np.fmax.accumulate(cotas, axis=0) - 1, axis=0)
+            for quantidade in range(series.shape[1]):
+                linhas.append({
+                    'indicador_rentabilidade': rentabilidade,
+                    'indicador_desconto': desconto,
+                    'quantidade_acoes': quantidade + 1,
+                    'retorno_carteira': series[-1, quantidade],
+                    'retorno_ibovespa': retorno_ibovespa,
+                    'excesso_retorno': series[-1, quantidade] - retorno_ibovespa,
+                    'volatilidade_anual': volatilidade[quantidade] if np.ndim(volatilidade) else volatilidade,
+                    'max_drawdown': drawdown[quantidade],
+                })
+
+        df_resultado = pd.DataFrame(linhas)
+        logger.info("Varredura concluída com %s combinações avaliadas.", len(df_resultado))
+        return df_resultado
+    except Exception as e:
+        logger.error("Erro ao executar a varredura de parâmetros: %s", e)
+        raise
@@ -1,12 +1,34 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
+from backend.amostragem import reduzir_serie
 from backend.apis import obter_dados_planilhao, obter_preco_corrigido, obter_preco_ibovespa
-from backend.config import logger
+from backend.armazem import armazem_precos
+from backend.config import GRAFICO_LIMITE_WEBGL, GRAFICO_PONTOS_MAX, MAX_WORKERS, obter_logger
+from backend.historico import historico_precos
+from backend.memoria import memoria_views
+from backend.metricas import metricas
+from backend.painel import media_carteira, montar_painel, preencher_adiante, retorno_acumulado
+from backend import risco
+from backend.ranking import calcular_pontuacao, fatores_magic_formula, montar_ranking, pesos_neutros
 
+logger = obter_logger(__name__)
 
+# Colunas exibidas nas carteiras (além da pontuação 'ranking' e do 'peso')
+COLUNAS_CARTEIRA = ['ticker', 'setor', 'roc', 'roe', 'roic', 'earning_yield', 'dividend_yield', 'p_vp']
+
+# Formas de ponderar as ações da carteira
+PONDERACOES = ('igual', 'neutra_setor')
+
+
+@metricas.medir('views.filtrar_duplicadas_ms')
 def filtrar_duplicadas(df):
     """
     Filtra as ações duplicadas no DataFrame, selecionando a de maior volume.
 
+    O DataFrame recebido não é alterado.
+
     Args:
         df (pd.DataFrame): DataFrame com as ações brutas.
 
@@ -15,31 +37,76 @@ def filtrar_duplicadas(df):
     """
     logger.info("Iniciando filtragem de ações duplicadas com base no volume.")
     try:
-        # Adiciona uma coluna base para identificar duplicatas (ignora o número final no ticker)
-        df['base_ticker'] = df['ticker'].str.extract(r'([A-Z]+)')
-        
-        # Seleciona a ação com o maior volume dentro dos duplicados
-        df_filtrado = (
-            df.sort_values(by='volume', ascending=False)  # Ordena por volume decrescente
-            .drop_duplicates(subset='base_ticker', keep='first')  # Mantém o maior volume por base_ticker
-        )
-        
-        # Remove a coluna auxiliar e reinicia os indices começando em 1
-        df_filtrado.drop(columns=['base_ticker'], inplace=True)
-        df_filtrado.reset_index(drop=True, inplace=True)  # Reinicia os índices
+        # Ordena por volume decrescente para manter a ação de maior volume de cada empresa
+        df_ordenado = df.sort_values(by='volume', ascending=False)
+
+        # Base do ticker para identificar duplicatas (ignora o número final no ticker)
+        base_ticker = df_ordenado['ticker'].str.extract(r'([A-Z]+)', expand=False)
+        df_filtrado = df_ordenado[~base_ticker.duplicated(keep='first')]
+
+        # Reinicia os indices começando em 1
+        df_filtrado = df_filtrado.reset_index(drop=True)
         df_filtrado.index = df_filtrado.index + 1  # Ajusta para começar em 1
         
-        logger.info(f"Filtragem de duplicatas concluída. Total de ações restantes: {len(df_filtrado)}")
+        logger.info("Filtragem de duplicatas concluída. Total de ações restantes: %s", len(df_filtrado))
         return df_filtrado
     except Exception as e:
-        logger.error(f"Erro ao filtrar ações duplicadas: {e}")
+        logger.error("Erro ao filtrar ações duplicadas: %s", e)
         raise
 
 
+def _planilhao_bruto(data_base):
+    """
+    Planilhão bruto da data base, memorizado por data.
+    """
+    return memoria_views.obter_ou_calcular(
+        ('planilhao', data_base), lambda: obter_dados_planilhao(data_base), data_base
+    )
+
+
+def _calcular_planilhao_sem_duplicadas(data_base):
+    """
+    Remove as duplicatas do planilhão bruto da data base.
+    """
+    df_planilhao = _planilhao_bruto(data_base)
+    return df_planilhao if df_planilhao.empty else filtrar_duplicadas(df_planilhao)
+
+
+def _planilhao_sem_duplicadas(data_base):
+    """
+    Planilhão da data base sem duplicatas, memorizado por data.
+    """
+    return memoria_views.obter_ou_calcular(
+        ('planilhao-sem-duplicadas', data_base), lambda: _calcular_planilhao_sem_duplicadas(data_base), data_base
+    )
+
+
+def _pontuacao_magic_formula(data_base, indicador_rentabilidade, indicador_desconto, ranking_setorial=False):
+    """
+    Pontuação da Magic Formula de cada ação do planilhão sem duplicatas, memorizada por data,
+    indicadores e modo de ranking (mercado inteiro ou dentro de cada setor).
+    """
+    def calcular():
+        df_planilhao = _planilhao_sem_duplicadas(data_base)
+        if df_planilhao.empty:
+            return np.array([])
+        fatores = fatores_magic_formula(indicador_rentabilidade, indicador_desconto)
+        with metricas.cronometro("views.pontuacao_ms"):
+            return calcular_pontuacao(df_planilhao, fatores, grupo='setor' if ranking_setorial else None)
+
+    return memoria_views.obter_ou_calcular(
+        ('pontuacao', data_base, indicador_rentabilidade, indicador_desconto, ranking_setorial), calcular, data_base
+    )
+
+
+@metricas.medir('views.pegar_planilhao_filtrado_ms')
 def pegar_planilhao_filtrado(data_base, setores=None):
     """
     Obtém o DataFrame do planilhão filtrado, com duplicatas removidas e setores opcionais.
 
+    O planilhão sem duplicatas fica memorizado por data base; trocar os setores apenas
+    recorta o resultado já calculado.
+
     Args:
         data_base (str): Data base para consulta no formato 'YYYY-MM-DD'.
         setores (list): Lista de setores para filtrar (opcional).
@@ -47,72 +114,169 @@ def pegar_planilhao_filtrado(data_base, setores=None):
     Returns:
         pd.DataFrame: DataFrame do planilhão filtrado e limpo.
     """
-    logger.info(f"Obtendo planilhão filtrado para a data base: {data_base}")
+    logger.info("Obtendo planilhão filtrado para a data base: %s", data_base)
     try:
-        # Obtém o DataFrame bruto do planilhão
-        df_planilhao = obter_dados_planilhao(data_base)
+        # Obtém o planilhão sem duplicatas (memorizado por data base)
+        df_filtrado = _planilhao_sem_duplicadas(data_base)
 
         # Verifica se o DataFrame retornou vazio
-        if df_planilhao.empty:
-            logger.warning(f"Planilhão vazio para a data base: {data_base}")
+        if df_filtrado.empty:
+            logger.warning("Planilhão vazio para a data base: %s", data_base)
             return pd.DataFrame()
 
-        # Filtra duplicatas
-        df_filtrado = filtrar_duplicadas(df_planilhao)
-
         # Filtra por setores, se fornecido
         if setores:
-            logger.info(f"Filtrando setores: {setores}")
+            logger.info("Filtrando setores: %s", setores)
             df_filtrado = df_filtrado[df_filtrado['setor'].isin(setores)]
 
-        logger.info(f"Planilhão filtrado com sucesso. Total de ações: {len(df_filtrado)}")
+        # Devolve uma cópia para que o resultado memorizado não seja alterado por quem o usa
+        df_filtrado = df_filtrado.copy()
+
+        logger.info("Planilhão filtrado com sucesso. Total de ações: %s", len(df_filtrado))
         return df_filtrado
     except Exception as e:
-        logger.error(f"Erro ao obter e filtrar o planilhão: {e}")
+        logger.error("Erro ao obter e filtrar o planilhão: %s", e)
         raise
 
 
-def pegar_preco_corrigido(lista_tickers, data_ini, data_fim):
+def planilhao_compartilhado(data_base, setores=None):
+    """
+    Planilhão filtrado compartilhado entre as sessões, para ser guardado no session_state.
+
+    Todas as sessões que pedem a mesma data e os mesmos setores recebem o mesmo DataFrame
+    (sem cópia), e pedidos simultâneos consultam a API uma única vez. O DataFrame não deve
+    ser alterado por quem o recebe.
+
+    Args:
+        data_base (str): Data base para consulta no formato 'YYYY-MM-DD'.
+        setores (list): Lista de setores para filtrar (opcional).
+
+    Returns:
+        Referencia: Referência cujo atributo `valor` é o DataFrame do planilhão filtrado.
+    """
+    if not setores:
+        return memoria_views.referenciar(
+            ('planilhao-sem-duplicadas', data_base), lambda: _calcular_planilhao_sem_duplicadas(data_base), data_base
+        )
+
+    def calcular():
+        df_planilhao = _planilhao_sem_duplicadas(data_base)
+        return df_planilhao if df_planilhao.empty else df_planilhao[df_planilhao['setor'].isin(setores)]
+
+    return memoria_views.referenciar(('planilhao-filtrado', data_base, tuple(sorted(setores))), calcular, data_base)
+
+
+def _obter_serie(chave, data_ini, data_fim, consultar):
+    """
+    Busca uma série de preços no armazém local mapeado em memória ou, se ele estiver desativado,
+    no histórico incremental. Em ambos, apenas as lacunas são consultadas na API.
+    """
+    armazenamento = armazem_precos if armazem_precos.ativo else historico_precos
+    return armazenamento.obter(chave, data_ini, data_fim, consultar)
+
+
+def _consulta_preco(ticker):
+    """
+    Retorna a função (data_ini, data_fim) que consulta na API os preços corrigidos do ticker.
+    """
+    return lambda ini, fim: obter_preco_corrigido(ticker, ini, fim)
+
+
+def validar_max_workers(max_workers):
+    """
+    Resolve o número de consultas simultâneas: None usa MAX_WORKERS; valores menores que 1 são rejeitados.
+    """
+    if max_workers is None:
+        return MAX_WORKERS
+    if max_workers < 1:
+        raise ValueError(f"max_workers inválido: {max_workers}. Use um inteiro maior ou igual a 1.")
+    return max_workers
+
+
+def _consultar_preco_ticker(ticker, data_ini, data_fim):
+    """
+    Consulta os preços corrigidos de um único ticker medindo a latência da chamada.
+
+    Args:
+        ticker (str): Código do ativo (ex.: PETR4).
+        data_ini (str): Data inicial no formato 'YYYY-MM-DD'.
+        data_fim (str): Data final no formato 'YYYY-MM-DD'.
+
+    Returns:
+        tuple: (DataFrame com os preços ou None em caso de falha, latência em segundos).
+    """
+    inicio = time.perf_counter()
+    try:
+        # Busca na API apenas o trecho do período que ainda não está no histórico local
+        df_precos = _obter_serie(f"preco-corrigido/{ticker}", data_ini, data_fim, _consulta_preco(ticker))
+        df_precos['ticker'] = ticker  # Adiciona o ticker ao DataFrame
+    except Exception as e:
+        logger.warning("Erro ao consultar preços corrigidos para %s: %s", ticker, e)
+        df_precos = None
+    return df_precos, time.perf_counter() - inicio
+
+
+@metricas.medir('views.pegar_preco_corrigido_ms')
+def pegar_preco_corrigido(lista_tickers, data_ini, data_fim, max_workers=None):
     """
     Obtém os dados de preço corrigido para uma lista de tickers no período fornecido.
 
+    As consultas são feitas em paralelo, limitadas a `max_workers` chamadas simultâneas.
+    Tickers com erro são ignorados e o resultado mantém a ordem de `lista_tickers`.
+    A latência de cada consulta fica registrada no log e em `df.attrs['latencias']`.
+
     Args:
         lista_tickers (list): Lista de códigos dos ativos (ex.: ['PETR4', 'VALE3']).
         data_ini (str): Data inicial no formato 'YYYY-MM-DD'.
         data_fim (str): Data final no formato 'YYYY-MM-DD'.
+        max_workers (int): Número máximo de consultas simultâneas (padrão: MAX_WORKERS; 1 = sequencial).
 
     Returns:
         pd.DataFrame: DataFrame contendo os preços corrigidos de todos os tickers, com índices reiniciados.
+
+    Raises:
+        ValueError: Se `max_workers` for menor que 1.
     """
-    logger.info(f"Obtendo preços corrigidos para {len(lista_tickers)} tickers de {data_ini} a {data_fim}")
+    max_workers = validar_max_workers(max_workers)
+    logger.info("Obtendo preços corrigidos para %s tickers de %s a %s "
+                "(até %s consultas simultâneas)", len(lista_tickers), data_ini, data_fim, max_workers)
     try:
-        # Lista para armazenar os DataFrames individuais
+        if max_workers <= 1 or len(lista_tickers) <= 1:
+            resultados = [_consultar_preco_ticker(ticker, data_ini, data_fim) for ticker in lista_tickers]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(lista_tickers))) as executor:
+                # map preserva a ordem da lista de entrada, independentemente da ordem de conclusão
+                resultados = list(executor.map(
+                    lambda ticker: _consultar_preco_ticker(ticker, data_ini, data_fim),
+                    lista_tickers
+                ))
+
+        # Separa os DataFrames válidos e registra a latência de cada ticker
         lista_dfs = []
-
-        for ticker in lista_tickers:
-            logger.info(f"Consultando preços corrigidos para {ticker}")
-            try:
-                # Obter preços corrigidos para o ticker atual
-                df_precos = obter_preco_corrigido(ticker, data_ini, data_fim)
-                df_precos['ticker'] = ticker  # Adiciona o ticker ao DataFrame
+        latencias = {}
+        for ticker, (df_precos, latencia) in zip(lista_tickers, resultados):
+            latencias[ticker] = latencia
+            metricas.observar("views.preco_ticker_ms", latencia * 1000)
+            logger.debug("Latência da consulta de %s: %.3fs", ticker, latencia)
+            if df_precos is not None:
                 lista_dfs.append(df_precos)
-            except Exception as e:
-                logger.warning(f"Erro ao consultar preços corrigidos para {ticker}: {e}")
-                continue
 
         # Combina todos os DataFrames em um único DataFrame
         if lista_dfs:
             df_final = pd.concat(lista_dfs, ignore_index=True)
             df_final.reset_index(drop=True, inplace=True)  # Reinicia os índices
-            logger.info(f"Preços corrigidos obtidos com sucesso para todos os tickers. Total de registros: {len(df_final)}")
+            df_final.attrs['latencias'] = latencias
+            logger.info("Preços corrigidos obtidos com sucesso para todos os tickers. Total de registros: %s",
+                        len(df_final))
             return df_final
         else:
             logger.warning("Nenhum dado de preço corrigido foi obtido para os tickers fornecidos.")
             return pd.DataFrame()
     except Exception as e:
-        logger.error(f"Erro ao obter preços corrigidos para a lista de tickers: {e}")
+        logger.error("Erro ao obter preços corrigidos para a lista de tickers: %s", e)
         raise
 
+@metricas.medir('views.pegar_dados_ibovespa_ms')
 def pegar_dados_ibovespa(data_ini, data_fim):
     """
     Obtém os dados de preço histórico do Ibovespa no período fornecido.
@@ -124,25 +288,28 @@ def pegar_dados_ibovespa(data_ini, data_fim):
     Returns:
         pd.DataFrame: DataFrame contendo os preços históricos do Ibovespa, com índices reiniciados.
     """
-    logger.info(f"Obtendo dados do Ibovespa de {data_ini} a {data_fim}")
+    logger.info("Obtendo dados do Ibovespa de %s a %s", data_ini, data_fim)
     try:
-        # Chama a API para obter os preços do Ibovespa
-        df_ibovespa = obter_preco_ibovespa(data_ini, data_fim)
+        # Obtém os preços do Ibovespa, consultando a API apenas nas lacunas do histórico local
+        df_ibovespa = _obter_serie("preco-diversos/ibov", data_ini, data_fim, obter_preco_ibovespa)
         
         # Verifica se o DataFrame está vazio
         if df_ibovespa.empty:
-            logger.warning(f"Nenhum dado do Ibovespa encontrado para o período de {data_ini} a {data_fim}.")
+            logger.warning("Nenhum dado do Ibovespa encontrado para o período de %s a %s.", data_ini, data_fim)
             return pd.DataFrame()
         
         # Reinicia os índices
         df_ibovespa.reset_index(drop=True, inplace=True)
-        logger.info(f"Dados do Ibovespa obtidos com sucesso. Total de registros: {len(df_ibovespa)}")
+        logger.info("Dados do Ibovespa obtidos com sucesso. Total de registros: %s", len(df_ibovespa))
         return df_ibovespa
     except Exception as e:
-        logger.error(f"Erro ao obter dados do Ibovespa: {e}")
+        logger.error("Erro ao obter dados do Ibovespa: %s", e)
         raise
 
-def gerar_carteira(data_base, indicador_rentabilidade, indicador_desconto, quantidade_acoes):
+
+@metricas.medir('views.gerar_carteira_ms')
+def gerar_carteira(data_base, indicador_rentabilidade, indicador_desconto, quantidade_acoes,
+                   ranking_setorial=False, maximo_por_setor=None, ponderacao='igual'):
     """
     Gera uma carteira de investimentos utilizando a Magic Formula.
 
@@ -151,135 +318,511 @@ def gerar_carteira(data_base, indicador_rentabilidade, indicador_desconto, quant
         indicador_rentabilidade (str): Indicador de rentabilidade (ex.: 'roe' ou 'roic').
         indicador_desconto (str): Indicador de desconto (ex.: 'earning_yield' ou 'dividend_yield').
         quantidade_acoes (int): Número de ações na carteira.
+        ranking_setorial (bool): Se True, cada ação é ranqueada apenas contra as do mesmo setor
+                                 (percentis por setor), evitando que um setor domine a carteira.
+        maximo_por_setor (int): Máximo de ações de um mesmo setor (None = sem limite).
+        ponderacao (str): 'igual' (mesmo peso por ação) ou 'neutra_setor' (mesmo peso por setor,
+                          dividido igualmente entre as ações do setor).
 
     Returns:
-        pd.DataFrame: DataFrame contendo as ações selecionadas para a carteira, com rankings.
+        pd.DataFrame: DataFrame contendo as ações selecionadas para a carteira, com rankings e pesos.
     """
-    logger.info(f"Gerando carteira para a data base: {data_base}, "
-                f"com indicadores {indicador_rentabilidade} e {indicador_desconto}, "
-                f"selecionando {quantidade_acoes} ações.")
+    if ponderacao not in PONDERACOES:
+        raise ValueError(f"Ponderação inválida: {ponderacao}. Use {', '.join(PONDERACOES)}.")
+    logger.info("Gerando carteira para a data base: %s, "
+                "com indicadores %s e %s, "
+                "selecionando %s ações.", data_base, indicador_rentabilidade, indicador_desconto,
+                quantidade_acoes)
     try:
-        # Obtém o DataFrame filtrado do planilhão
-        df_planilhao = pegar_planilhao_filtrado(data_base)
+        # Obtém o planilhão sem duplicatas e a pontuação da Magic Formula (memorizados)
+        df_planilhao = _planilhao_sem_duplicadas(data_base)
 
         # Verifica se o DataFrame está vazio
         if df_planilhao.empty:
-            logger.warning(f"Planilhão retornou vazio para a data base: {data_base}")
+            logger.warning("Planilhão retornou vazio para a data base: %s", data_base)
             return pd.DataFrame()
+        pontuacao = _pontuacao_magic_formula(data_base, indicador_rentabilidade, indicador_desconto,
+                                             ranking_setorial)
 
-        # Gera rankings individuais para os indicadores
-        logger.info("Calculando rankings para os indicadores.")
-        df_planilhao['ranking_rentabilidade'] = df_planilhao[indicador_rentabilidade].rank()
-        df_planilhao['ranking_desconto'] = df_planilhao[indicador_desconto].rank()
+        # Seleciona as melhores ações para a carteira (seleção parcial, sem ordenar o universo)
+        with metricas.cronometro("views.selecao_ms"):
+            df_carteira = montar_ranking(df_planilhao[COLUNAS_CARTEIRA], pontuacao, quantidade_acoes,
+                                         'setor', maximo_por_setor)
 
-        # Soma os rankings para obter o ranking final
-        df_planilhao['ranking'] = df_planilhao['ranking_rentabilidade'] + df_planilhao['ranking_desconto']
-
-        # Ordena pelo ranking final
-        df_planilhao = df_planilhao.sort_values(by='ranking',ascending=False).reset_index(drop=True)
-        df_planilhao = df_planilhao[['ticker','setor','roc','roe','roic','earning_yield','dividend_yield','p_vp','ranking']]
-        # Seleciona as melhores ações para a carteira
-        df_carteira = df_planilhao.head(quantidade_acoes)
+        # Pesos de cada ação na carteira
+        if ponderacao == 'neutra_setor':
+            df_carteira['peso'] = pesos_neutros(df_carteira['setor'])
+        else:
+            df_carteira['peso'] = np.full(len(df_carteira), 1 / max(len(df_carteira), 1))
         df_carteira.index = df_carteira.index + 1
-        logger.info(f"Carteira gerada com sucesso. Total de ações selecionadas: {len(df_carteira)}")
+        logger.info("Carteira gerada com sucesso. Total de ações selecionadas: %s", len(df_carteira))
         return df_carteira
     except Exception as e:
-        logger.error(f"Erro ao gerar carteira: {e}")
+        logger.error("Erro ao gerar carteira: %s", e)
         raise
 
 
-def agrupar_dados(carteira, data_ini, data_fim):
+def carteira_compartilhada(data_base, indicador_rentabilidade, indicador_desconto, quantidade_acoes,
+                           ranking_setorial=False, maximo_por_setor=None, ponderacao='igual'):
+    """
+    Carteira da Magic Formula compartilhada entre as sessões, para ser guardada no session_state.
+
+    Os parâmetros são os de gerar_carteira. Sessões com os mesmos parâmetros recebem o mesmo
+    DataFrame, que não deve ser alterado por quem o recebe.
+
+    Returns:
+        Referencia: Referência cujo atributo `valor` é o DataFrame da carteira.
+    """
+    chave = ('carteira', data_base, indicador_rentabilidade, indicador_desconto, quantidade_acoes,
+             ranking_setorial, maximo_por_setor, ponderacao)
+    return memoria_views.referenciar(
+        chave,
+        lambda: gerar_carteira(data_base, indicador_rentabilidade, indicador_desconto, quantidade_acoes,
+                               ranking_setorial, maximo_por_setor, ponderacao),
+        data_base
+    )
+
+
+def _alinhar_precos(carteira, data_ini, data_fim, max_workers=None, preenchimento='mascara'):
+    """
+    Obtém os preços da carteira e do Ibovespa e os organiza em uma matriz data × ticker
+    alinhada aos pregões do Ibovespa.
+
+    O resultado fica memorizado pelos tickers, pesos, período e preenchimento: sessões que
+    analisam a mesma carteira compartilham a matriz (somente leitura) e as consultas de preço.
+
+    Returns:
+        tuple: (DataFrame do Ibovespa ordenado por data, pd.Index de tickers, matriz de preços,
+               pesos dos tickers ou None), ou uma tupla vazia se faltarem preços.
+    """
+    def calcular():
+        if armazem_precos.ativo and np.datetime64(data_ini, 'D') >= armazem_precos.inicio:
+            return _precos_alinhados_armazem(carteira, data_ini, data_fim, max_workers, preenchimento)
+        # Obter preços corrigidos para os tickers da carteira e do Ibovespa
+        df_precos_carteira = pegar_preco_corrigido(carteira['ticker'].tolist(), data_ini, data_fim, max_workers)
+        df_ibovespa = pegar_dados_ibovespa(data_ini, data_fim)
+        return _montar_precos_alinhados(carteira, df_precos_carteira, df_ibovespa, preenchimento)
+
+    return memoria_views.obter_ou_calcular(
+        _chave_precos_alinhados(carteira, data_ini, data_fim, preenchimento), calcular, data_fim
+    )
+
+
+def _chave_precos_alinhados(carteira, data_ini, data_fim, preenchimento):
+    """
+    Chave da matriz de preços alinhada na memória compartilhada.
+    """
+    pesos_carteira = tuple(carteira['peso'].tolist()) if 'peso' in carteira else None
+    return ('precos-alinhados', tuple(carteira['ticker'].tolist()), pesos_carteira, data_ini, data_fim, preenchimento)
+
+
+def _montar_precos_alinhados(carteira, df_precos_carteira, df_ibovespa, preenchimento):
+    """
+    Monta o resultado de _alinhar_precos a partir dos preços já consultados (sem memorização).
+    """
+    if df_precos_carteira.empty or df_ibovespa.empty:
+        return ()
+
+    # Monta a matriz de preços alinhada ao calendário do Ibovespa
+    df_ibovespa = df_ibovespa.sort_values(by='data').reset_index(drop=True)
+    with metricas.cronometro("views.montar_painel_ms"):
+        _, tickers, precos = montar_painel(df_precos_carteira, df_ibovespa['data'], preenchimento=preenchimento)
+
+    # Pesos na ordem das colunas da matriz (carteiras sem a coluna 'peso' usam pesos iguais)
+    pesos = None
+    if 'peso' in carteira:
+        pesos = carteira.set_index('ticker')['peso'].reindex(tickers).to_numpy(dtype=float)
+    precos.flags.writeable = False  # Compartilhada entre as sessões pela memória
+    return df_ibovespa, tickers, precos, pesos
+
+
+def _precos_alinhados_armazem(carteira, data_ini, data_fim, max_workers, preenchimento):
+    """
+    Monta o resultado de _alinhar_precos lendo a matriz direto do armazém local (sem memorização).
+
+    Nenhum DataFrame é montado por ticker: a matriz do período é uma visão do arquivo mapeado, e a
+    única cópia é a seleção das linhas com pregão do Ibovespa. O resultado é igual ao de
+    _montar_precos_alinhados sobre os mesmos preços.
+    """
+    lista_tickers = carteira['ticker'].tolist()
+    df_ibovespa = pegar_dados_ibovespa(data_ini, data_fim)
+
+    def garantir(ticker):
+        # Completa a série do ticker no armazém (apenas as lacunas vão à API)
+        try:
+            armazem_precos.garantir(f"preco-corrigido/{ticker}", data_ini, data_fim, _consulta_preco(ticker))
+            return True
+        except Exception as e:
+            logger.warning("Erro ao consultar preços corrigidos para %s: %s", ticker, e)
+            return False
+
+    if not lista_tickers or df_ibovespa.empty:
+        return ()
+    with ThreadPoolExecutor(max_workers=min(validar_max_workers(max_workers), len(lista_tickers))) as executor:
+        disponiveis = [ticker for ticker, ok in zip(lista_tickers, executor.map(garantir, lista_tickers)) if ok]
+    if not disponiveis:
+        return ()
+
+    df_ibovespa = df_ibovespa.sort_values(by='data').reset_index(drop=True)
+    with metricas.cronometro("views.montar_painel_ms"):
+        datas, matriz = armazem_precos.fatia([f"preco-corrigido/{ticker}" for ticker in disponiveis],
+                                             data_ini, data_fim)
+        # Tickers sem nenhum preço no período ficam de fora, como em montar_painel
+        colunas = np.flatnonzero(~np.isnan(matriz).all(axis=0))
+        if not len(datas) or not len(colunas):
+            return ()
+        datas_ibovespa = pd.to_datetime(df_ibovespa['data']).to_numpy().astype('datetime64[D]')
+        linhas = np.minimum(np.searchsorted(datas, datas_ibovespa), len(datas) - 1)
+        precos = matriz[np.ix_(linhas, colunas)]
+        precos[datas[linhas] != datas_ibovespa] = np.nan
+        if preenchimento == 'ffill':
+            precos = preencher_adiante(precos)
+        elif preenchimento != 'mascara':
+            raise ValueError(f"Preenchimento inválido: {preenchimento}. Use 'mascara' ou 'ffill'.")
+    tickers = pd.Index([disponiveis[coluna] for coluna in colunas])
+
+    pesos = None
+    if 'peso' in carteira:
+        pesos = carteira.set_index('ticker')['peso'].reindex(tickers).to_numpy(dtype=float)
+    precos.flags.writeable = False  # Compartilhada entre as sessões pela memória
+    return df_ibovespa, tickers, precos, pesos
+
+
+def _dados_grafico(datas, retorno_carteira, retorno_ibovespa):
+    """
+    Monta o DataFrame do gráfico, mantendo apenas as datas em que a carteira tem dados.
+    """
+    df_final = pd.DataFrame({
+        'data': datas,
+        'retorno_acumulado_carteira': retorno_carteira,
+        'retorno_acumulado_ibovespa': retorno_ibovespa,
+    })
+    return df_final[~np.isnan(retorno_carteira)].reset_index(drop=True)
+
+
+@metricas.medir('views.agrupar_dados_ms')
+def agrupar_dados(carteira, data_ini, data_fim, max_workers=None, preenchimento='mascara'):
     """
     Organiza os dados para o gráfico comparativo entre a carteira e o Ibovespa.
 
+    Os preços são organizados em uma matriz data × ticker alinhada aos pregões do Ibovespa,
+    e os retornos acumulados são calculados com operações vetorizadas sobre essa matriz.
+
     Args:
         carteira (pd.DataFrame): DataFrame contendo os dados da carteira.
         data_ini (str): Data inicial no formato 'YYYY-MM-DD'.
         data_fim (str): Data final no formato 'YYYY-MM-DD'.
+        max_workers (int): Número máximo de consultas de preço simultâneas (opcional).
+        preenchimento (str): Tratamento de dias sem preço de um ticker: 'mascara' (ignora o ticker
+                             naquele dia) ou 'ffill' (repete o último preço conhecido).
 
     Returns:
         pd.DataFrame: DataFrame contendo as informações necessárias para o gráfico.
     """
-    logger.info(f"Organizando dados para gráfico de {data_ini} a {data_fim}.")
+    logger.info("Organizando dados para gráfico de %s a %s.", data_ini, data_fim)
     try:
-        # Obter preços corrigidos para os tickers da carteira
-        lista_tickers = carteira['ticker'].tolist()
-        df_precos_carteira = pegar_preco_corrigido(lista_tickers, data_ini, data_fim)
-
-        # Obter preços do Ibovespa
-        df_ibovespa = pegar_dados_ibovespa(data_ini, data_fim)
+        alinhados = _alinhar_precos(carteira, data_ini, data_fim, max_workers, preenchimento)
+        if not alinhados:
+            logger.warning("Sem preços suficientes para montar o gráfico.")
+            return pd.DataFrame()
+        df_ibovespa, _, precos, pesos = alinhados
 
-        # Calcula o retorno acumulado para cada ticker na carteira
+        # Calcula o retorno acumulado de cada ticker e a média da carteira (ponderada, se houver pesos)
         logger.info("Calculando retorno acumulado para a carteira.")
-        df_precos_carteira['retorno_acumulado'] = (
-            df_precos_carteira.groupby('ticker')['fechamento']
-            .transform(lambda x: x / x.iloc[0] - 1)
-        )
-
-        # Calcula o retorno acumulado médio da carteira
-        df_carteira_agrupado = (
-            df_precos_carteira.groupby('data')['retorno_acumulado']
-            .mean()
-            .reset_index()
-            .rename(columns={'retorno_acumulado': 'retorno_acumulado_carteira'})
-        )
+        retorno_carteira = media_carteira(retorno_acumulado(precos), pesos)
 
         # Calcula o retorno acumulado para o Ibovespa usando a coluna 'fechamento'
         logger.info("Calculando retorno acumulado para o Ibovespa.")
-        df_ibovespa['retorno_acumulado_ibovespa'] = (
-            df_ibovespa['fechamento'] / df_ibovespa['fechamento'].iloc[0] - 1
-        )
+        retorno_ibovespa = retorno_acumulado(df_ibovespa['fechamento'].to_numpy(dtype=float))
 
-        # Junta os dados da carteira e do Ibovespa
-        df_final = df_carteira_agrupado.merge(
-            df_ibovespa[['data', 'retorno_acumulado_ibovespa']],
-            on='data',
-            how='inner'
-        )
+        df_final = _dados_grafico(df_ibovespa['data'], retorno_carteira, retorno_ibovespa)
 
         logger.info("Dados organizados com sucesso para o gráfico.")
         return df_final  # Certifica-se de retornar apenas o DataFrame final
     except Exception as e:
-        logger.error(f"Erro ao organizar dados para o gráfico: {e}")
+        logger.error("Erro ao organizar dados para o gráfico: %s", e)
+        raise
+
+
+def retorno_acumulado_tickers(carteira, data_ini, data_fim, max_workers=None, preenchimento='mascara'):
+    """
+    Calcula o retorno acumulado de cada ação da carteira, para exibir as linhas individuais no gráfico.
+
+    Reaproveita a matriz de preços alinhada de agrupar_dados (sem novas consultas se ela estiver na memória).
+
+    Args:
+        carteira (pd.DataFrame): DataFrame contendo os dados da carteira.
+        data_ini (str): Data inicial no formato 'YYYY-MM-DD'.
+        data_fim (str): Data final no formato 'YYYY-MM-DD'.
+        max_workers (int): Número máximo de consultas de preço simultâneas (opcional).
+        preenchimento (str): 'mascara' ou 'ffill' (ver agrupar_dados).
+
+    Returns:
+        pd.DataFrame: Uma coluna por ticker, indexada pela data (vazio se faltarem preços).
+    """
+    alinhados = _alinhar_precos(carteira, data_ini, data_fim, max_workers, preenchimento)
+    if not alinhados:
+        return pd.DataFrame()
+    df_ibovespa, tickers, precos, _ = alinhados
+    return pd.DataFrame(retorno_acumulado(precos), index=pd.Index(df_ibovespa['data'], name='data'),
+                        columns=list(tickers), copy=False)
+
+
+def atualizar_armazem(tickers=(), data_base_universo=None, data_fim=None, max_workers=None):
+    """
+    Atualização em lote do armazém local de preços: acrescenta os dias que faltam a todas as
+    séries já armazenadas, ao Ibovespa e às ações pedidas.
+
+    Args:
+        tickers (list): Ações incluídas além das já armazenadas.
+        data_base_universo (str): Se informada, inclui todas as ações do planilhão desta data.
+        data_fim (str): Última data desejada (padrão: ontem).
+        max_workers (int): Séries atualizadas simultaneamente (padrão: MAX_WORKERS).
+
+    Returns:
+        dict: Série -> mensagem de erro, apenas das que falharam.
+    """
+    universo = [chave.split('/', 1)[1] for chave in armazem_precos.series() if chave.startswith('preco-corrigido/')]
+    universo += list(tickers)
+    if data_base_universo:
+        universo += _planilhao_sem_duplicadas(data_base_universo)['ticker'].tolist()
+
+    consultas = {f"preco-corrigido/{ticker}": _consulta_preco(ticker) for ticker in dict.fromkeys(universo)}
+    consultas["preco-diversos/ibov"] = obter_preco_ibovespa
+    return armazem_precos.atualizar(consultas, data_fim, max_workers)
+
+
+def iterar_precos_corrigidos(lista_tickers, data_ini, data_fim, max_workers=None, cancelar=None):
+    """
+    Consulta os preços corrigidos em paralelo e entrega cada ticker assim que a sua consulta termina.
+
+    Tickers lentos ou com erro não atrasam os demais. Se o gerador for encerrado antes do fim
+    (ou `cancelar` for sinalizado), as consultas ainda não iniciadas são canceladas.
+
+    Args:
+        lista_tickers (list): Lista de códigos dos ativos.
+        data_ini (str): Data inicial no formato 'YYYY-MM-DD'.
+        data_fim (str): Data final no formato 'YYYY-MM-DD'.
+        max_workers (int): Número máximo de consultas simultâneas (padrão: MAX_WORKERS).
+        cancelar (threading.Event): Sinal de cancelamento (opcional).
+
+    Yields:
+        tuple: (ticker, DataFrame com os preços ou None em caso de falha, latência em segundos),
+               na ordem de conclusão.
+    """
+    if not lista_tickers:
+        return
+    executor = ThreadPoolExecutor(max_workers=min(validar_max_workers(max_workers), len(lista_tickers)))
+    try:
+        futuros = {executor.submit(_consultar_preco_ticker, ticker, data_ini, data_fim): ticker
+                   for ticker in lista_tickers}
+        for futuro in as_completed(futuros):
+            if cancelar is not None and cancelar.is_set():
+                logger.info("Consulta de preços cancelada.")
+                return
+            df_precos, latencia = futuro.result()
+            metricas.observar("views.preco_ticker_ms", latencia * 1000)
+            yield futuros[futuro], df_precos, latencia
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def agrupar_dados_progressivo(carteira, data_ini, data_fim, max_workers=None, preenchimento='mascara',
+                              cancelar=None):
+    """
+    Versão incremental de agrupar_dados: entrega a curva parcial da carteira a cada ticker recebido.
+
+    O Ibovespa é consultado primeiro e, a cada ticker que chega, a sua coluna é alinhada aos
+    pregões e somada à média ponderada da carteira, sem refazer as colunas anteriores. O último
+    resultado é idêntico ao de agrupar_dados, e a matriz completa fica na memória compartilhada
+    (a análise de risco seguinte não consulta a API de novo).
+
+    Args:
+        carteira (pd.DataFrame): DataFrame contendo os dados da carteira.
+        data_ini (str): Data inicial no formato 'YYYY-MM-DD'.
+        data_fim (str): Data final no formato 'YYYY-MM-DD'.
+        max_workers (int): Número máximo de consultas de preço simultâneas (opcional).
+        preenchimento (str): 'mascara' ou 'ffill' (ver agrupar_dados).
+        cancelar (threading.Event): Sinal de cancelamento (opcional).
+
+    Yields:
+        tuple: (tickers concluídos, total de tickers, DataFrame parcial no formato de agrupar_dados).
+               Os tickers que falharam ficam em `df.attrs['falhas']`.
+    """
+    lista_tickers = carteira['ticker'].tolist()
+    total = len(lista_tickers)
+    chave = _chave_precos_alinhados(carteira, data_ini, data_fim, preenchimento)
+    if memoria_views.obter(chave) is not None:
+        # Já calculado (por esta ou outra sessão): entrega o resultado final de uma vez
+        yield total, total, agrupar_dados(carteira, data_ini, data_fim, max_workers, preenchimento)
+        return
+
+    inicio = time.perf_counter()
+    df_ibovespa = pegar_dados_ibovespa(data_ini, data_fim)
+    if df_ibovespa.empty:
+        yield total, total, pd.DataFrame()
+        return
+    df_ibovespa = df_ibovespa.sort_values(by='data').reset_index(drop=True)
+    retorno_ibovespa = retorno_acumulado(df_ibovespa['fechamento'].to_numpy(dtype=float))
+
+    # Somas ponderadas dos retornos e dos pesos disponíveis em cada data (ver media_carteira)
+    pesos = carteira.set_index('ticker')['peso'] if 'peso' in carteira else None
+    soma = np.zeros(len(df_ibovespa))
+    quantidade = np.zeros(len(df_ibovespa))
+    recebidos, falhas = [], []
+
+    for concluidos, (ticker, df_precos, _) in enumerate(
+            iterar_precos_corrigidos(lista_tickers, data_ini, data_fim, max_workers, cancelar), start=1):
+        if df_precos is None or df_precos.empty:
+            falhas.append(ticker)
+        else:
+            recebidos.append(df_precos)
+            _, _, coluna = montar_painel(df_precos, df_ibovespa['data'], preenchimento=preenchimento)
+            retornos = retorno_acumulado(coluna)[:, 0] if coluna.shape[1] else np.full(len(soma), np.nan)
+            disponiveis = ~np.isnan(retornos)
+            peso = 1.0 if pesos is None else float(np.nan_to_num(pesos.get(ticker, 0.0)))
+            soma += np.where(disponiveis, retornos, 0.0) * peso
+            quantidade += disponiveis * peso
+
+        if concluidos == 1:
+            metricas.observar("views.primeiro_parcial_ms", (time.perf_counter() - inicio) * 1000)
+        if concluidos < total:
+            retorno_carteira = np.divide(soma, quantidade, out=np.full(len(soma), np.nan), where=quantidade > 0)
+            df_parcial = _dados_grafico(df_ibovespa['data'], retorno_carteira, retorno_ibovespa)
+            df_parcial.attrs['falhas'] = list(falhas)
+            yield concluidos, total, df_parcial
+
+    if len(recebidos) + len(falhas) < total:
+        return  # Cancelado: as consultas restantes foram descartadas
+
+    # Resultado final pela matriz completa (mesmo cálculo de agrupar_dados), guardada para as
+    # próximas análises da mesma carteira
+    df_final = pd.DataFrame()
+    if recebidos:
+        alinhados = _montar_precos_alinhados(carteira, pd.concat(recebidos, ignore_index=True), df_ibovespa,
+                                             preenchimento)
+        memoria_views.salvar(chave, alinhados, memoria_views.calcular_expiracao(data_fim))
+        _, _, precos, pesos_colunas = alinhados
+        df_final = _dados_grafico(df_ibovespa['data'], media_carteira(retorno_acumulado(precos), pesos_colunas),
+                                  retorno_ibovespa)
+    df_final.attrs['falhas'] = falhas
+    logger.info("Dados do gráfico montados progressivamente: %s tickers, %s falhas.", total, len(falhas))
+    yield total, total, df_final
+
+
+@metricas.medir('views.analisar_risco_ms')
+def analisar_risco(carteira, data_ini, data_fim, janela=63, taxa_livre_risco=0.0, max_workers=None):
+    """
+    Calcula as métricas de risco da carteira, de cada ação e do Ibovespa, além das versões móveis.
+
+    Args:
+        carteira (pd.DataFrame): DataFrame contendo os dados da carteira.
+        data_ini (str): Data inicial no formato 'YYYY-MM-DD'.
+        data_fim (str): Data final no formato 'YYYY-MM-DD'.
+        janela (int): Tamanho, em pregões, da janela das métricas móveis (63 ≈ 3 meses).
+        taxa_livre_risco (float): Taxa livre de risco anual usada no Sharpe e no Sortino (ex.: 0.10).
+        max_workers (int): Número máximo de consultas de preço simultâneas (opcional).
+
+    Returns:
+        tuple: (DataFrame com uma linha por série: carteira, Ibovespa e cada ação; DataFrame com as
+               métricas móveis da carteira e do Ibovespa por data). Ambos vazios se faltarem preços.
+    """
+    logger.info("Calculando métricas de risco de %s a %s (janela de %s pregões).", data_ini, data_fim, janela)
+    try:
+        alinhados = _alinhar_precos(carteira, data_ini, data_fim, max_workers)
+        if not alinhados:
+            logger.warning("Sem preços suficientes para calcular as métricas de risco.")
+            return pd.DataFrame(), pd.DataFrame()
+        df_ibovespa, tickers, precos, pesos = alinhados
+
+        # Cota da carteira (1 no início) e preços do Ibovespa, na mesma grade de datas
+        cota_carteira = 1 + media_carteira(retorno_acumulado(precos), pesos)
+        precos_ibovespa = df_ibovespa['fechamento'].to_numpy(dtype=float)
+        series = np.column_stack([cota_carteira, precos_ibovespa, precos])
+        df_metricas = risco.resumir_risco(series, precos_ibovespa, ['Carteira', 'Ibovespa', *tickers],
+                                          taxa_livre_risco)
+
+        # Métricas móveis da carteira (coluna 0) e do Ibovespa (coluna 1)
+        retornos = risco.calcular_retornos(series[:, :2])
+        volatilidade_movel = risco.volatilidade(retornos, janela)
+        drawdown = risco.drawdown(series[:, :2])
+        df_movel = pd.DataFrame({
+            'data': df_ibovespa['data'],
+            'volatilidade_carteira': volatilidade_movel[:, 0],
+            'volatilidade_ibovespa': volatilidade_movel[:, 1],
+            'beta_carteira': risco.beta(retornos[:, 0], retornos[:, 1], janela),
+            'sharpe_carteira': risco.sharpe(retornos[:, 0], taxa_livre_risco, janela),
+            'sortino_carteira': risco.sortino(retornos[:, 0], taxa_livre_risco, janela),
+            'drawdown_carteira': drawdown[:, 0],
+            'drawdown_ibovespa': drawdown[:, 1],
+        })
+        df_movel = df_movel[~np.isnan(cota_carteira)].reset_index(drop=True)
+
+        logger.info("Métricas de risco calculadas para %s ações.", len(tickers))
+        return df_metricas, df_movel
+    except Exception as e:
+        logger.error("Erro ao calcular as métricas de risco: %s", e)
         raise
 
-import plotly.graph_objects as go
 
-def gerar_grafico(df):
+def _adicionar_serie(fig, datas, valores, nome, linha, pontos_max, usar_webgl, **opcoes):
+    """
+    Adiciona uma linha ao gráfico, reduzida a `pontos_max` pontos (LTTB) e em WebGL se indicado.
+    """
+    import plotly.graph_objects as go
+
+    x, y = reduzir_serie(datas, valores, pontos_max)
+    tipo = go.Scattergl if usar_webgl else go.Scatter
+    fig.add_trace(tipo(x=x, y=y * 100, mode='lines', name=nome, line=linha, **opcoes))
+    return len(y)
+
+
+@metricas.medir('views.gerar_grafico_ms')
+def gerar_grafico(df, df_tickers=None, pontos_max=None):
     """
     Gera um gráfico interativo comparativo entre a Carteira e o Ibovespa.
 
+    Cada série é reduzida a no máximo `pontos_max` pontos preservando picos e vales (LTTB), e o
+    gráfico passa a usar WebGL (Scattergl) quando o total de pontos passa de GRAFICO_LIMITE_WEBGL.
+    O DataFrame de entrada não é alterado.
+
     Args:
         df (pd.DataFrame): DataFrame contendo as colunas 'data', 
                            'retorno_acumulado_carteira', e 'retorno_acumulado_ibovespa'.
+        df_tickers (pd.DataFrame): Retorno acumulado de cada ação da carteira (ver
+                                   retorno_acumulado_tickers), exibido como linhas finas (opcional).
+        pontos_max (int): Pontos por série após a redução (padrão: GRAFICO_PONTOS_MAX).
 
     Returns:
         fig (go.Figure): Figura interativa do Plotly.
     """
+    import plotly.graph_objects as go  # Importado sob demanda: só a página de Gráficos usa o plotly
+
     try:
-        # Converte a coluna 'data' para o formato datetime
-        df['data'] = pd.to_datetime(df['data'])
+        pontos_max = pontos_max or GRAFICO_PONTOS_MAX
+        # Converte as datas sem alterar o DataFrame recebido
+        datas = pd.to_datetime(df['data']).to_numpy()
+        series = 2 + (0 if df_tickers is None else df_tickers.shape[1])
+        usar_webgl = series * min(len(datas), pontos_max) > GRAFICO_LIMITE_WEBGL
 
         # Criação da figura
         fig = go.Figure()
 
+        # Linhas de cada ação (abaixo das linhas principais)
+        if df_tickers is not None:
+            datas_tickers = pd.to_datetime(df_tickers.index).to_numpy()
+            for ticker in df_tickers.columns:
+                _adicionar_serie(fig, datas_tickers, df_tickers[ticker].to_numpy(dtype=float), ticker,
+                                 dict(width=1), pontos_max, usar_webgl, opacity=0.5, legendgroup='acoes')
+
         # Linha da Carteira
-        fig.add_trace(go.Scatter(
-            x=df['data'], 
-            y=df['retorno_acumulado_carteira'] * 100,
-            mode='lines',
-            name='Carteira',
-            line=dict(width=2)
-        ))
+        pontos = _adicionar_serie(fig, datas, df['retorno_acumulado_carteira'].to_numpy(dtype=float), 'Carteira',
+                                  dict(width=2), pontos_max, usar_webgl)
 
         # Linha do Ibovespa
-        fig.add_trace(go.Scatter(
-            x=df['data'], 
-            y=df['retorno_acumulado_ibovespa'] * 100,
-            mode='lines',
-            name='Ibovespa',
-            line=dict(width=2, dash='dash')
-        ))
+        _adicionar_serie(fig, datas, df['retorno_acumulado_ibovespa'].to_numpy(dtype=float), 'Ibovespa',
+                         dict(width=2, dash='dash'), pontos_max, usar_webgl)
+        logger.debug("Gráfico com %s séries de até %s pontos (WebGL: %s).", series, pontos, usar_webgl)
 
         # Configurações do layout do gráfico
         fig.update_layout(
@@ -308,6 +851,6 @@ def gerar_grafico(df):
 
         return fig
     except Exception as e:
-        print(f"Erro ao gerar gráfico interativo: {e}")
+        logger.error("Erro ao gerar gráfico interativo: %s", e)
         raise
 
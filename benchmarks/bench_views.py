@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import date, datetime
+
+# O benchmark roda sempre offline e sem caches (disco e memória), para medir apenas o processamento
+os.environ['API_MODO'] = 'reproduzir'
+os.environ['CACHE_ATIVO'] = '0'
+os.environ['MEMORIA_ATIVA'] = '0'
+os.environ.setdefault('API_TAXA', '0')
+
+import pandas as pd  # noqa: E402
+from backend.cliente import ClienteAPI, definir_cliente  # noqa: E402
+from backend.simulador import SimuladorAPI, UniversoSintetico  # noqa: E402
+from backend import views  # noqa: E402
+
+# Tamanhos avaliados em cada perfil
+PERFIS = {
+    'realista': {'tickers': [100, 500], 'anos': [1, 5]},
+    'estresse': {'tickers': [100, 1000, 5000], 'anos': [1, 10, 30]},
+}
+
+DATA_BASE = '2024-01-02'
+DATA_FIM = '2024-12-30'
+
+
+class SimuladorMemorizado(SimuladorAPI):
+    """
+    Simulador que guarda as respostas já geradas, para que a geração dos dados sintéticos
+    não entre na medição (apenas o transporte, a decodificação e o processamento).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._respostas = {}
+
+    def responder(self, endpoint, params):
+        chave = (endpoint, tuple(sorted(params.items())))
+        if chave not in self._respostas:
+            self._respostas[chave] = super().responder(endpoint, params)
+        return self._respostas[chave]
+
+
+def preparar_universo(quantidade_tickers):
+    """
+    Aponta o cliente da API para um universo sintético com a quantidade de tickers pedida.
+
+    Returns:
+        UniversoSintetico: Universo em uso.
+    """
+    universo = UniversoSintetico(quantidade_tickers, inicio='1990-01-02')
+    definir_cliente(ClienteAPI(
+        url_base='http://simulador/api/v1', token='benchmark', timeout=30, tentativas=0, backoff=0,
+        taxa=0, rajada=1, tamanho_pool=1, simulador=SimuladorMemorizado(universo=universo),
+    ))
+    return universo
+
+
+def medir(funcao, repeticoes):
+    """
+    Mede o tempo (mediana de várias execuções), o pico de memória e os blocos alocados de uma etapa.
+
+    A primeira execução serve de aquecimento e não entra na medição de tempo.
+
+    Args:
+        funcao (callable): Etapa sem argumentos a ser medida.
+        repeticoes (int): Número de execuções cronometradas.
+
+    Returns:
+        dict: 'tempo_s', 'pico_memoria_bytes' e 'blocos_alocados'.
+    """
+    funcao()
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    # Memória medida em uma execução separada, pois o tracemalloc deixa o código mais lento
+    blocos_antes = sys.getallocatedblocks()
+    tracemalloc.start()
+    resultado = funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocos = sys.getallocatedblocks() - blocos_antes
+    del resultado
+
+    return {'tempo_s': statistics.median(tempos), 'pico_memoria_bytes': pico, 'blocos_alocados': blocos}
+
+
+def executar(perfil, repeticoes):
+    """
+    Executa todas as etapas para todos os tamanhos do perfil.
+
+    Returns:
+        list: Um dicionário por medição, com a etapa, o tamanho e as métricas.
+    """
+    resultados = []
+
+    def registrar(etapa, tickers, anos, funcao):
+        metricas = medir(funcao, repeticoes)
+        resultados.append({'etapa': etapa, 'tickers': tickers, 'anos': anos, **metricas})
+        print(f"{etapa:<26} tickers={tickers:<5} anos={anos if anos is not None else '-':<3} "
+              f"tempo={metricas['tempo_s'] * 1000:9.1f} ms  pico={metricas['pico_memoria_bytes'] / 2 ** 20:8.1f} MB")
+
+    for quantidade in PERFIS[perfil]['tickers']:
+        preparar_universo(quantidade)
+        df_bruto = views.obter_dados_planilhao(DATA_BASE)
+
+        # Etapas que dependem apenas do tamanho do universo
+        registrar('filtrar_duplicadas', quantidade, None, lambda: views.filtrar_duplicadas(df_bruto.copy()))
+        registrar('pegar_planilhao_filtrado', quantidade, None, lambda: views.pegar_planilhao_filtrado(DATA_BASE))
+        registrar('gerar_carteira', quantidade, None,
+                  lambda: views.gerar_carteira(DATA_BASE, 'roe', 'earning_yield', 20))
+
+        # Etapas que dependem também do tamanho do histórico (carteira com todo o universo)
+        carteira = pd.DataFrame({'ticker': views.filtrar_duplicadas(df_bruto.copy())['ticker'].tolist()})
+        for anos in PERFIS[perfil]['anos']:
+            data_ini = date(2024 - anos, 1, 2).isoformat()
+            registrar('agrupar_dados', len(carteira), anos,
+                      lambda: views.agrupar_dados(carteira, data_ini, DATA_FIM))
+            df_grafico = views.agrupar_dados(carteira, data_ini, DATA_FIM)
+            registrar('gerar_grafico', len(carteira), anos, lambda: views.gerar_grafico(df_grafico))
+
+    return resultados
+
+
+def comparar(resultados, caminho_base, limite):
+    """
+    Compara os resultados com uma execução anterior e aponta regressões acima do limite.
+
+    Args:
+        resultados (list): Medições atuais.
+        caminho_base (str): Arquivo JSON de uma execução anterior.
+        limite (float): Aumento relativo tolerado (ex.: 0.2 = 20%).
+
+    Returns:
+        list: Descrições das regressões encontradas.
+    """
+    with open(caminho_base, encoding='utf-8') as arquivo:
+        base = {(r['etapa'], r['tickers'], r['anos']): r for r in json.load(arquivo)['resultados']}
+
+    regressoes = []
+    for atual in resultados:
+        anterior = base.get((atual['etapa'], atual['tickers'], atual['anos']))
+        if anterior is None:
+            continue
+        for metrica in ('tempo_s', 'pico_memoria_bytes'):
+            if anterior[metrica] > 0 and atual[metrica] > anterior[metrica] * (1 + limite):
+                regressoes.append(
+                    f"{atual['etapa']} (tickers={atual['tickers']}, anos={atual['anos']}): {metrica} "
+                    f"{anterior[metrica]:.4g} -> {atual[metrica]:.4g} (+{atual[metrica] / anterior[metrica] - 1:.0%})"
+                )
+    return regressoes
+
+
+def versao_codigo():
+    """
+    Retorna o commit atual do git, ou 'desconhecido' fora de um repositório.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return 'desconhecido'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das etapas de backend.views.")
+    parser.add_argument('--perfil', choices=PERFIS, default='realista')
+    parser.add_argument('--repeticoes', type=int, default=3, help="Execuções cronometradas por medição.")
+    parser.add_argument('--saida', help="Arquivo JSON onde os resultados serão gravados.")
+    parser.add_argument('--comparar', help="Arquivo JSON de uma execução anterior para comparação.")
+    parser.add_argument('--limite', type=float, default=0.2, help="Regressão tolerada (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore', category=FutureWarning)  # Avisos do plotly poluem a saída
+    resultados = executar(args.perfil, args.repeticoes)
+
+    if args.saida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'commit': versao_codigo(),
+                'data': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'perfil': args.perfil,
+                'resultados': resultados,
+            }, arquivo, indent=2)
+        print(f"Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        regressoes = comparar(resultados, args.comparar, args.limite)
+        if regressoes:
+            print(f"{len(regressoes)} regressão(ões) acima de {args.limite:.0%}:")
+            for regressao in regressoes:
+                print(f"  - {regressao}")
+            sys.exit(1)
+        print(f"Nenhuma regressão acima de {args.limite:.0%}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+# Dependências carregadas por qualquer página (o próprio app.py) e módulos de cada página
+BASE_APP = ['streamlit', 'dotenv', 'streamlit_option_menu']
+PAGINAS = {
+    'Página Inicial': 'frontend.inicio',
+    'Planilhão': 'frontend.planilhao',
+    'Estratégia': 'frontend.estrategia',
+    'Gráficos': 'frontend.graficos',
+}
+# Dependências carregadas sob demanda (ex.: no primeiro gráfico), medidas depois de todas as páginas
+SOB_DEMANDA = ['plotly.graph_objects']
+
+_LINHA_IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def medir_importacao(modulo, ja_importados=()):
+    """
+    Importa um módulo em um interpretador novo com `-X importtime` e coleta o custo de cada import.
+
+    Args:
+        modulo (str): Módulo a ser importado.
+        ja_importados (iterable): Módulos importados antes (seu custo não entra na medição).
+
+    Returns:
+        dict: 'total_us' (custo acumulado do import) e 'modulos' (lista de dicionários com
+              'modulo', 'proprio_us' e 'acumulado_us' de cada import feito por ele).
+    """
+    codigo = ''.join(f'import {nome}\n' for nome in ja_importados)
+    codigo += f'import sys; print("--inicio--", file=sys.stderr, flush=True)\nimport {modulo}\n'
+    ambiente = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')]))}
+    processo = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo], capture_output=True, text=True,
+                              env=ambiente)
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {modulo}:\n{processo.stderr[-2000:]}")
+
+    saida = processo.stderr.split('--inicio--', 1)[1]
+    modulos = []
+    total = 0
+    for linha in saida.splitlines():
+        encontrado = _LINHA_IMPORTTIME.match(linha)
+        if not encontrado:
+            continue
+        proprio, acumulado, recuo, nome = encontrado.groups()
+        modulos.append({'modulo': nome, 'proprio_us': int(proprio), 'acumulado_us': int(acumulado)})
+        if len(recuo) == 1:  # Import de primeiro nível: o acumulado já inclui os imports aninhados
+            total += int(acumulado)
+    return {'total_us': total, 'modulos': modulos}
+
+
+def agrupar_por_pacote(modulos):
+    """
+    Soma o custo próprio dos imports por pacote de primeiro nível (ex.: 'pandas', 'backend').
+
+    Returns:
+        list: Tuplas (pacote, custo em microssegundos), do maior para o menor.
+    """
+    pacotes = defaultdict(int)
+    for item in modulos:
+        pacotes[item['modulo'].split('.')[0]] += item['proprio_us']
+    return sorted(pacotes.items(), key=lambda item: item[1], reverse=True)
+
+
+def gerar_relatorio(top):
+    """
+    Mede o custo de inicialização do app e o custo adicional de abrir cada página.
+
+    Args:
+        top (int): Quantidade de pacotes listados por medição.
+
+    Returns:
+        list: Um dicionário por medição, com o custo total e os pacotes mais caros.
+    """
+    medicoes = [('app.py (streamlit + menu)', ' + '.join(BASE_APP), [], BASE_APP)]
+    medicoes += [(f'página {pagina}', modulo, BASE_APP, [modulo]) for pagina, modulo in PAGINAS.items()]
+    medicoes += [(f'sob demanda {modulo}', modulo, BASE_APP + list(PAGINAS.values()), [modulo])
+                 for modulo in SOB_DEMANDA]
+
+    relatorio = []
+    for rotulo, alvo, ja_importados, modulos in medicoes:
+        total, detalhes = 0, []
+        for modulo in modulos:
+            medicao = medir_importacao(modulo, ja_importados)
+            total += medicao['total_us']
+            detalhes += medicao['modulos']
+            ja_importados = [*ja_importados, modulo]
+        pacotes = agrupar_por_pacote(detalhes)[:top]
+        relatorio.append({'medicao': rotulo, 'alvo': alvo, 'total_ms': total / 1000,
+                          'pacotes': [{'pacote': nome, 'ms': custo / 1000} for nome, custo in pacotes]})
+
+        print(f"{rotulo:<40} {total / 1000:9.1f} ms")
+        for nome, custo in pacotes:
+            print(f"    {nome:<36} {custo / 1000:9.1f} ms")
+    return relatorio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório do custo de import do app e de cada página.")
+    parser.add_argument('--top', type=int, default=8, help="Pacotes mais caros listados por medição.")
+    parser.add_argument('--saida', help="Arquivo JSON onde o relatório será gravado.")
+    args = parser.parse_args()
+
+    relatorio = gerar_relatorio(args.top)
+    if args.saida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2)
+        print(f"Relatório gravado em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,8 @@
 import streamlit as st
-from backend.views import gerar_carteira
-from backend.utils import validar_dia_util
-from datetime import datetime,date
+from backend.views import carteira_compartilhada
+from backend.varredura import varrer_parametros
+from backend.calendario import ajustar_dia_util
+from datetime import date,timedelta
 
 def mostrar_estrategia():
     """
@@ -13,13 +14,6 @@ def mostrar_estrategia():
         Escolha os indicadores desejados e a quantidade de ações na carteira.
     """)
 
-    # Lista de feriados estáticos (exemplo para 2024 no Brasil)
-    feriados = [
-        "2024-01-01", "2024-02-13", "2024-03-29", "2024-04-21", "2024-05-01",
-        "2024-09-07", "2024-10-12", "2024-11-02", "2024-11-15", "2024-12-25"
-    ]
-    feriados = [datetime.strptime(data, "%Y-%m-%d").date() for data in feriados]
-
     # Inputs do usuário
     st.header("📌 Parâmetros da Estratégia")
 
@@ -46,13 +40,36 @@ def mostrar_estrategia():
         step=1
     )
 
+    # Diversificação entre setores
+    modo_ranking = st.selectbox(
+        "Modo de Ranking:",
+        options=["Mercado inteiro", "Dentro de cada setor"],
+        index=0,
+        help="No ranking por setor, cada ação é comparada apenas às do mesmo setor."
+    )
+    maximo_por_setor = st.number_input(
+        "Máximo de Ações por Setor (0 = sem limite):",
+        min_value=0,
+        max_value=20,
+        value=0,
+        step=1
+    )
+    ponderacao = st.selectbox(
+        "Ponderação da Carteira:",
+        options=["Pesos iguais", "Neutra por setor"],
+        index=0,
+        help="Na ponderação neutra, cada setor recebe o mesmo peso, dividido entre as suas ações."
+    )
+
     # Data base para os dados do planilhão
     data_base = st.date_input("Selecione a Data Base:",value = date(2024,1,2))
 
-    # Validação da Data Base (feriados e finais de semana)
-    if not validar_dia_util(data_base, feriados):
-        st.error("A data selecionada é inválida (feriado ou final de semana). Por favor, escolha outra data.")
-        return
+    # Feriados e finais de semana são ajustados para o pregão anterior
+    data_base_pregao = ajustar_dia_util(data_base, 'anterior')
+    if data_base_pregao != data_base:
+        st.info(f"A data {data_base.strftime('%d/%m/%Y')} não tem pregão na B3 (feriado ou final de semana). "
+                f"Usando o pregão anterior: {data_base_pregao.strftime('%d/%m/%Y')}.")
+        data_base = data_base_pregao
 
     st.header("📊 Carteira Gerada")
     st.markdown("""
@@ -64,19 +81,23 @@ def mostrar_estrategia():
     if st.button("Gerar Carteira"):
         with st.spinner("Gerando a carteira..."):
             try:
-                # Gera a carteira
-                df_carteira = gerar_carteira(
+                # Gera a carteira (compartilhada entre as sessões; a sessão guarda só a referência)
+                referencia = carteira_compartilhada(
                     data_base.strftime('%Y-%m-%d'),
                     indicador_rentabilidade,
                     indicador_desconto,
-                    quantidade_acoes
+                    quantidade_acoes,
+                    ranking_setorial=modo_ranking == "Dentro de cada setor",
+                    maximo_por_setor=maximo_por_setor or None,
+                    ponderacao='neutra_setor' if ponderacao == "Neutra por setor" else 'igual'
                 )
+                df_carteira = referencia.valor
 
                 if df_carteira.empty:
                     st.warning("Nenhuma carteira gerada.")
                 else:
                     # Armazena a Carteira no session_state
-                    st.session_state["carteira"] = df_carteira
+                    st.session_state["carteira"] = referencia
 
                     # Exibe a Carteira
                     st.write("### Carteira de Investimentos:")
@@ -85,9 +106,46 @@ def mostrar_estrategia():
                 st.error(f"Erro ao gerar a carteira: {e}")
 
     # Verifica se a Carteira já está armazenada
-    if "carteira" in st.session_state:
+    if st.session_state.get("carteira") is not None:
         st.write("### Carteira Gerada Anteriormente:")
-        st.dataframe(st.session_state["carteira"])
+        st.dataframe(st.session_state["carteira"].valor)
+
+    st.header("🔬 Comparar Combinações")
+    st.markdown("""
+        Avalie de uma só vez todas as combinações de indicadores (ROE/ROC/ROIC × Earning Yield/Dividend Yield/P/VP)
+        e carteiras de 1 a 20 ações, medindo o desempenho de cada uma no período escolhido.
+    """)
+
+    data_ini_varredura = st.date_input("Início da Avaliação:", value=data_base, key="data_ini_varredura")
+    data_fim_varredura = st.date_input("Fim da Avaliação:", value=date.today() - timedelta(days=1),
+                                       key="data_fim_varredura")
+
+    if st.button("Comparar Combinações"):
+        if data_ini_varredura >= data_fim_varredura:
+            st.warning("A data inicial deve ser anterior à data final.")
+        else:
+            with st.spinner("Avaliando todas as combinações..."):
+                try:
+                    df_varredura = varrer_parametros(
+                        data_base.strftime('%Y-%m-%d'),
+                        data_ini_varredura.strftime('%Y-%m-%d'),
+                        data_fim_varredura.strftime('%Y-%m-%d')
+                    )
+
+                    if df_varredura.empty:
+                        st.warning("Nenhum resultado para o período selecionado.")
+                    else:
+                        st.session_state["varredura"] = df_varredura
+                except Exception as e:
+                    st.error(f"Erro ao comparar combinações: {e}")
+
+    # Exibe a comparação mais recente, da melhor para a pior combinação
+    if st.session_state.get("varredura") is not None:
+        st.write("### Desempenho por Combinação:")
+        st.dataframe(
+            st.session_state["varredura"].sort_values(by='retorno_carteira', ascending=False),
+            hide_index=True
+        )
 
     st.header("📘 O Que é a Magic Formula?")
     st.write("""
@@ -1,11 +1,82 @@
+import threading
+import time
+from contextlib import closing
 import streamlit as st
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from matplotlib.ticker import MaxNLocator
-from datetime import date, timedelta, datetime
-import pandas as pd
-from backend.views import agrupar_dados, gerar_grafico
-from backend.utils import validar_dia_util
+from datetime import date, timedelta
+from backend.metricas import metricas
+from backend.views import agrupar_dados_progressivo, analisar_risco, gerar_grafico, retorno_acumulado_tickers
+from backend.calendario import ajustar_dia_util
+
+# Intervalo mínimo, em segundos, entre redesenhos do gráfico parcial
+INTERVALO_PARCIAL = 0.5
+
+
+def _cancelar_grafico():
+    """
+    Sinaliza o cancelamento da montagem em andamento do gráfico.
+
+    O clique reinicia a página (a execução em andamento é interrompida), então o cancelamento fica
+    marcado no session_state para a próxima execução exibir o resultado parcial.
+    """
+    st.session_state["cancelar_grafico"].set()
+    if st.session_state.get("grafico_em_andamento"):
+        st.session_state["grafico_cancelado"] = True
+
+
+def _mostrar_cancelado():
+    """
+    Exibe o aviso de cancelamento e o último gráfico parcial da execução interrompida.
+    """
+    st.session_state["grafico_cancelado"] = False
+    parcial = st.session_state.get("grafico_parcial")
+    if parcial is None:
+        st.warning("Geração do gráfico cancelada antes da chegada dos primeiros preços.")
+        return
+    concluidos, total, df_parcial = parcial
+    st.warning(f"Geração do gráfico cancelada: o gráfico considera apenas as {concluidos} de {total} "
+               "ações já recebidas.")
+    if not df_parcial.empty:
+        st.plotly_chart(gerar_grafico(df_parcial), use_container_width=True)
+
+
+def _desenhar_progressivo(carteira, data_ini, data_fim, mostrar_acoes=False):
+    """
+    Desenha o gráfico à medida que os preços de cada ticker chegam, com barra de progresso.
+    Com `mostrar_acoes`, o gráfico final inclui uma linha para cada ação da carteira.
+
+    Returns:
+        pd.DataFrame | None: Dados finais do gráfico, ou None se a montagem foi cancelada (o último
+                             resultado parcial fica em st.session_state["grafico_parcial"]).
+    """
+    cancelar = st.session_state["cancelar_grafico"] = threading.Event()
+    st.session_state["grafico_parcial"] = None
+    st.session_state["grafico_em_andamento"] = True
+    st.button("Cancelar", on_click=_cancelar_grafico)
+    progresso = st.progress(0.0, text="Consultando o Ibovespa...")
+    espaco_grafico = st.empty()
+
+    df_grafico, ultimo_desenho = None, 0.0
+    with closing(agrupar_dados_progressivo(carteira, data_ini, data_fim, cancelar=cancelar)) as etapas:
+        for concluidos, total, df_parcial in etapas:
+            progresso.progress(concluidos / total, text=f"Preços recebidos: {concluidos} de {total} ações")
+            st.session_state["grafico_parcial"] = (concluidos, total, df_parcial)
+            final = concluidos == total
+            # O gráfico parcial é redesenhado no máximo a cada INTERVALO_PARCIAL segundos
+            if not df_parcial.empty and (final or time.perf_counter() - ultimo_desenho >= INTERVALO_PARCIAL):
+                df_tickers = retorno_acumulado_tickers(carteira, data_ini, data_fim) if final and mostrar_acoes else None
+                with metricas.cronometro("pagina.graficos.plotly_chart_ms"):
+                    espaco_grafico.plotly_chart(gerar_grafico(df_parcial, df_tickers), use_container_width=True)
+                ultimo_desenho = time.perf_counter()
+            if final:
+                df_grafico = df_parcial
+    progresso.empty()
+
+    st.session_state["grafico_parcial"] = None
+    st.session_state["grafico_em_andamento"] = False
+    if df_grafico is not None and df_grafico.attrs.get('falhas'):
+        st.info(f"Sem preços para: {', '.join(df_grafico.attrs['falhas'])}.")
+    return df_grafico
+
 
 def mostrar_graficos():
     """
@@ -17,13 +88,6 @@ def mostrar_graficos():
         comparado ao Ibovespa em um período definido.
     """)
 
-    # Lista de feriados estáticos (exemplo para 2024 no Brasil)
-    feriados = [
-        "2024-01-01", "2024-02-13", "2024-03-29", "2024-04-21", "2024-05-01",
-        "2024-09-07", "2024-10-12", "2024-11-02", "2024-11-15", "2024-12-25"
-    ]
-    feriados = [datetime.strptime(data, "%Y-%m-%d").date() for data in feriados]
-
     # Inputs do usuário
     st.header("📌 Parâmetros para o Gráfico")
 
@@ -31,14 +95,18 @@ def mostrar_graficos():
     data_ini = st.date_input("Selecione a Data Inicial:", value=date(2024, 1, 2))
     data_fim = st.date_input("Selecione a Data Final:", value=date.today() - timedelta(days=1))
 
-    # Validação das datas
-    if not validar_dia_util(data_ini, feriados):
-        st.error("A Data Inicial selecionada é inválida (feriado ou final de semana). Por favor, escolha outra data.")
-        return
+    # Ajuste das datas para dias de pregão (o período nunca é ampliado)
+    data_ini_pregao = ajustar_dia_util(data_ini, 'seguinte')
+    if data_ini_pregao != data_ini:
+        st.info(f"A Data Inicial {data_ini.strftime('%d/%m/%Y')} não tem pregão na B3 (feriado ou final de semana). "
+                f"Usando o pregão seguinte: {data_ini_pregao.strftime('%d/%m/%Y')}.")
+        data_ini = data_ini_pregao
 
-    if not validar_dia_util(data_fim, feriados):
-        st.error("A Data Final selecionada é inválida (feriado ou final de semana). Por favor, escolha outra data.")
-        return
+    data_fim_pregao = ajustar_dia_util(data_fim, 'anterior')
+    if data_fim_pregao != data_fim:
+        st.info(f"A Data Final {data_fim.strftime('%d/%m/%Y')} não tem pregão na B3 (feriado ou final de semana). "
+                f"Usando o pregão anterior: {data_fim_pregao.strftime('%d/%m/%Y')}.")
+        data_fim = data_fim_pregao
 
     if data_ini >= data_fim:
         st.warning("A data inicial deve ser anterior à data final.")
@@ -49,31 +117,59 @@ def mostrar_graficos():
         st.error("Por favor, gere a carteira na página de Estratégia antes de visualizar os gráficos.")
         return
 
+    # Parâmetros dos indicadores de risco
+    st.subheader("📉 Indicadores de Risco")
+    janela = st.number_input("Janela das métricas móveis (pregões):", min_value=5, max_value=504, value=63, step=1)
+    taxa_livre_risco = st.number_input("Taxa livre de risco (% a.a.):", min_value=0.0, max_value=100.0,
+                                       value=0.0, step=0.25)
+
     # Botão para gerar o gráfico
     st.header("📊 Gráfico Comparativo")
     st.markdown("""
         Após configurar os parâmetros acima, clique no botão para visualizar o gráfico.
     """)
 
+    mostrar_acoes = st.checkbox("Exibir a linha de cada ação da carteira")
+
+    if st.session_state.get("grafico_cancelado"):
+        _mostrar_cancelado()
+
     if st.button("Gerar Gráfico"):
-        with st.spinner("Gerando o gráfico...Isso pode levar alguns segundos"):
-            try:
-                # Gera os dados para o gráfico
-                df_grafico = agrupar_dados(
-                    st.session_state["carteira"], 
-                    data_ini.strftime('%Y-%m-%d'), 
-                    data_fim.strftime('%Y-%m-%d')
-                )
+        try:
+            # Desenha o gráfico parcial a cada ação recebida, até o resultado final
+            df_grafico = _desenhar_progressivo(
+                st.session_state["carteira"].valor,
+                data_ini.strftime('%Y-%m-%d'),
+                data_fim.strftime('%Y-%m-%d'),
+                mostrar_acoes
+            )
 
-                if df_grafico.empty:
-                    st.warning("Nenhum dado encontrado.")
-                else:
-                    fig = gerar_grafico(df_grafico)
-                    st.plotly_chart(fig, use_container_width=True)  # Exibe o gráfico interativo no Streamlit
+            if df_grafico is not None and df_grafico.empty:
+                st.warning("Nenhum dado encontrado.")
+            elif df_grafico is not None:
+                # Métricas de risco do período e versões móveis (reaproveitam os preços já consultados)
+                with st.spinner("Calculando os indicadores de risco..."):
+                    df_risco, df_movel = analisar_risco(
+                        st.session_state["carteira"].valor,
+                        data_ini.strftime('%Y-%m-%d'),
+                        data_fim.strftime('%Y-%m-%d'),
+                        janela=int(janela),
+                        taxa_livre_risco=taxa_livre_risco / 100
+                    )
+                if not df_risco.empty:
+                    st.subheader("📉 Indicadores de Risco do Período")
+                    st.dataframe(df_risco.round(4), use_container_width=True)
 
+                    df_movel = df_movel.set_index('data')
+                    st.write(f"Volatilidade anualizada móvel ({int(janela)} pregões):")
+                    st.line_chart(df_movel[['volatilidade_carteira', 'volatilidade_ibovespa']])
+                    st.write("Beta e Sharpe móveis da carteira:")
+                    st.line_chart(df_movel[['beta_carteira', 'sharpe_carteira']])
+                    st.write("Drawdown (queda em relação ao pico anterior):")
+                    st.line_chart(df_movel[['drawdown_carteira', 'drawdown_ibovespa']])
 
-            except Exception as e:
-                st.error(f"Erro ao gerar o gráfico: {e}")
+        except Exception as e:
+            st.error(f"Erro ao gerar o gráfico: {e}")
 
     # # Verifica se o gráfico já está armazenado
     # if "grafico" in st.session_state:
@@ -83,6 +179,7 @@ def mostrar_graficos():
     st.header("📂 Informações Adicionais")
     st.markdown("""
     - O gráfico mostra o desempenho acumulado da carteira comparado ao Ibovespa no período selecionado.
+    - Os indicadores de risco são anualizados com 252 pregões; o Beta é calculado em relação ao Ibovespa.
     - Certifique-se de que a carteira foi gerada na página de Estratégia antes de criar o gráfico.
     - Para dúvidas ou problemas, entre em contato com o suporte.
     """)
\ No newline at end of file
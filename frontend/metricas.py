@@ -0,0 +1,56 @@
+import pandas as pd
+import streamlit as st
+from backend.metricas import PERCENTIS, metricas
+
+
+def mostrar_metricas():
+    """
+    Exibe a página de administração com as latências, volumes e taxas de acerto dos caches.
+    """
+    st.title("🛠️ Métricas de Desempenho")
+    st.write("""
+        Latência das chamadas à API e das etapas de cálculo, bytes recebidos e uso dos caches,
+        acumulados desde o início do processo (compartilhados por todas as sessões).
+    """)
+
+    resumo = metricas.resumo()
+    st.caption(f"Coletado desde {resumo['ativo_desde']} • Gerado em {resumo['gerado_em']}")
+
+    colunas_percentis = [f'p{p}' for p in PERCENTIS]
+
+    # Histogramas: durações (ms) e tamanhos (bytes) em tabelas separadas
+    linhas = [{'metrica': nome, **valores} for nome, valores in resumo['histogramas'].items()]
+    df_histogramas = pd.DataFrame(linhas, columns=['metrica', 'quantidade', 'media', *colunas_percentis, 'maximo', 'soma'])
+    duracoes = df_histogramas['metrica'].str.endswith('_ms')
+
+    st.header("⏱️ Latências (ms)")
+    if duracoes.any():
+        st.dataframe(df_histogramas[duracoes].set_index('metrica').round(2), use_container_width=True)
+    else:
+        st.info("Nenhuma duração registrada ainda. Use as outras páginas e volte aqui.")
+
+    st.header("📦 Bytes Recebidos da API")
+    if (~duracoes).any():
+        st.dataframe(df_histogramas[~duracoes].set_index('metrica').round(0), use_container_width=True)
+    else:
+        st.info("Nenhuma resposta da API lida ainda.")
+
+    st.header("🔢 Contadores")
+    if resumo['contadores']:
+        st.dataframe(pd.Series(resumo['contadores'], name='valor').rename_axis('contador'),
+                     use_container_width=True)
+    else:
+        st.info("Nenhum contador registrado ainda.")
+
+    st.header("🗄️ Caches")
+    if resumo['fontes']:
+        st.dataframe(pd.DataFrame(resumo['fontes']).T, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Baixar JSON", metricas.exportar_json(), file_name="metricas.json",
+                           mime="application/json")
+    with col2:
+        if st.button("Zerar Métricas"):
+            metricas.limpar()
+            st.success("Métricas zeradas.")
@@ -1,7 +1,7 @@
 import streamlit as st
-from datetime import date, datetime
-from backend.views import pegar_planilhao_filtrado
-from backend.utils import validar_dia_util
+from datetime import date
+from backend.views import planilhao_compartilhado
+from backend.calendario import ajustar_dia_util
 
 def mostrar_planilhao():
     """
@@ -20,24 +20,19 @@ def mostrar_planilhao():
     2. (Opcional) Selecione os **Setores** de interesse para filtrar os dados.
     """)
 
-    # Lista de feriados estáticos (exemplo para 2024 no Brasil)
-    feriados = [
-        "2024-01-01", "2024-02-13", "2024-03-29", "2024-04-21", "2024-05-01",
-        "2024-09-07", "2024-10-12", "2024-11-02", "2024-11-15", "2024-12-25"
-    ]
-    feriados = [datetime.strptime(data, "%Y-%m-%d").date() for data in feriados]
-
     # Input: Data base
     data_base = st.date_input(
         "Selecione a Data Base:", 
         value=date(2024,1,2),
-        help="Escolha uma data válida (dia útil). Feriados e finais de semana não são aceitos."
+        help="Feriados e finais de semana são ajustados para o pregão anterior."
     )
 
-    # Validação de finais de semana e feriados
-    if not validar_dia_util(data_base, feriados):
-        st.error("A data selecionada é inválida (feriado ou final de semana). Por favor, escolha outra data.")
-        return
+    # Feriados e finais de semana são ajustados para o pregão anterior
+    data_base_pregao = ajustar_dia_util(data_base, 'anterior')
+    if data_base_pregao != data_base:
+        st.info(f"A data {data_base.strftime('%d/%m/%Y')} não tem pregão na B3 (feriado ou final de semana). "
+                f"Usando o pregão anterior: {data_base_pregao.strftime('%d/%m/%Y')}.")
+        data_base = data_base_pregao
 
     # Input: Setores
     lista_setores = [
@@ -65,14 +60,15 @@ def mostrar_planilhao():
     if st.button("Carregar Planilhão"):
         with st.spinner("Carregando dados..."):
             try:
-                # Obtém os dados do backend
-                df_planilhao = pegar_planilhao_filtrado(data_base.strftime('%Y-%m-%d'), setores)
+                # Obtém os dados do backend (compartilhados entre as sessões; a sessão guarda só a referência)
+                referencia = planilhao_compartilhado(data_base.strftime('%Y-%m-%d'), setores)
+                df_planilhao = referencia.valor
 
                 if df_planilhao.empty:
                     st.warning("Nenhum dado encontrado. Verifique os filtros aplicados ou escolha outra data.")
                 else:
                     # Armazena os dados no session_state
-                    st.session_state["planilhao"] = df_planilhao
+                    st.session_state["planilhao"] = referencia
                     st.session_state["data_base"] = data_base
                     st.session_state["setores"] = setores
 
@@ -84,14 +80,14 @@ def mostrar_planilhao():
                 st.error(f"Erro ao carregar dados: {e}")
 
     # Exibe os dados armazenados no session_state, se existirem
-    if "planilhao" in st.session_state:
+    if st.session_state.get("planilhao") is not None:
         st.write("### Planilhão Anterior:")
-        st.dataframe(st.session_state["planilhao"])
+        st.dataframe(st.session_state["planilhao"].valor)
 
     st.markdown("---")
     st.header("📂 Informações Adicionais")
     st.markdown("""
     - O Planilhão apresenta informações financeiras detalhadas das ações disponíveis.
-    - Feriados e finais de semana são excluídos para evitar inconsistências nos dados.
+    - Feriados e finais de semana são ajustados para o pregão anterior, conforme o calendário da B3.
     - Para mais informações ou dúvidas, entre em contato com o suporte.
     """)